@@ -0,0 +1,613 @@
+"""
+Benchmarks of the counting hot path and of an end-to-end run with a mocked model.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --compare results.json
+    python -m benchmarks.run --reference-model yolo11n.pt --reference-clip street.mp4 --reference-lines lines.json
+
+Results are saved as JSON, keyed by benchmark name and parameters, so runs of
+different versions can be compared with --compare. Inference backends are compared
+with the PyTorch path on the reference clip if given (a line map as JSON,
+{"area": [[[x1, y1], [x2, y2]], [[x3, y3], [x4, y4]]]}), otherwise on a synthetic clip.
+
+"""
+import argparse
+from datetime import datetime, timezone
+import importlib.metadata
+import importlib.util
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Iterable
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import (
+    CLASS_NAMES,
+    LINE,
+    synthetic_clip,
+    synthetic_line_map,
+    synthetic_traffic_clip,
+    synthetic_tracks,
+)
+from flow_counter.backends import BackendOptions
+from flow_counter.line_index import LineIndex
+from flow_counter.motion import MotionOptions
+from flow_counter.roi import RoiOptions
+from flow_counter.union_find import ArrayUnionFind, DictUnionFind
+from flow_counter.utils import (
+    bottom_edge_hits,
+    compute_iou,
+    compute_iou_matrix,
+    draw_table_on_image,
+    intersect,
+    line_map_to_array,
+)
+
+FULL_GRID = {
+    "boxes": (10, 50, 200),
+    "areas": (1, 4, 16),
+    "many_areas": (16, 64, 128, 256),
+    "frames": (1000, 10000),
+    "streams": (1, 2, 4, 8),
+    "detect_batch": (1, 2, 4, 8, 16),
+    "backends": (("pytorch", None), ("onnx", None), ("onnx", 16), ("openvino", None), ("openvino", 16)),
+}
+QUICK_GRID = {
+    "boxes": (10, 50),
+    "areas": (1, 4),
+    "many_areas": (16, 256),
+    "frames": (200,),
+    "streams": (1, 4),
+    "detect_batch": (1, 4),
+    "backends": (("pytorch", None), ("onnx", None), ("openvino", None)),
+}
+
+class _FakeTensor:
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+    def cpu(self) -> "_FakeTensor":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.array
+
+class _FakeBoxes:
+    def __init__(self, xyxys: np.ndarray, ids: list[int], classes: np.ndarray):
+        self.xyxy = _FakeTensor(xyxys)
+        self.id = _FakeTensor(np.asarray(ids, dtype=np.float32))
+        self.cls = _FakeTensor(classes)
+
+    def __len__(self) -> int:
+        return len(self.cls.array)
+
+class _FakeResult:
+    def __init__(self, frame: np.ndarray, boxes: _FakeBoxes):
+        self.frame = frame
+        self.boxes = boxes
+
+    def plot(self, **kwargs) -> np.ndarray:
+        return self.frame.copy()
+
+def _stats(samples: list[float]) -> dict[str, float]:
+    """
+    Summarize per-call durations in seconds as microseconds.
+    """
+    us = np.asarray(samples) * 1e6
+    return {
+        "calls": len(us),
+        "mean_us": float(us.mean()),
+        "p50_us": float(np.percentile(us, 50)),
+        "p95_us": float(np.percentile(us, 95)),
+        "max_us": float(us.max()),
+    }
+
+def _timed(fn: Callable[[], object], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _mocked_counter(**kwargs):
+    """
+    Create a FlowCounter whose model is a mock, so no weights are loaded.
+    """
+    from flow_counter import FlowCounter
+
+    with mock.patch("flow_counter.flow_counter.YOLO"):
+        counter = FlowCounter("benchmark.pt", **kwargs)
+        # The model is loaded on first use, so while YOLO is still patched.
+        counter.model.names = CLASS_NAMES
+    return counter
+
+def bench_count(boxes: int, areas: int, frames: int, vectorized: bool) -> dict:
+    """
+    Per-frame latency of `_count_crossing_objects` over a synthetic stream.
+    """
+    counter = _mocked_counter(vectorized=vectorized)
+    line_map = synthetic_line_map(areas)
+    tracks = list(synthetic_tracks(frames, density=boxes))
+    samples = []
+    for xyxys, ids, classes in tracks:
+        start = time.perf_counter()
+        counter._count_crossing_objects(xyxys, ids, classes, line_map)
+        samples.append(time.perf_counter() - start)
+    counted = sum(sum(counts.values()) for counts in counter.cls_counts.values())
+    return {
+        "name": "count_crossing_objects",
+        "params": {"boxes": boxes, "areas": areas, "frames": frames, "vectorized": vectorized},
+        "stats": _stats(samples),
+        "counted": counted,
+    }
+
+def bench_union_find(cls: type, num_ids: int) -> dict:
+    """
+    Latency of `unite` and `find` over random merges of `num_ids` IDs.
+    """
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, num_ids, size=(num_ids, 2)).tolist()
+    queries = rng.integers(0, num_ids, size=num_ids).tolist()
+    uf = cls()
+    start = time.perf_counter()
+    for x, y in pairs:
+        uf.unite(x, y)
+    unite = time.perf_counter() - start
+    start = time.perf_counter()
+    for x in queries:
+        uf.find(x)
+    find = time.perf_counter() - start
+    return {
+        "name": "union_find",
+        "params": {"impl": cls.__name__, "ids": num_ids},
+        "stats": {"unite_us": unite / num_ids * 1e6, "find_us": find / num_ids * 1e6},
+    }
+
+def bench_intersect(boxes: int, areas: int, repeat: int) -> list[dict]:
+    """
+    Per-frame latency of the crossing tests, scalar and vectorized.
+    """
+    xyxys, _, _ = next(synthetic_tracks(1, density=boxes))
+    line_map = synthetic_line_map(areas)
+    lines = line_map_to_array(line_map)
+
+    def scalar_intersect() -> None:
+        for x1, _, x2, y2 in xyxys.astype(int).tolist():
+            for line1, line2 in line_map.values():
+                intersect((x1, y2), (x2, y2), *line1)
+                intersect((x1, y2), (x2, y2), *line2)
+
+    params = {"boxes": boxes, "areas": areas}
+    return [
+        {"name": "intersect", "params": params, "stats": _stats(_timed(scalar_intersect, repeat))},
+        {"name": "bottom_edge_hits", "params": params, "stats": _stats(_timed(lambda: bottom_edge_hits(xyxys, lines), repeat))},
+    ]
+
+def bench_many_areas(boxes: int, areas: int, frames: int) -> list[dict]:
+    """
+    Per-frame latency of the crossing tests and of `_count_crossing_objects` on a site with
+    many areas tiled over the frame, testing every line or only the nearby ones (`LineIndex`).
+    """
+    line_map = synthetic_line_map(areas, rows=math.isqrt(areas))
+    lines = line_map_to_array(line_map)
+    index = LineIndex(lines, dense_pairs=0)
+    tracks = list(synthetic_tracks(frames, density=boxes))
+    counter = _mocked_counter()
+
+    samples = {"bottom_edge_hits": [], "line_index_hits": [], "count_crossing_objects": []}
+    # Crossings, and the counting work after the tests, grow with the part of the frame covered by lines.
+    line_hits = sum(int(index.hits(xyxys).sum()) for xyxys, _, _ in tracks) / frames
+    for xyxys, ids, classes in tracks:
+        for name, fn in (
+            ("bottom_edge_hits", lambda: bottom_edge_hits(xyxys, lines)),
+            ("line_index_hits", lambda: index.hits(xyxys)),
+            ("count_crossing_objects", lambda: counter._count_crossing_objects(xyxys, ids, classes, line_map)),
+        ):
+            start = time.perf_counter()
+            fn()
+            samples[name].append(time.perf_counter() - start)
+    params = {"boxes": boxes, "areas": areas, "layout": "tiled"}
+    return [
+        {"name": name, "params": params, "stats": _stats(times), "line_hits_per_frame": line_hits}
+        for name, times in samples.items()
+    ]
+
+def bench_iou(boxes: int, repeat: int) -> list[dict]:
+    """
+    Per-frame latency of all pairwise IoUs, scalar and vectorized.
+    """
+    xyxys, _, _ = next(synthetic_tracks(1, density=boxes))
+
+    def scalar_iou() -> None:
+        for box1 in xyxys:
+            for box2 in xyxys:
+                compute_iou(box1, box2)
+
+    params = {"boxes": boxes}
+    return [
+        # The scalar version is quadratic in Python, so it runs fewer times.
+        {"name": "compute_iou", "params": params, "stats": _stats(_timed(scalar_iou, max(1, repeat // 10)))},
+        {"name": "compute_iou_matrix", "params": params, "stats": _stats(_timed(lambda: compute_iou_matrix(xyxys, xyxys), repeat))},
+    ]
+
+def bench_draw_table(areas: int, repeat: int) -> dict:
+    """
+    Latency of drawing the count table on a 1080p frame.
+    """
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    table = [["Vehicle"] + [f"area{k}" for k in range(areas)]]
+    table += [[name] + ["0"] * areas for name in CLASS_NAMES.values()]
+    return {
+        "name": "draw_table_on_image",
+        "params": {"areas": areas},
+        "stats": _stats(_timed(lambda: draw_table_on_image(frame, table), repeat)),
+    }
+
+def bench_end_to_end(frames: int, boxes: int, headless: bool, pipelined: bool, work_dir: str) -> dict:
+    """
+    Wall time of `object_counts` on a generated clip, with a mocked model returning synthetic tracks.
+    """
+    frame_size = (640, 360)
+    clip = synthetic_clip(os.path.join(work_dir, f"clip_{frames}.mp4"), frames, frame_size)
+    tracks = iter(list(synthetic_tracks(frames, density=boxes, frame_size=frame_size)))
+    counter = _mocked_counter()
+    counter.model.track.side_effect = lambda frame, *args, **kwargs: [_FakeResult(frame, _FakeBoxes(*next(tracks)))]
+    output_path = None if headless else os.path.join(work_dir, "out.mp4")
+
+    start = time.perf_counter()
+    counter.object_counts(clip, output_path, synthetic_line_map(2, frame_size), pipelined=pipelined)
+    elapsed = time.perf_counter() - start
+    return {
+        "name": "object_counts",
+        "params": {"frames": frames, "boxes": boxes, "headless": headless, "pipelined": pipelined},
+        "stats": {"elapsed_s": elapsed, "fps": frames / elapsed},
+    }
+
+def bench_motion_gate(frames: int, boxes: int, idle: float, work_dir: str) -> dict:
+    """
+    Skipped frames, speed-up and count difference of motion-gated `object_counts` against
+    the ungated run, on a clip where traffic pauses for the first `idle` of every 100 frames.
+    """
+    frame_size = (640, 360)
+    empty = (np.zeros((0, 4), dtype=np.float32), [], np.zeros(0, dtype=np.float32))
+    tracks = [
+        track if i % 100 >= idle * 100 else empty
+        for i, track in enumerate(synthetic_tracks(frames, density=boxes, frame_size=frame_size))
+    ]
+    clip = synthetic_traffic_clip(os.path.join(work_dir, f"traffic_{frames}.mp4"), tracks, frame_size)
+    line_map = synthetic_line_map(2, frame_size)
+
+    elapsed, counts, stats = {}, {}, None
+    for gated in (False, True):
+        counter = _mocked_counter(motion_options=MotionOptions() if gated else None)
+        # The mocked detector returns the tracks of the frame being counted.
+        counter.model.track.side_effect = lambda frame, *args, counter=counter, **kwargs: [
+            _FakeResult(frame, _FakeBoxes(*tracks[counter.frame_index]))
+        ]
+        start = time.perf_counter()
+        counts[gated] = counter.object_counts(clip, None, line_map)
+        elapsed[gated] = time.perf_counter() - start
+        stats = counter.motion_stats
+
+    count_diff = sum(
+        abs(counts[True][name].get(area, 0) - counts[False][name].get(area, 0))
+        for name in counts[False] for area in line_map
+    )
+    return {
+        "name": "motion_gate",
+        "params": {"frames": frames, "boxes": boxes, "idle": idle},
+        "stats": {
+            "elapsed_s": elapsed[True],
+            "ungated_elapsed_s": elapsed[False],
+            "skip_ratio": stats.skip_ratio,
+            "count_diff": count_diff,
+        },
+    }
+
+def bench_roi(frames: int, work_dir: str) -> list[dict]:
+    """
+    Throughput of `object_counts` on a 1080p clip with the detector on the full frame and on
+    crops around a strip of counting lines. An untrained yolo11n built from its config has
+    the compute of the trained model without downloading weights.
+    """
+    from flow_counter import FlowCounter
+
+    frame_size = (1920, 1080)
+    clip = synthetic_clip(os.path.join(work_dir, f"clip_1080p_{frames}.mp4"), frames, frame_size)
+    lane = frame_size[0] // 4
+    line_map = {
+        f"lane{k}": (((k * lane, 760), ((k + 1) * lane, 770)), ((k * lane, 820), ((k + 1) * lane, 830)))
+        for k in range(4)
+    }
+    results = []
+    for roi in (False, True):
+        counter = FlowCounter("yolo11n.yaml", roi_options=RoiOptions() if roi else None)
+        # Warm up the model so that its setup is not timed.
+        counter.model.predict(np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8), verbose=False)
+        start = time.perf_counter()
+        counter.object_counts(clip, None, line_map)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "name": "object_counts_roi",
+            "params": {"frames": frames, "roi": roi},
+            "stats": {"elapsed_s": elapsed, "fps": frames / elapsed},
+        })
+    return results
+
+def bench_service(streams: int, frames: int, max_batch: int | None, work_dir: str) -> dict:
+    """
+    Aggregate throughput of a multi-stream service over `streams` copies of a clip, with an
+    untrained yolo11n. `max_batch=1` runs one frame per forward pass, as separate counters would.
+    """
+    from flow_counter import FlowCounter
+
+    clip = synthetic_clip(os.path.join(work_dir, f"clip_{frames}.mp4"), frames, (640, 360))
+    line_map = synthetic_line_map(2, (640, 360))
+    counter = FlowCounter("yolo11n.yaml", tracker_file="bytetrack.yaml")
+    counter.model.predict(np.zeros((360, 640, 3), dtype=np.uint8), verbose=False)
+    # Buffers hold whole clips, so that no frame is dropped.
+    service = counter.serve({k: (clip, line_map) for k in range(streams)}, max_batch=max_batch, buffer_size=frames)
+    stats = service.run()
+    return {
+        "name": "multi_stream_service",
+        "params": {"streams": streams, "frames": frames, "max_batch": max_batch},
+        "stats": {
+            "elapsed_s": stats.end_time - stats.start_time,
+            "fps": stats.fps,
+            "mean_batch_size": stats.mean_batch_size,
+        },
+    }
+
+def bench_detect_batch(frames: int, detect_batch: int, work_dir: str) -> dict:
+    """
+    Throughput of headless `object_counts` with an untrained yolo11n, detecting batches of
+    `detect_batch` frames for a standalone tracker. 1 is the per-frame `model.track` path.
+    """
+    from flow_counter import FlowCounter
+
+    clip = synthetic_clip(os.path.join(work_dir, f"clip_{frames}.mp4"), frames, (640, 360))
+    counter = FlowCounter("yolo11n.yaml", tracker_file="bytetrack.yaml")
+    counter.model.predict(np.zeros((360, 640, 3), dtype=np.uint8), verbose=False)
+    start = time.perf_counter()
+    counter.object_counts(clip, None, synthetic_line_map(2, (640, 360)), detect_batch=detect_batch)
+    elapsed = time.perf_counter() - start
+    return {
+        "name": "object_counts_detect_batch",
+        "params": {"frames": frames, "detect_batch": detect_batch},
+        "stats": {"elapsed_s": elapsed, "fps": frames / elapsed},
+    }
+
+# Python package of the runtime of each exported backend.
+_RUNTIMES = {"onnx": "onnxruntime", "openvino": "openvino"}
+
+def _detecting_weights(path: str) -> str:
+    """
+    Save an untrained yolo11n whose car scores are biased up, so that it detects boxes on any image.
+    Its detections are meaningless but deterministic, so backends can be compared without downloads.
+    """
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO("yolo11n.yaml")
+    with torch.no_grad():
+        for branch in model.model.model[-1].cv3:
+            branch[-1].bias[:] = -20.0
+            branch[-1].bias[2] = 3.0
+    model.save(path)
+    return path
+
+def bench_backends(
+    clip: str,
+    line_map: dict[str, tuple[LINE, LINE]],
+    model_path: str,
+    backends: Iterable[tuple[str, int | None]],
+    imgsz: int | None,
+    work_dir: str,
+) -> list[dict]:
+    """
+    Throughput of headless `object_counts` per inference backend and precision, and agreement
+    of its counts with the first backend, normally PyTorch. Backends whose runtime is not
+    installed are skipped. The export time is reported separately, as it is paid once.
+    """
+    from flow_counter import FlowCounter
+
+    results = []
+    reference = None
+    for backend, quantize in backends:
+        if backend in _RUNTIMES and importlib.util.find_spec(_RUNTIMES[backend]) is None:
+            continue
+        options = BackendOptions(backend, imgsz, quantize, cache_dir=os.path.join(work_dir, "models"))
+        start = time.perf_counter()
+        counter = FlowCounter(model_path, tracker_file="bytetrack.yaml", backend_options=options)
+        load = time.perf_counter() - start
+        counter.model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+        start = time.perf_counter()
+        counter.object_counts(clip, None, line_map, metrics=True)
+        elapsed = time.perf_counter() - start
+        counts = {(cls, area): n for cls, areas in counter.cls_counts.items() for area, n in areas.items()}
+        if reference is None:
+            reference = counts
+        diff = sum(abs(counts.get(key, 0) - reference.get(key, 0)) for key in counts.keys() | reference.keys())
+        total = sum(reference.values())
+        results.append({
+            "name": "object_counts_backend",
+            "params": {"backend": backend, "quantize": quantize, "imgsz": imgsz, "clip": os.path.basename(clip)},
+            "stats": {
+                "elapsed_s": elapsed,
+                "fps": counter.run_metrics.frames / elapsed,
+                "load_s": load,
+                "mean_detections": counter.run_metrics.detections.mean,
+                "counted": sum(counts.values()),
+                "count_diff": diff,
+                "count_agreement": 1.0 - diff / total if total else float(diff == 0),
+            },
+        })
+    return results
+
+# Dependencies that must not be imported by `import flow_counter` or by counting recorded tracks.
+HEAVY_MODULES = ("cv2", "torch", "ultralytics", "tqdm")
+
+STARTUP_STATEMENTS = (
+    "pass",
+    "import flow_counter",
+    "from flow_counter import FlowCounter; FlowCounter()",
+    "from flow_counter.replay import LineMapReplay",
+    "from ultralytics import YOLO",
+)
+
+def bench_startup(statement: str, repeat: int) -> dict:
+    """
+    Wall time of a fresh interpreter running `statement`, and the heavy dependencies it imports.
+    "pass" is the interpreter's own startup, and importing YOLO the cost the package defers.
+    """
+    code = f"{statement}; import sys; print(*[m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        samples.append(time.perf_counter() - start)
+    return {
+        "name": "startup",
+        "params": {"statement": statement},
+        "stats": {**_stats(samples), "heavy_modules": output.split()},
+    }
+
+def run_all(
+    grid: dict[str, Iterable],
+    repeat: int,
+    reference: tuple[str, str, dict[str, tuple[LINE, LINE]]] | None = None,
+) -> list[dict]:
+    results = []
+    for boxes, areas, frames in itertools.product(grid["boxes"], grid["areas"], grid["frames"]):
+        results.append(bench_count(boxes, areas, frames, vectorized=True))
+        # The scalar reference grows with boxes x areas, so it only runs on the shortest clips.
+        if frames == min(grid["frames"]):
+            results.append(bench_count(boxes, areas, frames, vectorized=False))
+    for cls, num_ids in itertools.product((DictUnionFind, ArrayUnionFind), (10_000, 100_000)):
+        results.append(bench_union_find(cls, num_ids))
+    for boxes, areas in itertools.product(grid["boxes"], grid["areas"]):
+        results.extend(bench_intersect(boxes, areas, repeat))
+    for boxes, areas in itertools.product(grid["boxes"], grid["many_areas"]):
+        results.extend(bench_many_areas(boxes, areas, min(grid["frames"])))
+    for boxes in grid["boxes"]:
+        results.extend(bench_iou(boxes, repeat))
+    for areas in grid["areas"]:
+        results.append(bench_draw_table(areas, repeat))
+    for statement in STARTUP_STATEMENTS:
+        results.append(bench_startup(statement, max(3, repeat // 40)))
+    with tempfile.TemporaryDirectory() as work_dir:
+        for headless, pipelined in ((True, False), (False, False), (False, True)):
+            results.append(bench_end_to_end(max(grid["frames"]), max(grid["boxes"]), headless, pipelined, work_dir))
+        results.append(bench_motion_gate(max(grid["frames"]), min(grid["boxes"]), 0.8, work_dir))
+        results.extend(bench_roi(min(grid["frames"]) // 10, work_dir))
+        for streams, max_batch in itertools.product(grid["streams"], (1, None)):
+            results.append(bench_service(streams, min(grid["frames"]) // 10, max_batch, work_dir))
+        for detect_batch in grid["detect_batch"]:
+            results.append(bench_detect_batch(min(grid["frames"]) // 10, detect_batch, work_dir))
+        if reference is None:
+            frames = min(grid["frames"]) // 10
+            clip = synthetic_clip(os.path.join(work_dir, f"clip_{frames}.mp4"), frames, (640, 360))
+            weights = _detecting_weights(os.path.join(work_dir, "detecting.pt"))
+            reference = weights, clip, synthetic_line_map(2, (640, 360))
+        model_path, clip, line_map = reference
+        results.extend(bench_backends(clip, line_map, model_path, grid["backends"], None, work_dir))
+    return results
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        version = importlib.metadata.version("flow-counter")
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return {
+        "flow_counter": version,
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "time": datetime.now(timezone.utc).isoformat(),
+    }
+
+def _key(result: dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(baseline: list[dict], results: list[dict], threshold: float) -> list[str]:
+    """
+    Compare the mean latency (or elapsed time) of results with a baseline.
+
+    :return: Descriptions of the results slower than the baseline by more than `threshold`.
+    """
+    old = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = old.get(_key(result))
+        if base is None:
+            continue
+        for metric in ("mean_us", "unite_us", "find_us", "elapsed_s"):
+            if metric in result["stats"] and metric in base["stats"] and base["stats"][metric] > 0:
+                ratio = result["stats"][metric] / base["stats"][metric]
+                line = f"{result['name']} {result['params']} {metric}: {base['stats'][metric]:.1f} -> {result['stats'][metric]:.1f} ({ratio:.2f}x)"
+                print(line)
+                if ratio > 1 + threshold:
+                    regressions.append(line)
+    return regressions
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--quick", action="store_true", help="Run a small grid, e.g. as a smoke test.")
+    parser.add_argument("--repeat", type=int, default=200, help="Repetitions of micro benchmarks.")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression.")
+    parser.add_argument("--reference-model", help="Weights compared across inference backends.")
+    parser.add_argument("--reference-clip", help="Video on which backends are compared.")
+    parser.add_argument("--reference-lines", help="JSON line map of the reference clip.")
+    args = parser.parse_args(argv)
+
+    reference = None
+    if args.reference_clip:
+        if not (args.reference_model and args.reference_lines):
+            parser.error("--reference-clip needs --reference-model and --reference-lines")
+        with open(args.reference_lines) as f:
+            line_map = {name: tuple(tuple(map(tuple, line)) for line in lines) for name, lines in json.load(f).items()}
+        reference = args.reference_model, args.reference_clip, line_map
+
+    results = run_all(QUICK_GRID if args.quick else FULL_GRID, args.repeat, reference)
+    report = {"meta": _metadata(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f)["results"], results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+from flow_counter.track_cache import TRACKS
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+# COCO class IDs of person, car, motorcycle, bus and truck, weighted like street traffic.
+CLASS_IDS = np.array([0, 2, 3, 5, 7])
+CLASS_WEIGHTS = np.array([0.2, 0.6, 0.08, 0.04, 0.08])
+CLASS_NAMES = {0: "person", 2: "car", 3: "motorcycle", 5: "bus", 7: "truck"}
+
+@dataclass
+class _Object:
+    track_id: int
+    cls_id: int
+    box: np.ndarray
+    velocity: np.ndarray
+
+def synthetic_tracks(
+    num_frames: int,
+    density: int = 20,
+    frame_size: tuple[int, int] = (1920, 1080),
+    id_switch_prob: float = 0.002,
+    duplicate_prob: float = 0.05,
+    seed: int = 0,
+) -> Iterator[TRACKS]:
+    """
+    Generate tracker output of objects moving through a frame, top to bottom.
+
+    About `density` objects are visible at any time. Each frame, an object gets a new
+    track ID with probability `id_switch_prob`, and is detected twice (a jittered box
+    with another ID, overlapping with IoU > 0.5) with probability `duplicate_prob`.
+
+    :param num_frames: Number of frames to generate.
+    :param density: Average number of objects in a frame.
+    :param frame_size: Frame size (width, height).
+    :param id_switch_prob: Per-object, per-frame probability of an ID switch.
+    :param duplicate_prob: Per-object, per-frame probability of a duplicate detection.
+    :param seed: Random seed. The same arguments always generate the same tracks.
+    :return: Iterator of (xyxys, ids, classes) per frame.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    objects: list[_Object] = []
+    next_id = 1
+
+    def spawn(y: float) -> _Object:
+        nonlocal next_id
+        w, h = rng.uniform(40, 160), rng.uniform(40, 120)
+        x = rng.uniform(0, width - w)
+        obj = _Object(
+            track_id=next_id,
+            cls_id=int(rng.choice(CLASS_IDS, p=CLASS_WEIGHTS)),
+            box=np.array([x, y - h, x + w, y]),
+            velocity=np.array([rng.normal(0, 1), rng.uniform(2, 12)]),
+        )
+        next_id += 1
+        return obj
+
+    objects = [spawn(rng.uniform(0, height)) for _ in range(density)]
+    for _ in range(num_frames):
+        xyxys, ids, classes = [], [], []
+        for obj in objects:
+            obj.box += np.tile(obj.velocity, 2)
+            if rng.random() < id_switch_prob:
+                obj.track_id = next_id
+                next_id += 1
+            xyxys.append(obj.box.copy())
+            ids.append(obj.track_id)
+            classes.append(obj.cls_id)
+            if rng.random() < duplicate_prob:
+                xyxys.append(obj.box + rng.uniform(-3, 3, size=4))
+                ids.append(next_id)
+                classes.append(obj.cls_id)
+                next_id += 1
+        yield np.array(xyxys, dtype=np.float32).reshape(-1, 4), ids, np.array(classes, dtype=np.float32)
+
+        # Objects leaving the frame are replaced by new ones entering at the top.
+        objects = [obj if obj.box[1] < height else spawn(0.0) for obj in objects]
+
+def synthetic_line_map(
+    num_areas: int,
+    frame_size: tuple[int, int] = (1920, 1080),
+    rows: int = 1,
+) -> dict[str, tuple[LINE, LINE]]:
+    """
+    Build `num_areas` areas of two slightly slanted lines, side by side across the frame,
+    or tiled in `rows` rows like the bays of a parking lot.
+    """
+    width, height = frame_size
+    cols = -(-num_areas // rows)
+    step, row_height = width // max(1, cols), height // rows
+    line_map = {}
+    for k in range(num_areas):
+        x1, x2 = (k % cols) * step, (k % cols + 1) * step
+        y = (k // cols) * row_height
+        line_map[f"area{k}"] = (
+            ((x1, y + row_height // 3), (x2, y + row_height // 3 + 20)),
+            ((x1, y + 2 * row_height // 3), (x2, y + 2 * row_height // 3 + 20)),
+        )
+    return line_map
+
+def synthetic_clip(path: str, num_frames: int, frame_size: tuple[int, int] = (640, 360), fps: float = 30.0) -> str:
+    """
+    Write a video of `num_frames` noisy frames, e.g. for end-to-end runs with a mocked model.
+    """
+    rng = np.random.default_rng(0)
+    width, height = frame_size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, frame_size)
+    background = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    for i in range(num_frames):
+        writer.write(np.roll(background, 4 * i, axis=1))
+    writer.release()
+    return path
+
+def synthetic_traffic_clip(
+    path: str,
+    tracks: list[TRACKS],
+    frame_size: tuple[int, int] = (640, 360),
+    fps: float = 30.0,
+) -> str:
+    """
+    Write a video of a static background with the boxes of `tracks` drawn as solid rectangles,
+    e.g. for motion gating, which needs frames that only change where objects move.
+    """
+    rng = np.random.default_rng(0)
+    width, height = frame_size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, frame_size)
+    background = rng.integers(60, 90, size=(height, width, 3), dtype=np.uint8)
+    for xyxys, ids, _ in tracks:
+        frame = background.copy()
+        for (x1, y1, x2, y2), track_id in zip(xyxys.astype(int).tolist(), ids):
+            color = (255, 255 - 40 * (track_id % 4), 80 * (track_id % 3))
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness=-1)
+        writer.write(frame)
+    writer.release()
+    return path
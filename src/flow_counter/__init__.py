@@ -1 +1,12 @@
-from flow_counter.flow_counter import FlowCounter
\ No newline at end of file
+from typing import Any
+
+__all__ = ["FlowCounter"]
+
+def __getattr__(name: str) -> Any:
+    # Imported on first use, so that `import flow_counter` and its NumPy-only modules
+    # (utils, union_find, replay, track_cache, ...) start fast.
+    if name == "FlowCounter":
+        from flow_counter.flow_counter import FlowCounter
+
+        return FlowCounter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+import hashlib
+import os
+import shutil
+import tempfile
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+# Name ending of the exported model of each backend, by which ultralytics recognizes its format.
+_SUFFIXES = {"onnx": ".onnx", "openvino": "_openvino_model"}
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "flow_counter", "models")
+
+@dataclass
+class BackendOptions:
+    """
+    Inference backend of the detector.
+
+    :param backend: "pytorch" runs the weights as they are. "onnx" (ONNX Runtime) and "openvino"
+                    run a model exported from them, which is usually much faster on CPUs.
+    :param imgsz: Inference image size. Defaults to the model's own, 640 for official weights.
+                  Smaller sizes are faster but miss small objects.
+    :param quantize: Precision of exported models: None (FP32), 16 (FP16) or 8 (INT8,
+                     calibrated on the images of `data`).
+    :param data: Dataset YAML with the INT8 calibration images. Defaults to ultralytics' coco8.yaml.
+    :param cache_dir: Directory of exported models. Defaults to ~/.cache/flow_counter/models.
+    """
+    backend: str = "pytorch"
+    imgsz: int | None = None
+    quantize: int | None = None
+    data: str | None = None
+    cache_dir: str | None = None
+
+    def __post_init__(self):
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {self.backend}")
+        if self.quantize not in (None, 16, 8):
+            raise ValueError(f"Unsupported precision: {self.quantize}")
+        if self.quantize is not None and self.backend == "pytorch":
+            raise ValueError("quantize needs an exported backend, onnx or openvino")
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def exported_model_path(weights: str, options: BackendOptions) -> str:
+    """
+    Path of the export of `weights` for `options` in the cache, which may not exist yet.
+
+    Exports are keyed by the content of the weights, the backend, the image size and the precision.
+    """
+    key = [_file_hash(weights), options.backend, f"imgsz{options.imgsz or 640}", f"fp{options.quantize or 32}"]
+    if options.quantize == 8:
+        key.append(os.path.splitext(os.path.basename(options.data or "coco8.yaml"))[0])
+    return os.path.join(options.cache_dir or DEFAULT_CACHE_DIR, "-".join(key) + _SUFFIXES[options.backend])
+
+def export_model(model_path: str, options: BackendOptions) -> str:
+    """
+    Export a model for an inference backend, or return its cached export.
+
+    :param model_path: Path to .pt weights, or the name of official weights to download.
+    :param options: Backend settings.
+    :return: Path of the exported model, to load with `YOLO(path, task="detect")`.
+    """
+    if options.backend == "pytorch":
+        return model_path
+    if not model_path.endswith(".pt"):
+        raise ValueError(f"Only .pt weights can be exported, got {model_path}")
+    from ultralytics import YOLO
+    from ultralytics.utils.downloads import attempt_download_asset
+
+    weights = str(attempt_download_asset(model_path))
+    path = exported_model_path(weights, options)
+    if os.path.exists(path):
+        return path
+
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp_dir:
+        # Ultralytics writes the export next to the weights, so export a copy inside the cache.
+        copy = os.path.join(tmp_dir, "model.pt")
+        shutil.copyfile(weights, copy)
+        # `quantize` replaced `half` / `int8` in ultralytics 8.4.80, below the floor in pyproject.toml.
+        exported = YOLO(copy).export(
+            format=options.backend,
+            imgsz=options.imgsz or 640,
+            dynamic=True,
+            verbose=False,
+            quantize=options.quantize,
+            **({"data": options.data} if options.data is not None else {}),
+        )
+        try:
+            os.replace(os.path.normpath(exported), path)
+        except OSError:
+            # Another process exported the same model first.
+            if not os.path.exists(path):
+                raise
+    return path
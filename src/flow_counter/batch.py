@@ -0,0 +1,176 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import multiprocessing
+import os
+import time
+from typing import Any, Iterable, Iterator
+
+from flow_counter.flow_counter import LINE, FlowCounter
+
+@dataclass
+class VideoResult:
+    """
+    Result of counting one video in a batch. `cls_counts` is None if it failed.
+    """
+    path: str
+    cls_counts: dict[str, dict[str, int]] | None
+    error: str | None = None
+    elapsed: float = 0.0
+    output_path: str | None = None
+
+@dataclass
+class BatchReport:
+    """
+    Per-video results of a batch and their merged counts.
+    """
+    cls_counts: dict[str, dict[str, int]] = field(default_factory=dict)
+    results: list[VideoResult] = field(default_factory=list)
+
+    @property
+    def failures(self) -> list[VideoResult]:
+        return [result for result in self.results if result.error is not None]
+
+# Counter of the current worker process, created once by `_init_worker`.
+_worker_counter: FlowCounter | None = None
+
+def _init_worker(counter_kwargs: dict[str, Any], torch_threads: int | None) -> None:
+    global _worker_counter
+    if torch_threads is not None:
+        import cv2
+        import torch
+
+        # Avoid oversubscription when several workers share the CPU.
+        torch.set_num_threads(torch_threads)
+        cv2.setNumThreads(torch_threads)
+    _worker_counter = FlowCounter(**counter_kwargs)
+
+def _output_paths(input_paths: list[str], output_dir: str | None) -> list[str | None]:
+    """
+    Output path of every input: its file name, or with its position in the batch appended
+    if several inputs share the file name, e.g. a/clip.mp4 and b/clip.mp4.
+    """
+    if output_dir is None:
+        return [None] * len(input_paths)
+    names = [os.path.basename(path) for path in input_paths]
+    shared = {name for name, count in Counter(names).items() if count > 1}
+    taken = set(names) - shared
+    paths = []
+    for k, name in enumerate(names):
+        if name in shared:
+            stem, ext = os.path.splitext(name)
+            name = f"{stem}_{k}{ext}"
+            while name in taken:
+                name = f"{os.path.splitext(name)[0]}_{k}{ext}"
+            taken.add(name)
+        paths.append(os.path.join(output_dir, name))
+    return paths
+
+def _error(e: BaseException) -> str:
+    return f"{type(e).__name__}: {e}"
+
+def _count_video(
+    counter: FlowCounter,
+    input_path: str,
+    line_map: dict[str, tuple[LINE, LINE]],
+    output_path: str | None,
+) -> VideoResult:
+    start = time.perf_counter()
+    try:
+        counter._reset_tracker()
+        cls_counts = counter.object_counts(input_path, output_path, line_map)
+    except Exception as e:
+        return VideoResult(input_path, None, _error(e), time.perf_counter() - start)
+    cls_counts = {name: dict(counts) for name, counts in cls_counts.items()}
+    return VideoResult(input_path, cls_counts, None, time.perf_counter() - start, output_path)
+
+def _count_video_in_worker(
+    input_path: str,
+    line_map: dict[str, tuple[LINE, LINE]],
+    output_path: str | None,
+) -> VideoResult:
+    return _count_video(_worker_counter, input_path, line_map, output_path)
+
+def merge_counts(results: Iterable[VideoResult]) -> dict[str, dict[str, int]]:
+    """
+    Sum the counts of successful results into one {class: {area: count}} report.
+    """
+    merged: dict[str, dict[str, int]] = {}
+    for result in results:
+        if result.cls_counts is None:
+            continue
+        for class_name, counts in result.cls_counts.items():
+            merged_counts = merged.setdefault(class_name, {})
+            for area, count in counts.items():
+                merged_counts[area] = merged_counts.get(area, 0) + count
+    return merged
+
+def iter_object_counts_many(
+    counter: FlowCounter,
+    input_paths: Iterable[str],
+    line_map: dict[str, tuple[LINE, LINE]],
+    workers: int | None = None,
+    torch_threads: int | None = 1,
+    output_dir: str | None = None,
+) -> Iterator[VideoResult]:
+    """
+    Count many videos in parallel, yielding each result as soon as it finishes.
+
+    Every worker process loads its own model once, with the same settings as `counter`,
+    and processes videos one after another. A failing video yields a result with an error
+    and does not affect the others. If a worker process dies, the videos it could not count
+    yield results with an error.
+
+    :param counter: Counter whose settings are used in the workers.
+    :param input_paths: Paths to the input video files.
+    :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+    :param workers: Number of worker processes. Defaults to the CPU count.
+                    0 runs the videos one by one in this process with `counter` itself.
+    :param torch_threads: Number of torch / OpenCV threads per worker, None to leave unchanged.
+    :param output_dir: If given, annotated videos are written there under the input file name,
+                       suffixed with the input's position if several inputs share the name.
+                       Otherwise, counting is headless.
+    """
+    input_paths = list(input_paths)
+    output_paths = _output_paths(input_paths, output_dir)
+    if workers == 0:
+        for input_path, output_path in zip(input_paths, output_paths):
+            yield _count_video(counter, input_path, line_map, output_path)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(counter._init_kwargs, torch_threads),
+    ) as executor:
+        futures = {
+            executor.submit(_count_video_in_worker, input_path, line_map, output_path): input_path
+            for input_path, output_path in zip(input_paths, output_paths)
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker died, e.g. BrokenProcessPool after a crash, or the result could not be sent back.
+                yield VideoResult(futures[future], None, _error(e))
+
+def object_counts_many(
+    counter: FlowCounter,
+    input_paths: Iterable[str],
+    line_map: dict[str, tuple[LINE, LINE]],
+    workers: int | None = None,
+    torch_threads: int | None = 1,
+    output_dir: str | None = None,
+) -> BatchReport:
+    """
+    Count many videos in parallel and merge their counts.
+    See `iter_object_counts_many` for the parameters.
+
+    :return: Merged counts and per-video results, in completion order.
+    """
+    report = BatchReport()
+    for result in iter_object_counts_many(counter, input_paths, line_map, workers, torch_threads, output_dir):
+        report.results.append(result)
+    report.cls_counts = merge_counts(report.results)
+    return report
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+
+class BucketedCounts:
+    def __init__(self, class_names: list[str], bucket_seconds: float = 60.0, num_buckets: int = 1440):
+        """
+        Class-wise counts per time bucket, kept in a fixed-size ring buffer.
+
+        Instead of per-bucket counts, the ring holds the cumulative (class, area) totals
+        at the start of each bucket. The count of any window of buckets is then the
+        difference of two snapshots, so rolling totals are O(1) in the window length.
+        Only the latest `num_buckets` buckets are kept. The area axis grows by doubling,
+        so sites with hundreds of areas do not copy the whole ring for every new area.
+
+        :param class_names: Counted class names, the first axis of every matrix.
+        :param bucket_seconds: Width of a bucket in seconds of frame timestamps.
+        :param num_buckets: Number of buckets kept, e.g. 1440 one-minute buckets for a day.
+        """
+        self.class_names = list(class_names)
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.areas: list[str] = []
+        self._class_index = {name: i for i, name in enumerate(self.class_names)}
+        self._area_index: dict[str, int] = {}
+        # Views of the first len(areas) columns of buffers with spare columns.
+        self._totals_buffer = np.zeros((len(self.class_names), 0), dtype=np.int64)
+        self._starts_buffer = np.zeros((num_buckets, len(self.class_names), 0), dtype=np.int64)
+        self._totals, self._starts = self._totals_buffer, self._starts_buffer
+        # Numbers of the current and the oldest kept bucket, None before the first frame.
+        self._bucket: int | None = None
+        self._first = 0
+
+    def advance(self, timestamp: float) -> None:
+        """
+        Move the current bucket to the one containing `timestamp`. Time never moves back.
+        """
+        bucket = math.floor(timestamp / self.bucket_seconds)
+        if self._bucket is None:
+            self._bucket = self._first = bucket
+            self._starts[bucket % self.num_buckets] = self._totals
+            return
+        if bucket <= self._bucket:
+            return
+        # Buckets skipped without any frame start (and end) with the current totals.
+        for b in range(max(self._bucket + 1, bucket - self.num_buckets + 1), bucket + 1):
+            self._starts[b % self.num_buckets] = self._totals
+        self._bucket = bucket
+        self._first = max(self._first, bucket - self.num_buckets + 1)
+
+    def _area(self, area: str) -> int:
+        index = self._area_index.get(area)
+        if index is None:
+            index = self._area_index[area] = len(self.areas)
+            self.areas.append(area)
+            if index == self._totals_buffer.shape[1]:
+                capacity = max(4, 2 * index)
+                self._totals_buffer = np.pad(self._totals_buffer, ((0, 0), (0, capacity - index)))
+                self._starts_buffer = np.pad(self._starts_buffer, ((0, 0), (0, 0), (0, capacity - index)))
+            self._totals = self._totals_buffer[:, :index + 1]
+            self._starts = self._starts_buffer[:, :, :index + 1]
+        return index
+
+    def add(self, class_name: str, area: str, count: int = 1) -> None:
+        """
+        Add a count to the current bucket.
+        """
+        if self._bucket is None:
+            self.advance(0.0)
+        a = self._area(area)
+        self._totals[self._class_index[class_name], a] += count
+
+    def _start_of(self, bucket: int) -> np.ndarray:
+        return self._starts[max(bucket, self._first) % self.num_buckets]
+
+    def rolling_matrix(self, seconds: float) -> np.ndarray:
+        """
+        Counts of the last buckets covering `seconds`, including the current one.
+
+        :return: Array of shape (classes, areas).
+        """
+        if self._bucket is None:
+            return self._totals.copy()
+        num = max(1, math.ceil(seconds / self.bucket_seconds))
+        return self._totals - self._start_of(self._bucket - num + 1)
+
+    def rolling(self, seconds: float) -> dict[str, dict[str, int]]:
+        """
+        Counts of the last buckets covering `seconds`, as {class: {area: count}}.
+        """
+        matrix = self.rolling_matrix(seconds)
+        return {
+            class_name: {area: int(matrix[c, a]) for a, area in enumerate(self.areas)}
+            for c, class_name in enumerate(self.class_names)
+        }
+
+    def rolling_total(self, class_name: str, area: str, seconds: float) -> int:
+        """
+        Count of one class and area in the last buckets covering `seconds`.
+        """
+        a = self._area_index.get(area)
+        if a is None:
+            return 0
+        c = self._class_index[class_name]
+        if self._bucket is None:
+            return int(self._totals[c, a])
+        num = max(1, math.ceil(seconds / self.bucket_seconds))
+        return int(self._totals[c, a] - self._start_of(self._bucket - num + 1)[c, a])
+
+    def matrix(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Export every kept bucket.
+
+        :return: Tuple of (bucket start times in seconds, counts of shape (buckets, classes, areas)).
+                 The class and area axes follow `class_names` and `areas`.
+        """
+        if self._bucket is None:
+            return np.zeros(0), np.zeros((0, len(self.class_names), len(self.areas)), dtype=np.int64)
+        numbers = np.arange(self._first, self._bucket + 1)
+        starts = self._starts[numbers % self.num_buckets]
+        ends = np.concatenate([starts[1:], self._totals[None]])
+        return numbers * self.bucket_seconds, ends - starts
@@ -0,0 +1,173 @@
+from array import array
+import json
+import os
+import pickle
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from flow_counter.flow_counter import FlowCounter
+
+# Bumped whenever the layout of a checkpoint changes.
+CHECKPOINT_VERSION = 1
+
+def _tracker_state(counter: "FlowCounter") -> bytes:
+    """
+    Pickle the trackers persisted by the model's predictor, or the standalone tracker of a
+    batched run, or return b"" if there are none or they cannot be pickled.
+    """
+    if counter._tracker is not None:
+        trackers = [counter._tracker.tracker]
+    else:
+        trackers = getattr(getattr(counter.model, "predictor", None), "trackers", None)
+    if not trackers:
+        return b""
+    try:
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        return pickle.dumps((trackers, BaseTrack._count))
+    except Exception:
+        return b""
+
+def restore_tracker_state(counter: "FlowCounter", state: bytes) -> bool:
+    """
+    Replace the trackers of the model's predictor, or the standalone tracker of a batched run,
+    with pickled ones. Unpickling can run arbitrary code, so `state` must come from a trusted checkpoint.
+
+    The predictor only exists after the model has tracked a frame, so call this after a warm-up frame.
+
+    :return: Whether the trackers were restored.
+    """
+    predictor = getattr(counter.model, "predictor", None)
+    if not state or (predictor is None and counter._tracker is None):
+        return False
+    from ultralytics.trackers.basetrack import BaseTrack
+
+    trackers, BaseTrack._count = pickle.loads(state)
+    if counter._tracker is not None:
+        counter._tracker.tracker = trackers[0]
+    else:
+        predictor.trackers = trackers
+    return True
+
+def save_checkpoint(counter: "FlowCounter", path: str, key: str, extra: dict[str, Any] | None = None) -> None:
+    """
+    Atomically write the counting state of `counter` to a single .npz file.
+
+    The union-find, crossed lines, event log and time buckets are stored as integer
+    arrays; scalars and names go into a JSON header. The file is written next to `path`
+    and then renamed, so a crash never leaves a partial checkpoint behind.
+
+    :param counter: Counter in the middle of a run.
+    :param path: Checkpoint file.
+    :param key: Identifies the video, model and tracker the state belongs to.
+    :param extra: Additional JSON-serializable values, returned by `load_checkpoint`.
+    """
+    uf = counter.uf
+    line_keys = sorted({k for crossed in counter.crossed_lines.values() for k in crossed})
+    key_index = {k: i for i, k in enumerate(line_keys)}
+    crossed = [(root, key_index[k], frame) for root, lines in counter.crossed_lines.items() for k, frame in lines.items()]
+    log = counter.event_log
+    buckets = counter.bucketed_counts
+    header = {
+        "version": CHECKPOINT_VERSION,
+        "key": key,
+        "frame_index": counter.frame_index,
+        "frame_timestamp": counter.frame_timestamp,
+        "cls_counts": counter.cls_counts,
+        "line_keys": line_keys,
+        "next_sweep": counter._next_sweep,
+        "evicted_roots": counter._evicted_roots,
+        "evicted_ids": counter._evicted_ids,
+        "sweeps": counter._sweeps,
+        "id_offset": counter._id_offset,
+        "class_names": log.class_names,
+        "areas": log.areas,
+        "bucket_areas": buckets.areas,
+        "bucket": buckets._bucket,
+        "first_bucket": buckets._first,
+        "extra": extra or {},
+    }
+    arrays = {
+        "header": np.frombuffer(json.dumps(header).encode(), dtype=np.uint8),
+        "uf_ids": np.asarray(uf._ids, dtype=np.int64),
+        "uf_parent": np.frombuffer(uf._parent, dtype=np.int64),
+        "uf_size": np.frombuffer(uf._size, dtype=np.int64),
+        "counted_ids": np.fromiter(counter.counted_ids, dtype=np.int64),
+        "last_seen": np.array(list(counter.last_seen.items()), dtype=np.int64).reshape(-1, 2),
+        "crossed_lines": np.array(crossed, dtype=np.int64).reshape(-1, 3),
+        "bucket_totals": buckets._totals,
+        "bucket_starts": buckets._starts,
+        "tracker": np.frombuffer(_tracker_state(counter), dtype=np.uint8),
+    }
+    for name, column in log.to_numpy(decode=False).items():
+        arrays[f"event_{name}"] = column
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(counter: "FlowCounter", path: str, key: str) -> tuple[dict[str, Any], bytes]:
+    """
+    Restore the counting state written by `save_checkpoint` into `counter`.
+
+    The tracker state is unpickled by `restore_tracker_state`, which can run arbitrary code,
+    so checkpoints must be trusted input, e.g. written by the same deployment.
+
+    :param counter: Counter to restore, freshly reset.
+    :param path: Checkpoint file.
+    :param key: Must match the key the checkpoint was saved with.
+    :return: Tuple of (extra values passed to `save_checkpoint`, pickled tracker state or b"").
+    """
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    header = json.loads(arrays["header"].tobytes())
+    if header["version"] != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {header['version']}: {path}")
+    if header["key"] != key:
+        raise ValueError(f"Checkpoint belongs to a different video, model, tracker or line map: {path}")
+
+    ids = arrays["uf_ids"].tolist()
+    uf = counter.uf
+    uf._ids = ids
+    uf._index = {x: i for i, x in enumerate(ids)}
+    uf._parent = array("q", arrays["uf_parent"].tobytes())
+    uf._size = array("q", arrays["uf_size"].tobytes())
+    uf._num_sets = sum(1 for i, p in enumerate(uf._parent) if i == p)
+
+    counter.counted_ids = set(arrays["counted_ids"].tolist())
+    counter.last_seen = dict(arrays["last_seen"].tolist())
+    line_keys = header["line_keys"]
+    for root, k, frame in arrays["crossed_lines"].tolist():
+        counter.crossed_lines[root][line_keys[k]] = frame
+    counter.cls_counts = header["cls_counts"]
+    counter.frame_index = header["frame_index"]
+    counter.frame_timestamp = header["frame_timestamp"]
+    counter._next_sweep = header["next_sweep"]
+    counter._evicted_roots = header["evicted_roots"]
+    counter._evicted_ids = header["evicted_ids"]
+    counter._sweeps = header["sweeps"]
+    counter._id_offset = header["id_offset"]
+
+    log = counter.event_log
+    for name, _ in log.COLUMNS:
+        column = arrays[f"event_{name}"]
+        log._columns[name] = np.concatenate([column, np.empty(max(1, len(column)), dtype=column.dtype)])
+    log._size = len(arrays["event_frame_index"])
+    for name in header["class_names"]:
+        log._code("class_name", log.class_names, name)
+    for name in header["areas"]:
+        log._code("area", log.areas, name)
+
+    buckets = counter.bucketed_counts
+    for area in header["bucket_areas"]:
+        buckets._area(area)
+    buckets._totals[...] = arrays["bucket_totals"]
+    buckets._starts[...] = arrays["bucket_starts"]
+    buckets._bucket = header["bucket"]
+    buckets._first = header["first_bucket"]
+    return header["extra"], arrays["tracker"].tobytes()
@@ -0,0 +1,130 @@
+import csv
+from dataclasses import dataclass
+import json
+from typing import Iterator
+
+import numpy as np
+
+@dataclass
+class CrossingEvent:
+    """
+    An object counted after crossing both lines of an area.
+    `line1_frame` and `line2_frame` are the frames at which `{area}_1` and `{area}_2`
+    were first crossed.
+    """
+    frame_index: int
+    timestamp: float
+    track_id: int
+    class_name: str
+    area: str
+    line1_frame: int = -1
+    line2_frame: int = -1
+
+class EventLog:
+    # Column names and dtypes. Class and area names are stored as codes into `class_names` / `areas`.
+    COLUMNS = (
+        ("frame_index", np.int64),
+        ("timestamp", np.float64),
+        ("track_id", np.int64),
+        ("class_name", np.int32),
+        ("area", np.int32),
+        ("line1_frame", np.int64),
+        ("line2_frame", np.int64),
+    )
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Append-only log of crossing events, stored in preallocated columns.
+
+        Columns grow by doubling, so appending is amortized O(1) and exporting
+        needs no per-event objects.
+
+        :param capacity: Number of events allocated up front.
+        """
+        self._size = 0
+        self._columns = {name: np.empty(max(1, capacity), dtype=dtype) for name, dtype in self.COLUMNS}
+        self.class_names: list[str] = []
+        self.areas: list[str] = []
+        self._codes: dict[str, dict[str, int]] = {"class_name": {}, "area": {}}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _code(self, column: str, names: list[str], name: str) -> int:
+        codes = self._codes[column]
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def append(self, event: CrossingEvent) -> None:
+        """
+        Append one event.
+        """
+        if self._size == len(self._columns["frame_index"]):
+            for name, column in self._columns.items():
+                grown = np.empty(2 * len(column), dtype=column.dtype)
+                grown[:self._size] = column
+                self._columns[name] = grown
+        i = self._size
+        columns = self._columns
+        columns["frame_index"][i] = event.frame_index
+        columns["timestamp"][i] = event.timestamp
+        columns["track_id"][i] = event.track_id
+        columns["class_name"][i] = self._code("class_name", self.class_names, event.class_name)
+        columns["area"][i] = self._code("area", self.areas, event.area)
+        columns["line1_frame"][i] = event.line1_frame
+        columns["line2_frame"][i] = event.line2_frame
+        self._size += 1
+
+    def __iter__(self) -> Iterator[CrossingEvent]:
+        for row in zip(*self._rows()):
+            yield CrossingEvent(*row)
+
+    def _rows(self) -> list[list]:
+        """
+        Columns as Python lists in COLUMNS order, with class and area names decoded.
+        """
+        columns = []
+        for name, _ in self.COLUMNS:
+            values = self._columns[name][:self._size].tolist()
+            if name == "class_name":
+                values = [self.class_names[code] for code in values]
+            elif name == "area":
+                values = [self.areas[code] for code in values]
+            columns.append(values)
+        return columns
+
+    def to_numpy(self, decode: bool = True) -> dict[str, np.ndarray]:
+        """
+        Copy the log into one NumPy array per column.
+
+        :param decode: If True, class and area columns hold names. Otherwise, they hold
+                       integer codes into `class_names` and `areas`.
+        :return: Dict of column name to array of length `len(self)`.
+        """
+        arrays = {name: self._columns[name][:self._size].copy() for name, _ in self.COLUMNS}
+        if decode:
+            arrays["class_name"] = np.asarray(self.class_names, dtype=str)[arrays["class_name"]]
+            arrays["area"] = np.asarray(self.areas, dtype=str)[arrays["area"]]
+        return arrays
+
+    def to_csv(self, path: str) -> None:
+        """
+        Write the log as CSV with a header row.
+        """
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in self.COLUMNS])
+            writer.writerows(zip(*self._rows()))
+
+    def to_jsonl(self, path: str) -> None:
+        """
+        Write the log as JSON Lines, one object per event.
+        """
+        names = [name for name, _ in self.COLUMNS]
+        with open(path, "w") as f:
+            for row in zip(*self._rows()):
+                f.write(json.dumps(dict(zip(names, row))))
+                f.write("\n")
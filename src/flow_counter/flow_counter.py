@@ -1,14 +1,89 @@
-from collections import defaultdict
-import cv2
+from collections import defaultdict, deque
+from dataclasses import dataclass
+import copy
+import heapq
+import json
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 import numpy as np
-from tqdm import tqdm
-from ultralytics import YOLO
 
-from flow_counter.union_find import DictUnionFind
-from flow_counter.utils import Point, intersect, compute_iou, draw_table_on_image
+from flow_counter.backends import BackendOptions, export_model
+from flow_counter.buckets import BucketedCounts
+from flow_counter.checkpoint import load_checkpoint, restore_tracker_state, save_checkpoint
+from flow_counter.events import CrossingEvent, EventLog
+from flow_counter.line_index import LineIndex
+from flow_counter.metrics import MetricsReporter, RunMetrics
+from flow_counter.overlay import OverlayCache
+from flow_counter.pipeline import PipelineStats, run_pipeline
+from flow_counter.track_cache import TRACKS, TrackCache, TrackCacheWriter, cache_key
+from flow_counter.union_find import ArrayUnionFind
+from flow_counter.utils import (
+    Point,
+    compute_iou_matrix,
+    draw_table_on_image,
+    intersect,
+    line_map_to_array,
+    scale_line_map,
+    table_size,
+)
+from flow_counter.video_io import VideoOptions, VideoReader, open_reader, open_writer
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+    from ultralytics.engine.results import Boxes, Results
+
+    from flow_counter.batch import BatchReport
+    from flow_counter.motion import MotionGate, MotionOptions, MotionStats
+    from flow_counter.roi import RoiMosaic, RoiOptions
+    from flow_counter.service import MultiStreamService
+    from flow_counter.stream import StreamCounter
+    from flow_counter.tracking import Tracker
 
 LINE = tuple[Point, Point]
 
+def __getattr__(name: str) -> Any:
+    # ultralytics (and torch with it) and OpenCV are imported on first use. They remain
+    # attributes of this module, and `YOLO` is looked up here, so that they can be patched.
+    if name == "YOLO":
+        from ultralytics import YOLO
+
+        return YOLO
+    if name == "cv2":
+        import cv2
+
+        return cv2
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _LazyModel:
+    def __init__(self, load: Callable[[], "YOLO"], model: "YOLO | None" = None):
+        """
+        A model loaded on first use. Shallow copies of a counter share it, so it is loaded once.
+        """
+        self._load = load
+        self._lock = threading.Lock()
+        self.model = model
+
+    def get(self) -> "YOLO":
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    self.model = self._load()
+        return self.model
+
+@dataclass
+class EvictionStats:
+    """
+    Statistics about the tracking state kept by FlowCounter.
+    """
+    live_roots: int = 0
+    live_ids: int = 0
+    evicted_roots: int = 0
+    evicted_ids: int = 0
+    sweeps: int = 0
+    bytes_estimate: int = 0
+
 class FlowCounter:
     def __init__(
         self, 
@@ -16,55 +91,385 @@ class FlowCounter:
         counted_cls_names: list[str] = ["person", "car", "motorcycle", "bus", "truck"],
         tracker_file: str | None = None,
         debug: bool = False,
+        vectorized: bool = True,
+        track_ttl: int | None = None,
+        max_tracks: int | None = None,
+        cache_dir: str | None = None,
+        bucket_seconds: float = 60.0,
+        num_buckets: int = 1440,
+        video_options: VideoOptions | None = None,
+        motion_options: "MotionOptions | None" = None,
+        roi_options: "RoiOptions | None" = None,
+        backend_options: BackendOptions | None = None,
     ):
         """
-        Initialize the flow counter with a given YOLO model.
+        Initialize the flow counter with a given YOLO model. The model is loaded on first use.
 
         :param model_path: Path to the YOLO model file.
         :param counted_cls_names: The class names only given are counted.
         :tracker_file: YAML file including tracker parameters.
         :param debug: If True, plot detailed bounding box.
+        :param vectorized: If True, test the boxes against the lines near them in one NumPy pass,
+                           using a spatial index of the line map. Otherwise, use the scalar reference implementation.
+        :param track_ttl: If given, drop the state of tracks not seen for more than this many
+                          frames. Should be longer than the tracker's own track buffer.
+        :param max_tracks: If given, cap on the number of tracks kept. The least recently seen
+                           idle tracks are dropped first. Tracks seen in the current frame are
+                           kept even above the cap, so visible objects are never counted twice.
+        :param cache_dir: If given, tracker output of each video is cached in this directory,
+                          keyed by video, model and tracker config. Headless runs on a cached
+                          video replay the cache instead of running the model, unless they ask for
+                          checkpoints, metrics or a pipelined run. With ROI inference or motion
+                          gating, the key also includes the line map.
+        :param bucket_seconds: Width of the time buckets of `bucketed_counts`, in seconds
+                               of video time (frame index / source FPS) or stream time.
+        :param num_buckets: Number of time buckets kept in `bucketed_counts`.
+        :param video_options: Decoding / encoding backend, codec and downscaling of videos.
+                              Defaults to OpenCV with the "mp4v" codec at full size.
+        :param motion_options: If given, `object_counts` skips the detector on frames where
+                               nothing moves near the counting lines. The tracker still sees
+                               every frame, without detections on skipped ones.
+        :param roi_options: If given, `object_counts` runs the detector only on crops around
+                            the counting lines, packed into one image, and maps the boxes
+                            back to the full frame.
+        :param backend_options: Inference backend (PyTorch, ONNX Runtime or OpenVINO), precision
+                                and image size of the detector. Exported models are cached.
+                                Defaults to the PyTorch weights at their own image size.
         """
-        self.model = YOLO(model_path)
-        self.uf = DictUnionFind()
+        # Kept to create counters with the same settings, e.g. in worker processes.
+        self._init_kwargs = {k: v for k, v in locals().items() if k != "self"}
+        self.backend_options = backend_options or BackendOptions()
+        self._model = _LazyModel(self._load_model)
+        # Class names by class ID, if known without the model, e.g. from recorded tracks.
+        self._names: dict[int, str] | None = None
+        self.model_path = model_path
+        self.uf = ArrayUnionFind()
         self.counted_cls_names = counted_cls_names
         self.tracker_file = tracker_file
         self.debug = debug
+        self.vectorized = vectorized
+        self.track_ttl = track_ttl
+        self.max_tracks = max_tracks
+        self.cache_dir = cache_dir
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.video_options = video_options or VideoOptions()
+        self.motion_options = motion_options
+        self.roi_options = roi_options
+        self._line_map: dict[str, tuple[LINE, LINE]] | None = None
+        self._index = LineIndex(line_map_to_array({}))
+        self.pipeline_stats: PipelineStats | None = None
+        self.run_metrics: RunMetrics | None = None
+        self.motion_stats: "MotionStats | None" = None
+        # Tracker fed by batched detection, only during `object_counts` with `detect_batch`.
+        self._tracker: "Tracker | None" = None
+        self._table_overlay = OverlayCache()
+
+        # Functions called with a CrossingEvent whenever an object is counted.
+        self.event_listeners: list[Callable[[CrossingEvent], None]] = []
         self._reset()
 
+    def _load_model(self) -> "YOLO":
+        yolo = sys.modules[__name__].YOLO
+        if self.backend_options.backend == "pytorch":
+            model = yolo(self.model_path)
+        else:
+            model = yolo(export_model(self.model_path, self.backend_options), task="detect")
+        if self.backend_options.imgsz is not None:
+            model.overrides["imgsz"] = self.backend_options.imgsz
+        return model
+
+    @property
+    def model(self) -> "YOLO":
+        """
+        The detector, loaded on first use.
+        """
+        return self._model.get()
+
+    @model.setter
+    def model(self, model: "YOLO") -> None:
+        self._model = _LazyModel(self._load_model, model)
+
+    @property
+    def names(self) -> dict[int, str]:
+        """
+        Class names by class ID: those of the replayed tracks during `count_tracks`, otherwise the model's.
+        """
+        return self._names if self._names is not None else self.model.names
+
+    def _fresh_copy(self) -> "FlowCounter":
+        """
+        A counter with the settings and the model of this one, but its own line index, overlay,
+        event listeners and counting state, e.g. to count another line map side by side.
+        """
+        counter = copy.copy(self)
+        counter._line_map = None
+        counter._index = LineIndex(line_map_to_array({}))
+        counter._table_overlay = OverlayCache()
+        counter._tracker = None
+        counter._names = None
+        counter.pipeline_stats = None
+        counter.run_metrics = None
+        counter.motion_stats = None
+        counter.event_listeners = []
+        counter._reset()
+        return counter
+
     def _reset(self):
         # Set of already-counted object IDs.
         self.counted_ids: set[int] = set()
 
-        # Track which lines each object has crossed.
-        self.crossed_lines: dict[str, set[str]] = defaultdict(set)
+        # Track which lines each object has crossed, and the frame at which it first did.
+        self.crossed_lines: dict[int, dict[str, int]] = defaultdict(dict)
 
         # Dictionary to store class-wise counts. {vehicle: {line name: count}}
         self.cls_counts: dict[str, dict[str, int]] = {}
         for vehicle_name in self.counted_cls_names:
             self.cls_counts[vehicle_name] = {}
 
-        self.uf = DictUnionFind()
+        self.uf = ArrayUnionFind()
+
+        # Every counted object of the current run.
+        self.event_log = EventLog()
+
+        # Class-wise counts per time bucket, for per-minute reports and rolling totals.
+        self.bucketed_counts = BucketedCounts(self.counted_cls_names, self.bucket_seconds, self.num_buckets)
+
+        # Index and timestamp (seconds) of the frame being counted.
+        self.frame_index = 0
+        self.frame_timestamp = 0.0
 
-    def _open_video(self, input_path: str) -> tuple[cv2.VideoCapture, int, tuple[int, int]]:
+        # Last frame in which each root ID was seen. Only used for eviction.
+        self.last_seen: dict[int, int] = {}
+        self._next_sweep = 0
+        self._evicted_roots = 0
+        self._evicted_ids = 0
+        self._sweeps = 0
+
+        # Number of union-find merges of different tracks.
+        self._merges = 0
+
+        # Added to tracker IDs after resuming without the tracker's state, so new tracks
+        # never reuse the IDs of restored ones.
+        self._id_offset = 0
+
+    def _open_video(self, input_path: str, buffers: int = 2) -> tuple[VideoReader, int, tuple[int, int]]:
         """
-        Open a video file and retrieve basic metadata.
+        Open a video file with the backend of `video_options` and retrieve basic metadata.
 
         :param input_path: Path to the input video file.
-        :return: Tuple of (VideoCapture object, total frame count, frame size (width, height))
+        :param buffers: Number of decoded frames that must stay valid at the same time.
+        :return: Tuple of (reader, total frame count, decoded frame size (width, height))
         """
-        cap = cv2.VideoCapture(input_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        return cap, total_frames, (frame_width, frame_height)
-    
+        reader = open_reader(input_path, self.video_options, buffers)
+        return reader, reader.frame_count, reader.frame_size
+
+    def _video_key(self, input_path: str, line_map: dict[str, tuple[LINE, LINE]], checkpoint: bool = False) -> str:
+        """
+        Key of the track cache and checkpoints of a video. Downscaled decoding and the
+        inference backend change the detections. So do region-of-interest inference and
+        motion gating, whose crops and bands follow the line map.
+
+        :param checkpoint: Key of a checkpoint, which always includes the line map,
+                           as its counting state refers to the lines.
+        """
+        options = []
+        if self.roi_options is not None:
+            options.append(f"roi={self.roi_options!r}")
+        if self.motion_options is not None:
+            options.append(f"motion={self.motion_options!r}")
+        if options or checkpoint:
+            options.append(f"lines={json.dumps(line_map, sort_keys=True, default=int)}")
+        if self.video_options.scale is not None:
+            options.append(f"scale={self.video_options.scale}")
+        backend = self.backend_options
+        if backend.backend != "pytorch":
+            options.append(f"backend={backend.backend},quantize={backend.quantize}")
+        if backend.imgsz is not None:
+            options.append(f"imgsz={backend.imgsz}")
+        return cache_key(input_path, self.model_path, self.tracker_file, ",".join(options) or None)
+
+    @staticmethod
+    def _to_source_coords(xyxys: np.ndarray, reader: VideoReader) -> np.ndarray:
+        """
+        Map boxes detected on downscaled frames back to the coordinates of the source video.
+        """
+        if reader.frame_size == reader.source_size:
+            return xyxys
+        sx = reader.source_size[0] / reader.frame_size[0]
+        sy = reader.source_size[1] / reader.frame_size[1]
+        return xyxys * np.array([sx, sy, sx, sy], dtype=xyxys.dtype)
+
+    def _reset_tracker(self) -> None:
+        """
+        Forget the tracks persisted by the model's tracker, e.g. before a new video.
+        """
+        predictor = getattr(self.model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
+
+    def _line_index(self, line_map: dict[str, tuple[LINE, LINE]]) -> LineIndex:
+        """
+        Return the spatial index of the line map, reusing the previous one if unchanged.
+        """
+        if line_map != self._line_map:
+            self._line_map = copy.deepcopy(line_map)
+            self._index = LineIndex(line_map_to_array(line_map))
+        return self._index
+
+    def _is_countable(self, box_id: int, root_id: int, cls_id: int) -> bool:
+        """
+        Whether a box may still be counted: valid ID, not counted yet and a counted class.
+        """
+        class_name = self.names[cls_id]
+
+        if box_id == -1 or root_id in self.counted_ids:
+            return False
+        return class_name in self.counted_cls_names
+
+    def _collect_candidates_scalar(
+        self,
+        xyxys: np.ndarray,
+        ids: list[int],
+        classes: np.ndarray,
+        line_map: dict[str, tuple[LINE, LINE]],
+    ) -> list[tuple]:
+        """
+        Collect (box_index, box_id, cls_id, line_name, line_key) for every box crossing a line,
+        testing one box and one line at a time.
+        """
+        candidates = []
+        for i, (xyxy, box_id, root_id, cls_id) in enumerate(zip(xyxys, ids, self.uf.find_many(ids), classes)):
+            x1, y1, x2, y2 = map(int, xyxy)
+            if not self._is_countable(box_id, root_id, cls_id):
+                continue
+
+            for line_name, (line1, line2) in line_map.items():
+                if intersect((x1, y2), (x2, y2), line1[0], line1[1]):
+                    candidates.append((i, box_id, cls_id, line_name, f"{line_name}_1"))
+                if intersect((x1, y2), (x2, y2), line2[0], line2[1]):
+                    candidates.append((i, box_id, cls_id, line_name, f"{line_name}_2"))
+        return candidates
+
+    def _collect_candidates(
+        self,
+        xyxys: np.ndarray,
+        ids: list[int],
+        classes: np.ndarray,
+        line_map: dict[str, tuple[LINE, LINE]],
+        hits: np.ndarray | None = None,
+    ) -> list[tuple]:
+        """
+        Same as :meth:`_collect_candidates_scalar`, but box bottom edges are tested in one
+        vectorized pass against the lines near them, found with a spatial index of the line map.
+        Candidates are returned in the same order.
+
+        :param hits: Precomputed hit mask of shape (boxes, lines, 2), as from `bottom_edge_hits`.
+        """
+        # Every ID is registered in the union-find as by the scalar engine, so both leave the same state.
+        roots = self.uf.find_many(ids)
+        if not line_map or len(ids) == 0:
+            return []
+        if hits is None:
+            hits = self._line_index(line_map).hits(xyxys)
+
+        line_names = list(line_map)
+        candidates = []
+        # Only boxes crossing some line need the (slower) per-box checks.
+        for i in np.flatnonzero(hits.any(axis=(1, 2))):
+            box_id, cls_id = ids[i], classes[i]
+            if not self._is_countable(box_id, roots[i], cls_id):
+                continue
+            for line_idx, line_no in zip(*np.nonzero(hits[i])):
+                line_name = line_names[line_idx]
+                candidates.append((i, box_id, cls_id, line_name, f"{line_name}_{line_no + 1}"))
+        return candidates
+
+    def _merge(self, box_id: int, root_id: int) -> int:
+        """
+        Unite a box ID with another track, carrying the counted flag over to the new root.
+
+        ``counted_ids`` only ever holds union-find roots, so a merge touches at most
+        the two old roots instead of re-resolving every counted ID.
+
+        :return: The root of the merged track.
+        """
+        old_root = self.uf.find(box_id)
+        new_root = self.uf.unite(old_root, root_id)
+        if old_root != root_id:
+            self._merges += 1
+        if old_root in self.counted_ids or root_id in self.counted_ids:
+            self.counted_ids.discard(old_root)
+            self.counted_ids.discard(root_id)
+            self.counted_ids.add(new_root)
+        if self.last_seen:
+            last = max(self.last_seen.pop(old_root, -1), self.last_seen.pop(root_id, -1))
+            if last >= 0:
+                self.last_seen[new_root] = last
+        return new_root
+
+    @property
+    def _eviction_enabled(self) -> bool:
+        return self.track_ttl is not None or self.max_tracks is not None
+
+    def _evict(self) -> None:
+        """
+        Drop the state of tracks that have not been seen for longer than ``track_ttl`` frames,
+        then the least recently seen idle ones while more than ``max_tracks`` remain.
+        Tracks seen in the current frame are never dropped. Counts are never changed.
+
+        Expired tracks are swept every ``track_ttl // 4`` frames; the cap is checked every frame.
+        """
+        expired = set()
+        if self.track_ttl is not None and self.frame_index >= self._next_sweep:
+            expired = {r for r, f in self.last_seen.items() if self.frame_index - f > self.track_ttl}
+            self._next_sweep = self.frame_index + max(1, self.track_ttl // 4)
+        if self.max_tracks is not None and len(self.last_seen) - len(expired) > self.max_tracks:
+            excess = len(self.last_seen) - len(expired) - self.max_tracks
+            idle = ((f, r) for r, f in self.last_seen.items() if r not in expired and f < self.frame_index)
+            expired.update(r for _, r in heapq.nsmallest(excess, idle))
+        if not expired:
+            return
+
+        for root_id in expired:
+            del self.last_seen[root_id]
+            self.counted_ids.discard(root_id)
+        # crossed_lines may also hold stale entries for IDs merged into an expired root.
+        for key in [k for k in self.crossed_lines if self.uf.find(k) in expired]:
+            del self.crossed_lines[key]
+
+        self._evicted_roots += len(expired)
+        self._evicted_ids += self.uf.compact(self.last_seen)
+        self._sweeps += 1
+
+    def eviction_stats(self) -> EvictionStats:
+        """
+        Return statistics about the live tracking state, e.g. to alert on runaway growth.
+        """
+        bytes_estimate = (
+            self.uf.memory_bytes()
+            + sys.getsizeof(self.last_seen)
+            + sys.getsizeof(self.counted_ids)
+            + sys.getsizeof(self.crossed_lines)
+            + sum(sys.getsizeof(v) for v in self.crossed_lines.values())
+        )
+        return EvictionStats(
+            live_roots=self.uf.num_sets,
+            live_ids=len(self.uf),
+            evicted_roots=self._evicted_roots,
+            evicted_ids=self._evicted_ids,
+            sweeps=self._sweeps,
+            bytes_estimate=bytes_estimate,
+        )
+
     def _count_crossing_objects(
         self,
         xyxys: np.ndarray,
         ids: list[int],
         classes: np.ndarray,
         line_map: dict[str, tuple[LINE, LINE]],
+        hits: np.ndarray | None = None,
+        ious: np.ndarray | None = None,
     ) -> int:
         """
         Count objects that have crossed both lines defined in the line_map.
@@ -73,139 +478,597 @@ class FlowCounter:
         :param ids: List of object IDs correspoinding to the boxes.
         :param classes: Class IDs corresponding to the boxes.
         :param line_map: Line map represented by two points (start, end).
+        :param hits: Optional precomputed (boxes, lines, 2) hit mask of the vectorized engine.
+        :param ious: Optional precomputed (boxes, boxes) IoU matrix of the frame.
         :return Number of new objects crossing the line.
         """
         count = 0
+        self.bucketed_counts.advance(self.frame_timestamp)
 
         # Step1: Collect candidates that intersect either line1 or line2
-        candidates = []
-        for xyxy, box_id, cls_id in zip(xyxys, ids, classes):
-            x1, y1, x2, y2 = map(int, xyxy)
-            root_id = self.uf.find(box_id)
-            class_name = self.model.names[cls_id]
-
-            if box_id == -1 or root_id in self.counted_ids:
-                continue
-
-            if class_name not in self.counted_cls_names:
-                continue
+        if self.vectorized:
+            candidates = self._collect_candidates(xyxys, ids, classes, line_map, hits)
+        else:
+            candidates = self._collect_candidates_scalar(xyxys, ids, classes, line_map)
 
-            for line_name, (line1, line2) in line_map.items():
-                if intersect((x1, y2), (x2, y2), line1[0], line1[1]):
-                    candidates.append((xyxy, box_id, cls_id, line_name, f"{line_name}_1"))
-                if intersect((x1, y2), (x2, y2), line2[0], line2[1]):
-                    candidates.append((xyxy, box_id, cls_id, line_name, f"{line_name}_2")) 
-    
         # Step2: Updated Non-Maximum Suppression
-        for xyxy1, box_id1, cls_id1, line_name, line_key in candidates:
+        candidate_ious = []
+        if candidates:
+            rows = [c[0] for c in candidates]
+            candidate_ious = compute_iou_matrix(np.asarray(xyxys)[rows], xyxys) if ious is None else ious[rows]
+        for (_, box_id1, cls_id1, line_name, line_key), iou_row in zip(candidates, candidate_ious):
             supression_flag = False
-            for xyxy2, box_id2, cls_id2 in zip(xyxys, ids, classes):
+            for j in np.flatnonzero(iou_row >= 0.5):
+                box_id2 = ids[j]
                 if box_id1 == box_id2:
                     continue
 
-                iou = compute_iou(xyxy1, xyxy2)
                 root_id2 = self.uf.find(box_id2)
-                if iou >= 0.5 and root_id2 in self.counted_ids:
-                    self.uf.unite(box_id1, root_id2)
-                    self.counted_ids = set([self.uf.find(i) for i in self.counted_ids])
+                if root_id2 in self.counted_ids:
                     supression_flag = True
-                elif iou >= 0.5:
-                    self.uf.unite(box_id1, root_id2)
-                    self.counted_ids = set([self.uf.find(i) for i in self.counted_ids])
+                self._merge(box_id1, root_id2)
 
             # Step3: Check if object has crossed both lines
             if not supression_flag:
-                class_name = self.model.names[cls_id1]
+                class_name = self.names[cls_id1]
                 root_id = self.uf.find(box_id1)
 
                 # Record which line this object has crossed
-                self.crossed_lines[root_id].add(line_key)
+                crossed = self.crossed_lines[root_id]
+                crossed.setdefault(line_key, self.frame_index)
 
                 # Count only if both lines are crossed
                 if (
-                    f"{line_name}_1" in self.crossed_lines[root_id]
-                    and f"{line_name}_2" in self.crossed_lines[root_id]
+                    f"{line_name}_1" in crossed
+                    and f"{line_name}_2" in crossed
                     and root_id not in self.counted_ids
                 ):
                     count += 1
                     self.counted_ids.add(root_id)
                     self.cls_counts[class_name][line_name] = self.cls_counts[class_name].get(line_name, 0) + 1
+                    self.bucketed_counts.add(class_name, line_name)
+                    event = CrossingEvent(
+                        self.frame_index,
+                        self.frame_timestamp,
+                        root_id,
+                        class_name,
+                        line_name,
+                        crossed[f"{line_name}_1"],
+                        crossed[f"{line_name}_2"],
+                    )
+                    self.event_log.append(event)
+                    for listener in self.event_listeners:
+                        listener(event)
+
+        if self._eviction_enabled:
+            for root_id in self.uf.find_many(ids):
+                self.last_seen[root_id] = self.frame_index
+            self._evict()
+        self.frame_index += 1
         return count
     
-    def _annotate_frame(self, frame: np.ndarray, line_map: dict[str, tuple[LINE, LINE]], counter: int) -> np.ndarray:
+    def _annotate_frame(
+        self,
+        frame: np.ndarray,
+        line_map: dict[str, tuple[LINE, LINE]],
+        counter: int,
+        cls_counts: dict[str, dict[str, int]] | None = None,
+    ) -> np.ndarray:
         """
         Draw the counting lines and current count on the frame.
 
         :param frame: The current frame to annotate.
         :param line_map: The line map, where each key contains two lines ((x1, y1), (x2, y2)), ((x3, y3), (x4, y4)).
         :param counter: The number of objects counted so far.
+        :param cls_counts: Class-wise counts to draw. Defaults to the current `cls_counts`.
         :return: Annotated frame.
         """
+        import cv2
+
+        if cls_counts is None:
+            cls_counts = self.cls_counts
+
         # Draw each pair of lines in the map
         for (line1, line2) in line_map.values():
             cv2.line(frame, line1[0], line1[1], (0, 255, 255), 3)
             cv2.line(frame, line2[0], line2[1], (0, 255, 0), 3)
 
-        table_data = [["Vehicle"] + list(line_map.keys())]
-        for vehicle_name in self.counted_cls_names:
-            table_data.append([vehicle_name] + [
-                str(self.cls_counts[vehicle_name].get(line_name, 0)) for line_name in line_map
-            ])
-        draw_table_on_image(frame, table_data)
-        return frame
+        def draw_table(image: np.ndarray) -> None:
+            table_data = [["Vehicle"] + list(line_map.keys())]
+            for vehicle_name in self.counted_cls_names:
+                table_data.append([vehicle_name] + [
+                    str(cls_counts[vehicle_name].get(line_name, 0)) for line_name in line_map
+                ])
+            draw_table_on_image(image, table_data)
+
+        # The table is only re-rendered when the areas or the drawn counts change.
+        counts = tuple(
+            tuple(cls_counts[vehicle_name].get(line_name, 0) for line_name in line_map)
+            for vehicle_name in self.counted_cls_names
+        )
+        key = (tuple(line_map), tuple(self.counted_cls_names), counts)
+        return self._table_overlay.apply(frame, key, draw_table, table_size(len(line_map) + 1, len(counts) + 1))
+
+    def _resume_tracker(self, frame: np.ndarray, tracker_state: bytes) -> None:
+        """
+        Continue tracking after restoring a checkpoint.
+
+        The tracker's own state is restored if it was saved; tracking `frame` once first
+        creates the predictor that holds it. Otherwise, the tracker restarts, and its IDs
+        are offset past every restored ID.
+        """
+        if tracker_state:
+            if self._tracker is None:
+                self._track(frame)
+            if restore_tracker_state(self, tracker_state):
+                return
+        self._id_offset = max(max(self.uf._ids, default=0) + 1, self._id_offset)
+
+    def _track(self, frame: np.ndarray) -> "Results":
+        """
+        Run detection and tracking on a single frame.
+        """
+        if self.tracker_file is not None:
+            results = self.model.track(frame, persist=True, verbose=False, tracker=self.tracker_file)
+        else:
+            results = self.model.track(frame, persist=True, verbose=False)
+        return results[0]
+
+    def _track_idle(self, frame: np.ndarray) -> "Results":
+        """
+        Feed a frame without detections to the tracker, instead of running the detector.
+
+        Tracks age as if nothing was detected, so the tracker keeps its frame count and
+        IDs in step with the video.
+        """
+        import torch
+        from ultralytics.engine.results import Results
+
+        result = Results(frame, path="", names=self.model.names, boxes=torch.zeros((0, 6)))
+        predictor = getattr(self.model, "predictor", None)
+        trackers = getattr(predictor, "trackers", None)
+        if trackers:
+            trackers[0].update(result.boxes.cpu().numpy(), frame)
+        return result
+
+    def _detect_batches(
+        self,
+        frames: Iterable[np.ndarray],
+        batch_size: int,
+        detections: deque,
+        gate: "MotionGate | None" = None,
+        roi: "RoiMosaic | None" = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Run the detector on batches of consecutive frames, ahead of tracking.
+
+        Each frame is yielded once its batch is detected, after its detection result is
+        appended to `detections`. Frames skipped by `gate` get an empty result instead.
 
-    def object_counts(self, input_path: str, output_path: str, line_map: dict[str, tuple[LINE, LINE]]) -> None:
+        :param frames: Decoded frames.
+        :param batch_size: Number of frames per forward pass.
+        :param detections: Queue of detection results, consumed in frame order by the tracker.
+        :param gate: If given, only frames it lets through go to the detector.
+        :param roi: If given, the detector sees the crops of each frame.
+        """
+        import torch
+        from ultralytics.engine.results import Results
+
+        from flow_counter.tracking import TRACK_CONF
+
+        batch: list[tuple[np.ndarray, bool]] = []
+
+        def flush() -> Iterator[np.ndarray]:
+            # Mosaic crops reuse one image, so each frame of the batch needs its own copy.
+            images = [frame if roi is None else roi.crop(frame).copy() for frame, run in batch if run]
+            results = iter(
+                self.model.predict(images, conf=TRACK_CONF, batch=len(images), verbose=False) if images else []
+            )
+            for frame, run in batch:
+                if run:
+                    detections.append(next(results))
+                else:
+                    image = frame if roi is None else roi.crop(frame).copy()
+                    detections.append(Results(image, path="", names=self.model.names, boxes=torch.zeros((0, 6))))
+                yield frame
+            batch.clear()
+
+        for frame in frames:
+            batch.append((frame, gate is None or gate.check(frame)))
+            if len(batch) == batch_size:
+                yield from flush()
+        yield from flush()
+
+    @staticmethod
+    def _extract_tracks(boxes: "Boxes") -> tuple[np.ndarray, list[int], np.ndarray]:
+        """
+        Convert tracker output into the arrays consumed by `_count_crossing_objects`.
+
+        :param boxes: Boxes of a tracking result.
+        :return: Tuple of (xyxys, ids, classes). IDs are -1 if the tracker assigned none.
+        """
+        # [x1, y1, x2, y2] format
+        xyxys = boxes.xyxy.cpu().numpy()
+
+        if boxes.id is not None:
+            ids = np.round(boxes.id.cpu().numpy()).astype(int).tolist()
+        else:
+            ids = [-1] * len(boxes)
+        classes = boxes.cls.cpu().numpy()
+        return xyxys, ids, classes
+
+    def _render(
+        self,
+        result: "Results",
+        line_map: dict[str, tuple[LINE, LINE]],
+        counter: int,
+        cls_counts: dict[str, dict[str, int]] | None = None,
+    ) -> np.ndarray:
+        """
+        Plot the tracking result and annotate it with the counting lines and counts.
+        """
+        if self.debug:
+            annotated_frame = result.plot()
+        else:
+            annotated_frame = result.plot(conf=False, labels=False)
+        return self._annotate_frame(annotated_frame, line_map, counter, cls_counts)
+
+    def object_counts(
+        self,
+        input_path: str,
+        output_path: str | None,
+        line_map: dict[str, tuple[LINE, LINE]],
+        pipelined: bool = False,
+        queue_size: int = 8,
+        preview_every: int = 1,
+        checkpoint_path: str | None = None,
+        checkpoint_every: int = 1000,
+        resume: bool = False,
+        metrics: bool = False,
+        metrics_path: str | None = None,
+        metrics_interval: float = 10.0,
+        on_metrics: Callable[[RunMetrics], None] | None = None,
+        detect_batch: int = 1,
+    ) -> dict[str, dict[str, int]]:
         """
         Count objects crossing two lines in a video.
 
         :param input_path: Path to the input video file.
-        :param output_path: Path to the output video file (annotated).
+        :param output_path: Path to the output video file (annotated). If None, run headless:
+                            no frame is plotted or annotated and no video writer is opened.
         :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+        :param pipelined: If True, decode, inference/counting and annotate/encode run as
+                          overlapping stages on separate threads. Output and counts are
+                          identical to the serial run. Statistics are stored in `pipeline_stats`.
+        :param queue_size: Maximum number of frames buffered between pipeline stages.
+        :param preview_every: Only annotate and write every Nth frame to the output video,
+                              e.g. for a low-cost preview. Counting still uses every frame.
+        :param checkpoint_path: If given, the counting state is saved to this file every
+                                `checkpoint_every` frames and at the end of the video.
+        :param checkpoint_every: Number of frames between checkpoints.
+        :param resume: If True and `checkpoint_path` exists, restore its state and continue
+                       from the checkpointed frame. The output video then only holds the
+                       frames processed after resuming. The checkpoint must have been written
+                       for the same video, model, tracker and line map. Checkpoints hold the
+                       pickled tracker state, so only resume from files you trust.
+        :param metrics: If True, record per-stage timing histograms, detections per frame,
+                        union-find merges and effective FPS in `run_metrics`.
+                        Implied by `metrics_path` and `on_metrics`.
+        :param metrics_path: If given, write the metrics to this file in Prometheus text format
+                             every `metrics_interval` seconds and at the end of the run.
+        :param metrics_interval: Seconds between metric exports.
+        :param on_metrics: If given, called with `run_metrics` every `metrics_interval` seconds
+                           and at the end of the run.
+        :param detect_batch: If greater than 1, run the detector on batches of this many
+                             consecutive frames and feed their detections, in order, to a
+                             standalone tracker from `tracker_file`. Tracks are the same as
+                             per-frame tracking. Detection then runs in the decode stage.
+        :return: Class-wise counts, same as `cls_counts`.
         """
+        if preview_every < 1:
+            raise ValueError(f"preview_every must be at least 1, got {preview_every}")
+        if detect_batch < 1:
+            raise ValueError(f"detect_batch must be at least 1, got {detect_batch}")
+        self.pipeline_stats = None
+        self.run_metrics = None
+        self.motion_stats = None
+        self._tracker = None
+        cache_writer = None
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, self._video_key(input_path, line_map))
+            # Replaying only counts, so runs asking for a video, checkpoints, metrics or
+            # pipeline statistics run the model instead.
+            replay = output_path is None and checkpoint_path is None and not pipelined and not (
+                metrics or metrics_path is not None or on_metrics is not None
+            )
+            if replay and TrackCache.exists(cache_path):
+                cache = TrackCache(cache_path)
+                return self.count_tracks(cache, line_map, cache.fps)
+
+        # Only imported past a cache replay, which needs neither.
+        import cv2
+        from tqdm import tqdm
+
         self._reset()
-        cap, total_frames, frame_size = self._open_video(input_path)
+        if detect_batch > 1:
+            from flow_counter.tracking import Tracker
 
-        out = cv2.VideoWriter(
-            output_path,
-            cv2.VideoWriter_fourcc(*"mp4v"),
-            30.0,
-            frame_size,
-        )
+            self._tracker = Tracker(self.tracker_file)
+        # Rendered results keep their frame until they are written, so a pipelined run needs
+        # a frame buffer for each frame queued, in flight, or being decoded, plus the frames
+        # of a detection batch.
+        buffers = (2 * queue_size + 4 if pipelined else 2) + detect_batch - 1
+        reader, total_frames, frame_size = self._open_video(input_path, buffers)
+        out = None
+        # Everything after opening the video releases the reader, and kills an ffmpeg encoder,
+        # on errors. An unfinished track cache is left unreadable.
+        try:
+            fps = reader.fps or 30.0
 
-        counter = 0
-        
-        with tqdm(total=total_frames, desc=f"Processing {input_path}") as pbar:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
+            counter = 0
+            tracker_state = None
+            if checkpoint_path is not None:
+                key = self._video_key(input_path, line_map, checkpoint=True)
+                if resume and os.path.isfile(checkpoint_path):
+                    extra, tracker_state = load_checkpoint(self, checkpoint_path, key)
+                    counter = extra["counter"]
+                    reader.seek(self.frame_index)
 
-                if self.tracker_file is not None:
-                    results = self.model.track(frame, persist=True, verbose=False, tracker=self.tracker_file)
-                else:
-                    results = self.model.track(frame, persist=True, verbose=False)
-                boxes = results[0].boxes
+            # A resumed run only sees part of the video, so it cannot fill the track cache.
+            if self.cache_dir is not None and not TrackCache.exists(cache_path) and self.frame_index == 0:
+                cache_writer = TrackCacheWriter(cache_path, self.model.names, fps)
 
-                # [x1, y1, x2, y2] format
-                xyxys = boxes.xyxy.cpu().numpy()
+            # Line map in the coordinates of the decoded frames, for drawing and motion gating.
+            frame_line_map = line_map
+            if frame_size != reader.source_size:
+                frame_line_map = scale_line_map(
+                    line_map, frame_size[0] / reader.source_size[0], frame_size[1] / reader.source_size[1],
+                )
 
-                if boxes.id is not None:
-                    ids = np.round(boxes.id.cpu().numpy()).astype(int).tolist()
-                else:
-                    ids = [-1] * len(boxes)
-                classes = boxes.cls.cpu().numpy()
+            if output_path is not None:
+                # Keep the timing of the source: every `preview_every`th frame is written.
+                out = open_writer(output_path, fps / preview_every, frame_size, self.video_options)
+
+            gate = None
+            if self.motion_options is not None:
+                from flow_counter.motion import MotionGate
 
-                counter += self._count_crossing_objects(xyxys, ids, classes, line_map)
+                gate = MotionGate(frame_line_map, frame_size, self.motion_options)
+                self.motion_stats = gate.stats
 
-                if self.debug:
-                    annotated_frame = results[0].plot()
+            frames = iter(reader)
+            track, track_idle, extract_tracks, count_crossings, render = (
+                self._track, self._track_idle, self._extract_tracks, self._count_crossing_objects, self._render,
+            )
+            roi = None
+            if self.roi_options is not None:
+                from flow_counter.roi import RoiMosaic
+
+                roi = RoiMosaic(frame_line_map, frame_size, self.roi_options)
+            if self._tracker is not None:
+                detections: deque[Results] = deque()
+                frames = self._detect_batches(frames, detect_batch, detections, gate, roi)
+                # The gate already chose the frames the detector saw.
+                gate = None
+                if roi is None:
+                    track = lambda frame: self._tracker.update(detections.popleft())
                 else:
-                    annotated_frame = results[0].plot(conf=False, labels=False)
-                annotated_frame = self._annotate_frame(annotated_frame, line_map, counter)
+                    track = lambda frame: roi.to_frame(self._tracker.update(detections.popleft()), frame)
+            elif roi is not None:
+                track = lambda frame: roi.to_frame(self._track(roi.crop(frame)), frame)
+                track_idle = lambda frame: roi.to_frame(self._track_idle(roi.crop(frame)), frame)
+            write = out.write if out is not None else None
+            reporter = None
+            if metrics or metrics_path is not None or on_metrics is not None:
+                # Stages are wrapped with timers only here, so runs without metrics pay nothing.
+                self.run_metrics = RunMetrics({"source": input_path})
+                reporter = MetricsReporter(self.run_metrics, metrics_path, on_metrics, metrics_interval)
+                frames = self.run_metrics.timed_iter("decode", frames)
+                track = self.run_metrics.timed("track", track)
+                extract_tracks = self.run_metrics.timed("convert", extract_tracks)
+                count_crossings = self.run_metrics.timed("count", count_crossings)
+                render = self.run_metrics.timed("render", render)
+                if write is not None:
+                    write = self.run_metrics.timed("write", write)
+
+            cls_counts = self.cls_counts
 
-                out.write(annotated_frame)
+            def process(frame: np.ndarray) -> "tuple[Results, int, dict[str, dict[str, int]]] | None":
+                nonlocal counter, cls_counts, tracker_state
+                if tracker_state is not None:
+                    self._resume_tracker(frame if roi is None else roi.crop(frame), tracker_state)
+                    tracker_state = None
+                frame_index = self.frame_index
+                self.frame_timestamp = frame_index / fps
+                if gate is None or gate.check(frame):
+                    result = track(frame)
+                else:
+                    result = track_idle(frame)
+                tracks = extract_tracks(result.boxes)
+                if frame_size != reader.source_size:
+                    tracks = self._to_source_coords(tracks[0], reader), tracks[1], tracks[2]
+                if self._id_offset:
+                    xyxys, ids, classes = tracks
+                    tracks = xyxys, [-1 if i == -1 else i + self._id_offset for i in ids], classes
+                if cache_writer is not None:
+                    cache_writer.append(*tracks)
+                count = count_crossings(*tracks, line_map)
+                counter += count
+                if reporter is not None:
+                    reporter.frame(len(tracks[1]), self._merges, count)
+                if checkpoint_path is not None and self.frame_index % checkpoint_every == 0:
+                    save_checkpoint(self, checkpoint_path, key, {"counter": counter})
+                if pipelined and count:
+                    # The writer thread lags behind, so it draws a snapshot of the counts.
+                    cls_counts = {name: dict(counts) for name, counts in self.cls_counts.items()}
                 pbar.update(1)
+                if out is None or frame_index % preview_every:
+                    return None
+                return result, counter, cls_counts
+
+            def sink(item: "tuple[Results, int, dict[str, dict[str, int]]] | None") -> None:
+                if item is None:
+                    return
+                result, frame_counter, frame_counts = item
+                write(render(result, frame_line_map, frame_counter, frame_counts))
 
-        cap.release()
-        out.release()
+            with tqdm(total=total_frames, initial=self.frame_index, desc=f"Processing {input_path}") as pbar:
+                if pipelined:
+                    cls_counts = {name: dict(counts) for name, counts in self.cls_counts.items()}
+                    self.pipeline_stats = run_pipeline(frames, process, sink, queue_size)
+                else:
+                    for frame in frames:
+                        sink(process(frame))
+        except BaseException:
+            if out is not None:
+                out.abort()
+            self._tracker = None
+            raise
+        finally:
+            reader.release()
+        if out is not None:
+            out.release()
+        if cache_writer is not None:
+            cache_writer.close()
         cv2.destroyAllWindows()
+        if checkpoint_path is not None:
+            save_checkpoint(self, checkpoint_path, key, {"counter": counter})
+        self._tracker = None
+        if reporter is not None:
+            reporter.close()
+        return self.cls_counts
+
+    def object_counts_many(
+        self,
+        input_paths: Iterable[str],
+        line_map: dict[str, tuple[LINE, LINE]],
+        workers: int | None = None,
+        torch_threads: int | None = 1,
+        output_dir: str | None = None,
+    ) -> "BatchReport":
+        """
+        Count many videos in parallel worker processes and merge their counts.
+
+        Each worker loads the model once with the same settings as this counter.
+        Use `flow_counter.batch.iter_object_counts_many` to stream per-video results.
+
+        :param input_paths: Paths to the input video files.
+        :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+        :param workers: Number of worker processes. Defaults to the CPU count.
+                        0 runs the videos one by one in this process.
+        :param torch_threads: Number of torch / OpenCV threads per worker, None to leave unchanged.
+        :param output_dir: If given, annotated videos are written there under the input file names.
+                           Otherwise, counting is headless.
+        :return: Merged counts and per-video results. Failed videos carry an error message.
+        """
+        from flow_counter.batch import object_counts_many
+
+        return object_counts_many(self, input_paths, line_map, workers, torch_threads, output_dir)
+
+    def object_counts_segmented(
+        self,
+        input_path: str,
+        line_map: dict[str, tuple[LINE, LINE]],
+        segments: int | None = None,
+        workers: int | None = None,
+        overlap: int = 30,
+        torch_threads: int | None = 1,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Count one long video by tracking time segments in parallel worker processes.
+
+        Tracks of neighbouring segments are matched by IoU over `overlap` frames tracked by
+        both and merged, so an object crossing a segment boundary is counted exactly once.
+        Counting is headless, and segments are tracked on full frames, frame by frame:
+        counters with `roi_options` or `motion_options` raise ValueError.
+
+        :param input_path: Path to the input video file.
+        :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+        :param segments: Number of segments. Defaults to the number of workers.
+        :param workers: Number of worker processes. Defaults to the CPU count.
+                        0 tracks the segments one by one in this process.
+        :param overlap: Number of frames tracked by both neighbouring segments at each boundary.
+        :param torch_threads: Number of torch / OpenCV threads per worker, None to leave unchanged.
+        :return: Class-wise counts, same as `cls_counts`.
+        """
+        from flow_counter.segments import object_counts_segmented
+
+        return object_counts_segmented(self, input_path, line_map, segments, workers, overlap, torch_threads)
+
+    def stream(
+        self,
+        source: str | int | Iterable[np.ndarray],
+        line_map: dict[str, tuple[LINE, LINE]],
+        buffer_size: int = 1,
+        max_latency: float | None = None,
+        fps: float | None = None,
+    ) -> "StreamCounter":
+        """
+        Count objects on a live stream, e.g. an RTSP URL, a device index or an iterator of frames.
+
+        Use `run(on_event)` on the result to receive CrossingEvents through a callback,
+        or iterate `events()` / `aevents()`. Frames are dropped when counting falls behind.
+
+        :param source: Capture URL, video file, device index, or any iterable of frames
+                       or of (timestamp in seconds, frame) pairs.
+        :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+        :param buffer_size: Maximum number of frames waiting to be counted.
+        :param max_latency: If given, skip frames that waited longer than this many seconds.
+        :param fps: Frame rate of the source, used for event timestamps.
+                    Defaults to the one reported by the capture, if any.
+        """
+        from flow_counter.stream import StreamCounter
+
+        return StreamCounter(self, source, line_map, buffer_size, max_latency, fps)
+
+    def serve(
+        self,
+        streams: dict,
+        max_batch: int | None = None,
+        latency_budget: float | dict | None = None,
+        batch_wait: float = 0.005,
+        buffer_size: int = 1,
+    ) -> "MultiStreamService":
+        """
+        Count many live streams with this counter's model, batching frames across streams.
+
+        Use `run(on_event)` on the result; `on_event` receives the stream name and the CrossingEvent.
+
+        :param streams: (source, line map) of every stream, by name.
+        :param max_batch: Maximum number of frames per forward pass. Defaults to the number of streams.
+        :param latency_budget: Seconds a frame may wait before it is dropped, for all streams or per stream name.
+        :param batch_wait: Seconds to wait for more streams once a frame is ready, to fill batches.
+        :param buffer_size: Maximum number of frames waiting per stream.
+        """
+        from flow_counter.service import MultiStreamService
+
+        return MultiStreamService(self, streams, max_batch, latency_budget, batch_wait, buffer_size)
+
+    def count_tracks(
+        self,
+        tracks: Iterable[TRACKS],
+        line_map: dict[str, tuple[LINE, LINE]],
+        fps: float | None = None,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Count objects from recorded tracker output instead of running the model.
+
+        :param tracks: Iterable of (xyxys, ids, classes) per frame, e.g. a TrackCache.
+        :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+        :param fps: Frame rate of the recording, used for event timestamps.
+        :return: Class-wise counts, same as `cls_counts`.
+        """
+        from tqdm import tqdm
+
+        self._reset()
+        total = len(tracks) if hasattr(tracks, "__len__") else None
+        # Recorded tracks may carry their class names, so that replaying them does not load the model.
+        self._names = getattr(tracks, "names", None)
+        try:
+            for xyxys, ids, classes in tqdm(tracks, total=total, desc="Replaying tracks"):
+                if fps:
+                    self.frame_timestamp = self.frame_index / fps
+                self._count_crossing_objects(xyxys, ids, classes, line_map)
+        finally:
+            self._names = None
+        return self.cls_counts
@@ -0,0 +1,94 @@
+import numpy as np
+
+from flow_counter.utils import bottom_edge_hits, intersect_many
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Concatenate `arange(start, start + count)` for every pair, without a Python loop.
+    """
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+class LineIndex:
+    def __init__(self, lines: np.ndarray, max_cells: int = 256, dense_pairs: int = 4096):
+        """
+        Uniform grid over the bounding boxes of counting lines.
+
+        Box bottom edges are tested only against the lines registered in the grid cells
+        they pass through, so the cost of a frame depends on how many lines are near its
+        boxes rather than on the number of areas. Built once per line map.
+
+        :param lines: Array of counting lines from :func:`line_map_to_array`, shape (L, 2, 2, 2)
+        :param max_cells: Maximum number of grid cells along each axis.
+        :param dense_pairs: Up to this many box-line pairs in a frame, all of them are tested
+                            without the index, which is faster for few boxes and lines.
+        """
+        self.lines = lines
+        self.dense_pairs = dense_pairs
+        segments = lines.reshape(-1, 2, 2)
+        self._starts, self._ends = segments[:, 0], segments[:, 1]
+        self._lo, self._hi = segments.min(axis=1), segments.max(axis=1)
+        if len(segments) == 0:
+            # Nothing to index, every frame takes the dense path.
+            return
+
+        # Cells about as large as a typical line, so a line spans few cells and a cell holds few lines.
+        self._origin = self._lo.min(axis=0)
+        extent = self._hi.max(axis=0) - self._origin + 1
+        typical = max(1, int(np.median((self._hi - self._lo).max(axis=1))))
+        self._cell_size = np.maximum(typical, -(-extent // max_cells))
+        self._shape = -(-extent // self._cell_size)
+
+        # Cells of every segment's bounding box, in cell order (CSR layout).
+        c_lo, c_hi = self._cell(self._lo), self._cell(self._hi)
+        spans = c_hi - c_lo + 1
+        segment_ids = np.repeat(np.arange(len(segments)), spans.prod(axis=1))
+        local = _ranges(np.zeros(len(segments), dtype=np.int64), spans.prod(axis=1))
+        cols = spans[segment_ids, 0]
+        cells = (c_lo[segment_ids, 1] + local // cols) * self._shape[0] + c_lo[segment_ids, 0] + local % cols
+        order = np.argsort(cells, kind="stable")
+        self._cell_segments = segment_ids[order]
+        self._cell_ptr = np.searchsorted(cells[order], np.arange(self._shape.prod() + 1))
+
+    def _cell(self, points: np.ndarray) -> np.ndarray:
+        """
+        Grid cell (column, row) of points, clamped to the grid.
+        """
+        return np.clip((points - self._origin) // self._cell_size, 0, self._shape - 1)
+
+    def hits(self, xyxys: np.ndarray) -> np.ndarray:
+        """
+        Same result as :func:`bottom_edge_hits`, computed only for nearby box-line pairs.
+
+        :param xyxys: Array of bounding boxes [[x1, y1, x2, y2], ...], shape (N, 4)
+        :return: Boolean hit mask of shape (N, L, 2), where [i, j, k] is True if
+                 box i crosses line k of area j.
+        """
+        boxes = np.asarray(xyxys).reshape(-1, 4).astype(np.int64)
+        if len(boxes) * len(self._starts) <= self.dense_pairs:
+            return bottom_edge_hits(boxes, self.lines)
+        hits = np.zeros((len(boxes), len(self.lines), 2), dtype=bool)
+
+        # Cells along each bottom edge, which lies in one row.
+        (ox, oy), (sx, sy), (nx, ny) = self._origin.tolist(), self._cell_size.tolist(), self._shape.tolist()
+        y = boxes[:, 3]
+        left, right = np.minimum(boxes[:, 0], boxes[:, 2]), np.maximum(boxes[:, 0], boxes[:, 2])
+        row = np.clip((y - oy) // sy, 0, ny - 1)
+        c_left = np.clip((left - ox) // sx, 0, nx - 1)
+        spans = np.clip((right - ox) // sx, 0, nx - 1) - c_left + 1
+        box_ids = np.repeat(np.arange(len(boxes)), spans)
+        cells = _ranges(row * nx + c_left, spans)
+
+        # Segments of those cells. One spanning several cells is tested more than once, which is harmless.
+        counts = self._cell_ptr[cells + 1] - self._cell_ptr[cells]
+        box_ids = np.repeat(box_ids, counts)
+        segment_ids = self._cell_segments[_ranges(self._cell_ptr[cells], counts)]
+        lo, hi = self._lo[segment_ids], self._hi[segment_ids]
+        near = (lo[:, 1] <= y[box_ids]) & (y[box_ids] <= hi[:, 1]) & (lo[:, 0] <= right[box_ids]) & (left[box_ids] <= hi[:, 0])
+        box_ids, segment_ids = box_ids[near], segment_ids[near]
+
+        a = np.stack([boxes[box_ids, 0], y[box_ids]], axis=-1)
+        b = np.stack([boxes[box_ids, 2], y[box_ids]], axis=-1)
+        crossed = intersect_many(a, b, self._starts[segment_ids], self._ends[segment_ids])
+        hits.reshape(len(boxes), -1)[box_ids[crossed], segment_ids[crossed]] = True
+        return hits
@@ -0,0 +1,221 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import functools
+import os
+import time
+from typing import Callable, Iterable, Iterator
+
+# Upper bounds of the stage timing buckets, in seconds.
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Upper bounds of the detections-per-frame buckets.
+DETECTION_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Stages of object_counts, in order.
+STAGES = ("decode", "track", "convert", "count", "render", "write")
+
+def _escape_label_value(value) -> str:
+    """
+    Escape a label value for the Prometheus text format: backslash, double quote and newline.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+@dataclass
+class Histogram:
+    """
+    Histogram with fixed bucket bounds, in the form Prometheus expects.
+
+    counts[i] is the number of observations v with bounds[i - 1] < v <= bounds[i];
+    the last entry counts observations above every bound.
+    """
+    bounds: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+    max: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-quantile, or `max` if it is above every bound.
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return bound
+        return self.max
+
+class RunMetrics:
+    def __init__(self, labels: dict[str, str] | None = None):
+        """
+        Per-stage timings and throughput of an object_counts run.
+
+        :param labels: Labels added to every exported metric, e.g. {"source": "cam1"}.
+        """
+        self.labels = labels or {}
+        self.stages = {stage: Histogram(SECONDS_BUCKETS) for stage in STAGES}
+        self.detections = Histogram(DETECTION_BUCKETS)
+        self.frames = 0
+        self.merges = 0
+        self.counted = 0
+        self.start_time = time.perf_counter()
+        self.end_time: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    @property
+    def fps(self) -> float:
+        """
+        Effective frames per second over the whole run.
+        """
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def timed(self, stage: str, fn: Callable) -> Callable:
+        """
+        Wrap a function so that each call is recorded in the histogram of `stage`.
+        """
+        histogram = self.stages[stage]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    def timed_iter(self, stage: str, items: Iterable) -> Iterator:
+        """
+        Wrap an iterator so that producing each item is recorded in the histogram of `stage`.
+        """
+        histogram = self.stages[stage]
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            histogram.observe(time.perf_counter() - start)
+            yield item
+
+    def to_prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        def labels(**extra) -> str:
+            items = {**self.labels, **extra}
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in items.items()) + "}"
+
+        def histogram(name: str, hist: Histogram, **extra) -> list[str]:
+            lines, cumulative = [], 0
+            for bound, count in zip(hist.bounds, hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{labels(**extra, le=f'{bound:g}')} {cumulative}")
+            lines.append(f"{name}_bucket{labels(**extra, le='+Inf')} {hist.count}")
+            lines.append(f"{name}_sum{labels(**extra)} {hist.sum:.9g}")
+            lines.append(f"{name}_count{labels(**extra)} {hist.count}")
+            return lines
+
+        lines = [
+            "# HELP flow_counter_stage_seconds Time spent per frame in each stage.",
+            "# TYPE flow_counter_stage_seconds histogram",
+        ]
+        for stage, hist in self.stages.items():
+            lines += histogram("flow_counter_stage_seconds", hist, stage=stage)
+        lines += [
+            "# HELP flow_counter_detections Tracked boxes per frame.",
+            "# TYPE flow_counter_detections histogram",
+        ]
+        lines += histogram("flow_counter_detections", self.detections)
+        for name, kind, description, value in (
+            ("flow_counter_frames_total", "counter", "Frames processed.", self.frames),
+            ("flow_counter_union_find_merges_total", "counter", "Track merges of suppressed duplicates.", self.merges),
+            ("flow_counter_counted_total", "counter", "Objects counted.", self.counted),
+            ("flow_counter_fps", "gauge", "Effective frames per second.", f"{self.fps:.6g}"),
+        ):
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name}{labels()} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Atomically write the metrics as a Prometheus text file, e.g. for the node exporter's textfile collector.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+class MetricsReporter:
+    def __init__(
+        self,
+        metrics: RunMetrics,
+        path: str | None = None,
+        hook: Callable[[RunMetrics], None] | None = None,
+        interval: float = 10.0,
+    ):
+        """
+        Periodically export metrics to a Prometheus text file and / or a hook.
+
+        :param metrics: Metrics of the run.
+        :param path: Prometheus text file, rewritten every `interval` seconds.
+        :param hook: Called with the metrics every `interval` seconds.
+        :param interval: Seconds between exports.
+        """
+        self.metrics = metrics
+        self.path = path
+        self.hook = hook
+        self.interval = interval
+        self._next_report = time.perf_counter() + interval
+
+    def frame(self, detections: int, merges: int, counted: int) -> None:
+        """
+        Record a processed frame and export if the interval has passed.
+
+        :param detections: Number of tracked boxes in the frame.
+        :param merges: Total number of union-find merges so far.
+        :param counted: Number of objects counted in the frame.
+        """
+        metrics = self.metrics
+        metrics.frames += 1
+        metrics.merges = merges
+        metrics.counted += counted
+        metrics.detections.observe(detections)
+        if time.perf_counter() >= self._next_report:
+            self.report()
+
+    def report(self) -> None:
+        self._next_report = time.perf_counter() + self.interval
+        if self.path is not None:
+            self.metrics.write_prometheus(self.path)
+        if self.hook is not None:
+            self.hook(self.metrics)
+
+    def close(self) -> None:
+        """
+        Mark the end of the run and export the final metrics.
+        """
+        self.metrics.end_time = time.perf_counter()
+        self.report()
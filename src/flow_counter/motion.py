@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+@dataclass
+class MotionOptions:
+    """
+    Settings of motion-gated inference.
+
+    :param method: "diff" compares each frame with the last frame the detector ran on.
+                   "background" compares it with a running average of all frames, which
+                   absorbs objects that stop, e.g. parked cars, after a while.
+    :param band: Pixels around each line, in source coordinates, in which motion is measured.
+                 The area between the two lines of an area is always included.
+    :param downscale: Frames are shrunk by this factor before measuring motion.
+    :param threshold: Minimum change of a grayscale pixel (0-255) to count as moving.
+    :param min_fraction: Minimum fraction of moving pixels in the bands to run the detector.
+    :param alpha: Learning rate of the running average of the "background" method.
+    :param keepalive: Run the detector at least every this many frames, so that tracks of
+                      objects standing still near a line are not dropped by the tracker.
+                      Should be shorter than the tracker's track buffer.
+    """
+    method: str = "diff"
+    band: int = 48
+    downscale: int = 4
+    threshold: int = 20
+    min_fraction: float = 0.001
+    alpha: float = 0.05
+    keepalive: int = 15
+
+@dataclass
+class MotionStats:
+    """
+    Statistics of a motion-gated run.
+    """
+    frames: int = 0
+    skipped: int = 0
+    keepalives: int = 0
+
+    @property
+    def skip_ratio(self) -> float:
+        """
+        Fraction of frames on which the detector did not run.
+        """
+        return self.skipped / self.frames if self.frames else 0.0
+
+class MotionGate:
+    def __init__(
+        self,
+        line_map: dict[str, tuple[LINE, LINE]],
+        frame_size: tuple[int, int],
+        options: MotionOptions | None = None,
+    ):
+        """
+        Cheap pre-filter telling whether anything moves near the counting lines.
+
+        Motion is measured on a downscaled grayscale copy of each frame, inside a band
+        around the lines of every area of `line_map`.
+
+        :param line_map: Line map in the coordinates of the frames passed to `check`.
+        :param frame_size: Frame size (width, height).
+        :param options: Gating settings.
+        """
+        if options is None:
+            options = MotionOptions()
+        if options.method not in ("diff", "background"):
+            raise ValueError(f"Unknown motion gating method: {options.method}")
+        self.options = options
+        width, height = frame_size
+        self.size = (max(1, round(width / options.downscale)), max(1, round(height / options.downscale)))
+        sx, sy = self.size[0] / width, self.size[1] / height
+        thickness = max(1, round(2 * options.band * min(sx, sy)))
+
+        mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+        for line1, line2 in line_map.values():
+            points = np.round(np.array([*line1, *line2], dtype=np.float64) * (sx, sy)).astype(np.int32)
+            cv2.fillConvexPoly(mask, cv2.convexHull(points), 255)
+            for start, end in (points[:2], points[2:]):
+                cv2.line(mask, tuple(start.tolist()), tuple(end.tolist()), 255, thickness)
+        self.mask = mask
+        self.mask_pixels = max(1, cv2.countNonZero(mask))
+
+        self.stats = MotionStats()
+        self._reference: np.ndarray | None = None
+        self._background: np.ndarray | None = None
+        self._since_inference = 0
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        # Bilinear sampling is much cheaper than area averaging, and the threshold absorbs its noise.
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def moving_fraction(self, gray: np.ndarray, reference: np.ndarray) -> float:
+        """
+        Fraction of the band pixels that changed by more than the threshold.
+        """
+        _, changed = cv2.threshold(cv2.absdiff(gray, reference), self.options.threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(cv2.bitwise_and(changed, self.mask)) / self.mask_pixels
+
+    def check(self, frame: np.ndarray) -> bool:
+        """
+        Decide whether the detector must run on a frame.
+
+        :param frame: The next frame of the video, in order.
+        :return: False if nothing moves near the lines and the detector can be skipped.
+        """
+        gray = self._gray(frame)
+        self.stats.frames += 1
+        if self.options.method == "background":
+            reference = None
+            if self._background is None:
+                self._background = gray.astype(np.float32)
+            else:
+                reference = cv2.convertScaleAbs(self._background)
+                cv2.accumulateWeighted(gray, self._background, self.options.alpha)
+        else:
+            reference = self._reference
+
+        run = reference is None or self.moving_fraction(gray, reference) >= self.options.min_fraction
+        if not run and self._since_inference + 1 >= self.options.keepalive:
+            run = True
+            self.stats.keepalives += 1
+        if run:
+            self._since_inference = 0
+            self._reference = gray
+        else:
+            self._since_inference += 1
+            self.stats.skipped += 1
+        return run
@@ -0,0 +1,89 @@
+import copy
+from typing import Callable
+
+import numpy as np
+
+class Layer:
+    def __init__(self, shape: tuple[int, ...], draw: Callable[[np.ndarray], object]):
+        """
+        Pixels drawn by OpenCV drawing calls, ready to be composited onto frames.
+
+        `draw` is run on a black and on a white canvas. Pixels equal on both were drawn
+        opaquely, whatever their color, and are kept as a dense block of their bounding
+        region. Pixels that differ by less than 255 were blended, e.g. anti-aliased text
+        edges; their color and transparency are recovered from the two canvases and kept
+        sparsely.
+
+        :param shape: Shape of the canvas, (height, width, channels).
+        :param draw: Draws onto the given canvas in place.
+        """
+        black = np.zeros(shape, dtype=np.uint8)
+        white = np.full(shape, 255, dtype=np.uint8)
+        draw(black)
+        draw(white)
+        # 0 where drawn opaquely, 255 where untouched.
+        transparency = white - black
+        opaque = (transparency == 0).all(axis=2)
+        blended = ~opaque & (transparency != 255).any(axis=2)
+
+        ys, xs = np.nonzero(opaque)
+        if len(ys) == 0:
+            self.region = (slice(0, 0), slice(0, 0))
+        else:
+            self.region = (slice(ys.min(), ys.max() + 1), slice(xs.min(), xs.max() + 1))
+        self.pixels = black[self.region]
+        self.mask = opaque[self.region]
+        # Tables are usually fully opaque over their region, which allows a plain copy.
+        self.opaque = bool(self.mask.all())
+
+        self.blend_ys, self.blend_xs = np.nonzero(blended)
+        self.blend_pixels = black[self.blend_ys, self.blend_xs].astype(np.uint16)
+        self.blend_transparency = transparency[self.blend_ys, self.blend_xs].astype(np.uint16)
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """
+        Draw the layer onto an image in place with one vectorized copy of its region,
+        plus one vectorized blend of its partially transparent pixels.
+        """
+        if self.opaque:
+            image[self.region] = self.pixels
+        else:
+            np.copyto(image[self.region], self.pixels, where=self.mask[..., None])
+        if len(self.blend_ys):
+            background = image[self.blend_ys, self.blend_xs]
+            image[self.blend_ys, self.blend_xs] = self.blend_pixels + (self.blend_transparency * background + 127) // 255
+        return image
+
+class OverlayCache:
+    def __init__(self):
+        """
+        Pre-rendered layer re-rendered only when its key changes, e.g. the count table
+        re-rendered only when the counts change.
+        """
+        self._key = None
+        self._shape = None
+        self._layer: Layer | None = None
+
+    def apply(
+        self,
+        image: np.ndarray,
+        key: object,
+        draw: Callable[[np.ndarray], object],
+        size: tuple[int, int],
+    ) -> np.ndarray:
+        """
+        Draw the cached layer onto an image, re-rendering it if `key` changed.
+
+        :param image: Frame to draw on, in place.
+        :param key: Identifies what `draw` draws, e.g. the table contents.
+        :param draw: Draws onto a canvas of `size`, anchored at the top-left corner of the image.
+        :param size: Size (width, height) of a canvas holding everything `draw` draws.
+        :return: The image.
+        """
+        width, height = size
+        shape = (min(height, image.shape[0]), min(width, image.shape[1]), image.shape[2])
+        if self._layer is None or shape != self._shape or key != self._key:
+            self._key = copy.deepcopy(key)
+            self._shape = shape
+            self._layer = Layer(shape, draw)
+        return self._layer.apply(image)
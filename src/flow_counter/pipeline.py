@@ -0,0 +1,161 @@
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+# Marks the end of a stream in the queues.
+_END = object()
+
+@dataclass
+class StageStats:
+    """
+    Timing of one pipeline stage in seconds.
+
+    busy_time is spent doing work, stall_time waiting on an empty input queue
+    or a full output queue.
+    """
+    items: int = 0
+    busy_time: float = 0.0
+    stall_time: float = 0.0
+
+@dataclass
+class QueueStats:
+    """
+    Depth of a queue, sampled every time an item is put.
+    """
+    maxsize: int = 0
+    max_depth: int = 0
+    total_depth: int = 0
+    samples: int = 0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.total_depth / self.samples if self.samples else 0.0
+
+    def sample(self, depth: int) -> None:
+        self.max_depth = max(self.max_depth, depth)
+        self.total_depth += depth
+        self.samples += 1
+
+@dataclass
+class PipelineStats:
+    """
+    Per-stage and per-queue statistics of a pipelined run.
+    """
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    queues: dict[str, QueueStats] = field(default_factory=dict)
+
+def _put(q: queue.Queue, item: Any, stage: StageStats, q_stats: QueueStats, stop: threading.Event) -> bool:
+    """
+    Put an item, blocking while the queue is full. Returns False if the pipeline was stopped.
+    """
+    start = time.perf_counter()
+    while True:
+        try:
+            q.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            if stop.is_set():
+                return False
+    stage.stall_time += time.perf_counter() - start
+    q_stats.sample(q.qsize())
+    return True
+
+def _get(q: queue.Queue, stage: StageStats, stop: threading.Event) -> Any:
+    """
+    Get an item, blocking while the queue is empty. Returns _END if the pipeline was stopped.
+    """
+    start = time.perf_counter()
+    while True:
+        try:
+            item = q.get(timeout=0.1)
+            break
+        except queue.Empty:
+            if stop.is_set():
+                return _END
+    stage.stall_time += time.perf_counter() - start
+    return item
+
+def run_pipeline(
+    source: Iterable,
+    process: Callable[[Any], Any],
+    sink: Callable[[Any], None],
+    queue_size: int = 8,
+) -> PipelineStats:
+    """
+    Run source -> process -> sink as three stages connected by bounded queues.
+
+    The source is iterated on a decoder thread, `process` runs on the calling thread
+    and `sink` on a writer thread. Items reach the sink in source order, and a full
+    queue blocks the upstream stage (backpressure). An exception in any stage stops
+    the pipeline and is re-raised here.
+
+    :param source: Iterable of input items, e.g. decoded frames.
+    :param process: Function applied to each item in order, e.g. inference and counting.
+    :param sink: Function consuming each processed item in order, e.g. annotate and encode.
+    :param queue_size: Maximum number of items waiting between two stages.
+    :return: Statistics of the run.
+    """
+    stats = PipelineStats(
+        stages={"decode": StageStats(), "process": StageStats(), "encode": StageStats()},
+        queues={"decode": QueueStats(maxsize=queue_size), "encode": QueueStats(maxsize=queue_size)},
+    )
+    decode_stats, process_stats, encode_stats = stats.stages.values()
+    in_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    out_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def decode() -> None:
+        try:
+            iterator = iter(source)
+            while True:
+                start = time.perf_counter()
+                item = next(iterator, _END)
+                if item is _END:
+                    break
+                decode_stats.busy_time += time.perf_counter() - start
+                decode_stats.items += 1
+                if not _put(in_q, item, decode_stats, stats.queues["decode"], stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        _put(in_q, _END, decode_stats, stats.queues["decode"], stop)
+
+    def encode() -> None:
+        try:
+            while (item := _get(out_q, encode_stats, stop)) is not _END:
+                start = time.perf_counter()
+                sink(item)
+                encode_stats.busy_time += time.perf_counter() - start
+                encode_stats.items += 1
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    decoder = threading.Thread(target=decode, name="flow-counter-decode", daemon=True)
+    writer = threading.Thread(target=encode, name="flow-counter-encode", daemon=True)
+    decoder.start()
+    writer.start()
+    try:
+        while (item := _get(in_q, process_stats, stop)) is not _END:
+            start = time.perf_counter()
+            result = process(item)
+            process_stats.busy_time += time.perf_counter() - start
+            process_stats.items += 1
+            if not _put(out_q, result, process_stats, stats.queues["encode"], stop):
+                break
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(out_q, _END, process_stats, stats.queues["encode"], stop)
+        writer.join()
+        stop.set()
+        decoder.join()
+
+    if errors:
+        raise errors[0]
+    return stats
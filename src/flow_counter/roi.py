@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+RECT = tuple[int, int, int, int]
+
+@dataclass
+class RoiOptions:
+    """
+    Settings of region-of-interest inference.
+
+    :param padding: Pixels added left, right and below the lines of each area.
+    :param headroom: Pixels added above the lines of each area, so that objects whose
+                     bottom edge is on a line are fully visible to the detector.
+    :param max_crops: Maximum number of crops. Nearest crops are merged beyond this.
+    :param gap: Black pixels between crops in the mosaic, so no object spans two crops.
+    """
+    padding: int = 64
+    headroom: int = 256
+    max_crops: int = 4
+    gap: int = 32
+
+def _area(rect: RECT) -> int:
+    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+def _union(a: RECT, b: RECT) -> RECT:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+def _overlaps(a: RECT, b: RECT) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def roi_rects(
+    line_map: dict[str, tuple[LINE, LINE]],
+    frame_size: tuple[int, int],
+    options: RoiOptions | None = None,
+) -> list[RECT]:
+    """
+    Find the crops (x1, y1, x2, y2) of a frame covering all counting lines.
+
+    Each area gets the padded bounding box of its two lines. Overlapping boxes, and boxes
+    whose union costs no extra pixels, are merged; beyond `max_crops`, the pair whose union
+    adds the fewest pixels is merged first.
+
+    :param line_map: Line map in frame coordinates.
+    :param frame_size: Frame size (width, height).
+    :param options: ROI settings.
+    :return: Crops, clipped to the frame.
+    """
+    if options is None:
+        options = RoiOptions()
+    width, height = frame_size
+    rects = []
+    for line1, line2 in line_map.values():
+        xs = [p[0] for p in (*line1, *line2)]
+        ys = [p[1] for p in (*line1, *line2)]
+        rects.append((
+            max(0, int(min(xs)) - options.padding),
+            max(0, int(min(ys)) - options.headroom),
+            min(width, int(max(xs)) + options.padding),
+            min(height, int(max(ys)) + options.padding),
+        ))
+    if not rects:
+        return [(0, 0, width, height)]
+
+    while len(rects) > 1:
+        pairs = [(i, j) for i in range(len(rects)) for j in range(i + 1, len(rects))]
+        overlapping = [(i, j) for i, j in pairs if _overlaps(rects[i], rects[j])]
+        if overlapping:
+            i, j = overlapping[0]
+        else:
+            cost, i, j = min((_area(_union(rects[i], rects[j])) - _area(rects[i]) - _area(rects[j]), i, j) for i, j in pairs)
+            if cost > 0 and len(rects) <= options.max_crops:
+                break
+        rects[i] = _union(rects[i], rects[j])
+        del rects[j]
+    return rects
+
+class RoiMosaic:
+    def __init__(
+        self,
+        line_map: dict[str, tuple[LINE, LINE]],
+        frame_size: tuple[int, int],
+        options: RoiOptions | None = None,
+    ):
+        """
+        Packs the crops around the counting lines into one image for the detector.
+
+        The layout is the same for every frame, so the tracker sees consistent coordinates.
+        A single crop is passed as it is.
+
+        :param line_map: Line map in frame coordinates.
+        :param frame_size: Frame size (width, height).
+        :param options: ROI settings.
+        """
+        if options is None:
+            options = RoiOptions()
+        self.rects = roi_rects(line_map, frame_size, options)
+        widths = [x2 - x1 for x1, _, x2, _ in self.rects]
+        heights = [y2 - y1 for _, y1, _, y2 in self.rects]
+        gaps = options.gap * (len(self.rects) - 1)
+        # Stack the crops along the axis that wastes fewer pixels.
+        if max(widths) * (sum(heights) + gaps) <= (sum(widths) + gaps) * max(heights):
+            self.offsets = [(0, sum(heights[:k]) + k * options.gap) for k in range(len(self.rects))]
+            shape = (sum(heights) + gaps, max(widths), 3)
+        else:
+            self.offsets = [(sum(widths[:k]) + k * options.gap, 0) for k in range(len(self.rects))]
+            shape = (max(heights), sum(widths) + gaps, 3)
+        self._mosaic = np.zeros(shape, dtype=np.uint8) if len(self.rects) > 1 else None
+
+    @property
+    def pixels(self) -> int:
+        """
+        Number of pixels passed to the detector per frame.
+        """
+        if self._mosaic is None:
+            return _area(self.rects[0])
+        return self._mosaic.shape[0] * self._mosaic.shape[1]
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Cut the crops out of a frame. The returned image is reused by the next call.
+        """
+        if self._mosaic is None:
+            x1, y1, x2, y2 = self.rects[0]
+            return np.ascontiguousarray(frame[y1:y2, x1:x2])
+        for (x1, y1, x2, y2), (ox, oy) in zip(self.rects, self.offsets):
+            self._mosaic[oy:oy + y2 - y1, ox:ox + x2 - x1] = frame[y1:y2, x1:x2]
+        return self._mosaic
+
+    def to_frame(self, result: Results, frame: np.ndarray) -> Results:
+        """
+        Map a result on the cropped image back to the full frame.
+
+        Boxes are assigned to the crop holding their center, clipped to it and shifted
+        to frame coordinates. Boxes centered in the gaps are dropped.
+
+        :param result: Result of the image returned by `crop`.
+        :param frame: The full frame.
+        :return: Result of the full frame, e.g. for rendering.
+        """
+        data = result.boxes.data.clone()
+        keep = torch.zeros(len(data), dtype=torch.bool, device=data.device)
+        if len(data):
+            cx = (data[:, 0] + data[:, 2]) / 2
+            cy = (data[:, 1] + data[:, 3]) / 2
+            for (x1, y1, x2, y2), (ox, oy) in zip(self.rects, self.offsets):
+                inside = (cx >= ox) & (cx < ox + x2 - x1) & (cy >= oy) & (cy < oy + y2 - y1)
+                if not inside.any():
+                    continue
+                boxes = data[inside, :4]
+                boxes[:, 0::2] = boxes[:, 0::2].clamp(ox, ox + x2 - x1) + (x1 - ox)
+                boxes[:, 1::2] = boxes[:, 1::2].clamp(oy, oy + y2 - y1) + (y1 - oy)
+                data[inside, :4] = boxes
+                keep |= inside
+        return Results(frame, path=result.path, names=result.names, boxes=data[keep])
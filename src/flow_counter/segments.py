@@ -0,0 +1,200 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import itertools
+import math
+import multiprocessing
+import os
+import tempfile
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from flow_counter import batch
+from flow_counter.flow_counter import LINE, FlowCounter
+from flow_counter.track_cache import TRACKS, TrackCache, TrackCacheWriter
+from flow_counter.union_find import DictUnionFind
+from flow_counter.utils import compute_iou_matrix
+
+# Track IDs of segment k are mapped to k * ID_STRIDE + id to keep them unique.
+ID_STRIDE = 1 << 32
+
+@dataclass
+class Segment:
+    """
+    A time segment of a video.
+
+    The segment owns frames [start, end) and is tracked from `read_start`, `overlap`
+    frames earlier, so its tracks can be matched with the previous segment's.
+    `end` is None for the last segment, which runs until the end of the video.
+    """
+    index: int
+    start: int
+    end: int | None
+    read_start: int
+
+def plan_segments(total_frames: int, num_segments: int, overlap: int) -> list[Segment]:
+    """
+    Split a video into consecutive segments of (almost) equal length.
+
+    :param total_frames: Number of frames in the video.
+    :param num_segments: Desired number of segments.
+    :param overlap: Number of frames tracked before each segment's start.
+    :return: List of segments in order.
+    """
+    length = max(1, math.ceil(total_frames / max(1, num_segments)))
+    starts = list(range(0, max(total_frames, 1), length))
+    return [
+        Segment(
+            index=k,
+            start=start,
+            end=starts[k + 1] if k + 1 < len(starts) else None,
+            read_start=max(0, start - overlap),
+        )
+        for k, start in enumerate(starts)
+    ]
+
+def _track_segment(counter: FlowCounter, input_path: str, segment: Segment, work_dir: str) -> str:
+    """
+    Track the frames of one segment and write them to a track cache.
+
+    :return: Path of the track cache.
+    """
+    counter._reset_tracker()
+    reader, _, _ = counter._open_video(input_path)
+    reader.seek(segment.read_start)
+    num_frames = None if segment.end is None else segment.end - segment.read_start
+
+    path = os.path.join(work_dir, f"segment_{segment.index:05d}")
+    writer = TrackCacheWriter(path, counter.model.names, reader.fps)
+    for frame in itertools.islice(reader, num_frames):
+        xyxys, ids, classes = counter._extract_tracks(counter._track(frame).boxes)
+        writer.append(counter._to_source_coords(xyxys, reader), ids, classes)
+    reader.release()
+    writer.close()
+    return path
+
+def _track_segment_in_worker(input_path: str, segment: Segment, work_dir: str) -> str:
+    return _track_segment(batch._worker_counter, input_path, segment, work_dir)
+
+def match_tracks(
+    prev_frames: Iterable[TRACKS],
+    next_frames: Iterable[TRACKS],
+    iou_threshold: float = 0.5,
+) -> list[tuple[int, int]]:
+    """
+    Match track IDs of two segments over the frames both of them tracked.
+
+    Every frame in which two boxes of the same class overlap with IoU >= iou_threshold
+    is a vote for the pair of IDs. Pairs are then matched one-to-one, most votes first.
+
+    :param prev_frames: Tracks of the earlier segment in the overlap window.
+    :param next_frames: Tracks of the later segment for the same frames.
+    :param iou_threshold: Minimum IoU for two boxes to be the same object.
+    :return: List of (previous ID, next ID) pairs.
+    """
+    votes: Counter = Counter()
+    for (prev_xyxys, prev_ids, prev_classes), (next_xyxys, next_ids, next_classes) in zip(prev_frames, next_frames):
+        if len(prev_ids) == 0 or len(next_ids) == 0:
+            continue
+        ious = compute_iou_matrix(prev_xyxys, next_xyxys)
+        for i, j in zip(*np.nonzero(ious >= iou_threshold)):
+            if prev_ids[i] != -1 and next_ids[j] != -1 and prev_classes[i] == next_classes[j]:
+                votes[(prev_ids[i], next_ids[j])] += 1
+
+    matched_prev, matched_next, pairs = set(), set(), []
+    for (prev_id, next_id), _ in votes.most_common():
+        if prev_id in matched_prev or next_id in matched_next:
+            continue
+        matched_prev.add(prev_id)
+        matched_next.add(next_id)
+        pairs.append((prev_id, next_id))
+    return pairs
+
+def stitch_segments(
+    segments: list[Segment],
+    caches: list[TrackCache],
+    iou_threshold: float = 0.5,
+) -> Iterator[TRACKS]:
+    """
+    Join the tracks of consecutive segments into one stream with consistent IDs.
+
+    Tracks matched in an overlap window are merged with a DictUnionFind, so an object
+    crossing a segment boundary keeps a single ID and is counted exactly once.
+    Each segment contributes only the frames it owns.
+
+    :param segments: Segments from `plan_segments`.
+    :param caches: Track cache of each segment.
+    :param iou_threshold: Minimum IoU for two boxes to be the same object.
+    :return: Iterator of (xyxys, ids, classes) for every frame of the video.
+    """
+    uf = DictUnionFind()
+    for prev, cur in zip(segments[:-1], segments[1:]):
+        prev_frames = itertools.islice(caches[prev.index], cur.read_start - prev.read_start, cur.start - prev.read_start)
+        cur_frames = itertools.islice(caches[cur.index], cur.start - cur.read_start)
+        for prev_id, cur_id in match_tracks(prev_frames, cur_frames, iou_threshold):
+            uf.unite(prev.index * ID_STRIDE + prev_id, cur.index * ID_STRIDE + cur_id)
+
+    for segment in segments:
+        offset = segment.index * ID_STRIDE
+        for xyxys, ids, classes in itertools.islice(caches[segment.index], segment.start - segment.read_start, None):
+            yield xyxys, [-1 if i == -1 else uf.find(offset + i) for i in ids], classes
+
+def object_counts_segmented(
+    counter: FlowCounter,
+    input_path: str,
+    line_map: dict[str, tuple[LINE, LINE]],
+    segments: int | None = None,
+    workers: int | None = None,
+    overlap: int = 30,
+    torch_threads: int | None = 1,
+    iou_threshold: float = 0.5,
+    work_dir: str | None = None,
+) -> dict[str, dict[str, int]]:
+    """
+    Count one long video by tracking time segments in parallel and stitching the tracks.
+
+    Tracking, the expensive part, runs in worker processes. The stitched tracks are then
+    counted in order by `counter`, which is cheap.
+
+    Segments are tracked on full frames, frame by frame, with the counter's model, tracker,
+    decode-side downscaling and inference backend. Region-of-interest inference and motion
+    gating are not supported, as their crops and skipped frames would differ from one segment
+    to the next, so counters with `roi_options` or `motion_options` raise ValueError.
+
+    :param counter: Counter whose settings are used in the workers and which counts the result.
+    :param input_path: Path to the input video file.
+    :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+    :param segments: Number of segments. Defaults to the number of workers.
+    :param workers: Number of worker processes. Defaults to the CPU count.
+                    0 tracks the segments one by one in this process.
+    :param overlap: Number of frames tracked by both neighbouring segments at each boundary.
+    :param torch_threads: Number of torch / OpenCV threads per worker, None to leave unchanged.
+    :param iou_threshold: Minimum IoU for tracks in the overlap to be the same object.
+    :param work_dir: Directory for temporary segment track caches.
+    :return: Class-wise counts, same as `counter.cls_counts`.
+    """
+    if counter.roi_options is not None or counter.motion_options is not None:
+        raise ValueError("object_counts_segmented does not support roi_options or motion_options")
+    reader, total_frames, _ = counter._open_video(input_path)
+    reader.release()
+    plan = plan_segments(total_frames, segments or workers or os.cpu_count() or 1, overlap)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        if workers == 0:
+            paths = [_track_segment(counter, input_path, segment, tmp_dir) for segment in plan]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=batch._init_worker,
+                initargs=(counter._init_kwargs, torch_threads),
+            ) as executor:
+                futures = [
+                    executor.submit(_track_segment_in_worker, input_path, segment, tmp_dir)
+                    for segment in plan
+                ]
+                paths = [future.result() for future in futures]
+
+        caches = [TrackCache(path) for path in paths]
+        return counter.count_tracks(stitch_segments(plan, caches, iou_threshold), line_map, caches[0].fps)
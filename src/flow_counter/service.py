@@ -0,0 +1,222 @@
+import copy
+from dataclasses import dataclass
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Hashable, Iterable, Iterator, Mapping
+
+import cv2
+import numpy as np
+
+from flow_counter.events import CrossingEvent
+from flow_counter.stream import StreamCounter
+from flow_counter.tracking import TRACK_CONF, Tracker
+from flow_counter.utils import Point
+
+if TYPE_CHECKING:
+    from flow_counter.flow_counter import FlowCounter
+
+LINE = tuple[Point, Point]
+LINE_MAP = dict[str, tuple[LINE, LINE]]
+SOURCE = str | int | Iterable[np.ndarray]
+
+@dataclass
+class ServiceStats:
+    """
+    Batching statistics of a multi-stream run. Per-stream statistics are in each stream's `stats`.
+    """
+    batches: int = 0
+    frames: int = 0
+    max_batch_size: int = 0
+    start_time: float = 0.0
+    end_time: float = 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.frames / self.batches if self.batches else 0.0
+
+    @property
+    def fps(self) -> float:
+        """
+        Aggregate frames per second over all streams.
+        """
+        elapsed = self.end_time - self.start_time
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+def replay_video(path: str, realtime: bool = True) -> Iterator[np.ndarray]:
+    """
+    Yield the frames of a video file, paced at its frame rate like a live camera if `realtime`.
+    Useful to run a service locally on recorded videos.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video: {path}")
+    interval = 1 / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+    next_time = time.perf_counter()
+    try:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            if realtime:
+                next_time += interval
+                time.sleep(max(0.0, next_time - time.perf_counter()))
+            yield frame
+    finally:
+        cap.release()
+
+class MultiStreamService:
+    def __init__(
+        self,
+        flow_counter: "FlowCounter",
+        streams: Mapping[Hashable, tuple[SOURCE, LINE_MAP]],
+        max_batch: int | None = None,
+        latency_budget: float | Mapping[Hashable, float] | None = None,
+        batch_wait: float = 0.005,
+        buffer_size: int = 1,
+    ):
+        """
+        Count many streams with one shared detector, batching their frames.
+
+        Each stream is read on its own thread like `StreamCounter`, and keeps its own
+        tracker and counting state (a copy of `flow_counter` sharing its model). Frames
+        of up to `max_batch` streams go through the detector in one forward pass.
+        Streams are served earliest deadline first: the frame closest to its stream's
+        latency budget goes into the next batch, which takes at most one frame per stream,
+        so a busy stream cannot starve the others. Frames past their budget are dropped.
+        Per-stream trackers are `tracking.Tracker`s and need the ultralytics floor of
+        pyproject.toml. Before ultralytics 8.4.176 all trackers draw track IDs from one
+        counter, so IDs are unique across streams but not consecutive within one.
+
+        :param flow_counter: Counter whose model and settings are used.
+        :param streams: Source (capture URL, video file, device index or iterable of frames)
+                        and line map of every stream, by name.
+        :param max_batch: Maximum number of frames per forward pass. Defaults to the number of streams.
+        :param latency_budget: Seconds a frame may wait before it is dropped, for all streams
+                               or per stream name. None never drops waiting frames.
+        :param batch_wait: Seconds to wait for more streams once a frame is ready, to fill batches.
+        :param buffer_size: Maximum number of frames waiting per stream.
+        """
+        if not isinstance(latency_budget, Mapping):
+            latency_budget = {name: latency_budget for name in streams}
+        self.flow_counter = flow_counter
+        self.max_batch = max_batch or max(1, len(streams))
+        self.batch_wait = batch_wait
+        self.stats = ServiceStats()
+        self._ready = threading.Condition()
+        self._stop = threading.Event()
+
+        self.streams: dict[Hashable, StreamCounter] = {}
+        self.trackers: dict[Hashable, Tracker] = {}
+        for name, (source, line_map) in streams.items():
+            counter = copy.copy(flow_counter)
+            counter.event_listeners = []
+            counter._reset()
+            stream = StreamCounter(counter, source, line_map, buffer_size, latency_budget.get(name))
+            # Every reader notifies the service, which waits for any of them.
+            stream._ready = self._ready
+            self.streams[name] = stream
+            self.trackers[name] = Tracker(flow_counter.tracker_file)
+
+    def stop(self) -> None:
+        """
+        Stop reading all streams. `run` returns after the batch being counted.
+        """
+        self._stop.set()
+        for stream in self.streams.values():
+            stream.stop()
+
+    def _deadline(self, stream: StreamCounter) -> float:
+        # Measured from the stream's oldest uncounted frame, even if a newer one replaced it,
+        # so a stream whose frames always arrive just after the others' still gets its turn.
+        # Streams without a budget are due as soon as they wait.
+        return stream._waiting_since + (stream.max_latency if stream.max_latency is not None else 0.0)
+
+    def _next_batch(self) -> list[tuple[Hashable, tuple]] | None:
+        """
+        Wait for frames and take the next batch, or return None once every stream has ended.
+        """
+        with self._ready:
+            fill_until = None
+            while True:
+                if self._stop.is_set():
+                    return None
+                ready = [name for name, stream in self.streams.items() if stream._buffer]
+                live = [name for name, stream in self.streams.items() if stream._buffer or not stream._source_done]
+                if not live:
+                    return None
+                now = time.perf_counter()
+                if ready and fill_until is None:
+                    fill_until = now + self.batch_wait
+                if ready and (len(ready) >= min(self.max_batch, len(live)) or now >= fill_until):
+                    break
+                self._ready.wait(None if fill_until is None else fill_until - now)
+
+            ready.sort(key=lambda name: self._deadline(self.streams[name]))
+            batch = []
+            for name in ready[:self.max_batch]:
+                stream = self.streams[name]
+                item = stream._pop()
+                if stream.max_latency is not None and now - item[2] > stream.max_latency:
+                    stream.stats.dropped += 1
+                    continue
+                batch.append((name, item))
+            return batch
+
+    def _count_batch(self, batch: list[tuple[Hashable, tuple]]) -> None:
+        results = self.flow_counter.model.predict(
+            [item[3] for _, item in batch], conf=TRACK_CONF, batch=len(batch), verbose=False,
+        )
+        for (name, (index, timestamp, arrival, _)), result in zip(batch, results):
+            stream = self.streams[name]
+            counter = stream.flow_counter
+            counter.frame_index = index
+            counter.frame_timestamp = timestamp
+            tracked = self.trackers[name].update(result)
+            counter._count_crossing_objects(*counter._extract_tracks(tracked.boxes), stream.line_map)
+
+            latency = time.perf_counter() - arrival
+            stream.stats.processed += 1
+            stream.stats.max_latency = max(stream.stats.max_latency, latency)
+            stream.stats.total_latency += latency
+        self.stats.batches += 1
+        self.stats.frames += len(batch)
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+
+    def run(self, on_event: Callable[[Hashable, CrossingEvent], None] | None = None) -> ServiceStats:
+        """
+        Count all streams until they end or `stop` is called.
+
+        :param on_event: Called on this thread with the stream name and every CrossingEvent.
+        :return: Batching statistics.
+        """
+        if on_event is not None:
+            for name, stream in self.streams.items():
+                stream.flow_counter.event_listeners.append(lambda event, name=name: on_event(name, event))
+        readers = [
+            threading.Thread(target=stream._read, name=f"flow-counter-stream-{name}", daemon=True)
+            for name, stream in self.streams.items()
+        ]
+        self.stats.start_time = time.perf_counter()
+        for reader in readers:
+            reader.start()
+        try:
+            while (batch := self._next_batch()) is not None:
+                if batch:
+                    self._count_batch(batch)
+        finally:
+            self.stats.end_time = time.perf_counter()
+            self.stop()
+            for stream in self.streams.values():
+                stream.flow_counter.event_listeners.clear()
+            for reader in readers:
+                reader.join(timeout=1.0)
+        for stream in self.streams.values():
+            if stream._error is not None:
+                raise stream._error
+        return self.stats
+
+    def results(self) -> dict[Hashable, dict[str, dict[str, int]]]:
+        """
+        Class-wise counts per stream, {stream: {class: {area: count}}}.
+        """
+        return {name: stream.flow_counter.cls_counts for name, stream in self.streams.items()}
@@ -0,0 +1,253 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterable, Iterator
+
+import cv2
+import numpy as np
+
+from flow_counter.events import CrossingEvent
+from flow_counter.utils import Point
+
+if TYPE_CHECKING:
+    from flow_counter.flow_counter import FlowCounter
+
+LINE = tuple[Point, Point]
+
+# Marks the end of a stream.
+_END = object()
+
+@dataclass
+class StreamStats:
+    """
+    Frame statistics of a stream. Latency is measured from arrival to counted.
+    """
+    received: int = 0
+    processed: int = 0
+    dropped: int = 0
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.processed if self.processed else 0.0
+
+def _open_capture(source: str | int) -> cv2.VideoCapture:
+    """
+    Open a capture URL, a video file or a device index.
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open stream: {source}")
+    return cap
+
+def _capture_frames(cap: cv2.VideoCapture) -> Iterator[np.ndarray]:
+    """
+    Yield the frames of an open capture and release it at the end.
+    """
+    try:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+class StreamCounter:
+    def __init__(
+        self,
+        flow_counter: "FlowCounter",
+        source: str | int | Iterable[np.ndarray],
+        line_map: dict[str, tuple[LINE, LINE]],
+        buffer_size: int = 1,
+        max_latency: float | None = None,
+        fps: float | None = None,
+    ):
+        """
+        Count objects on a live stream, delivering crossing events as they happen.
+
+        Frames are read on a background thread into a small buffer. When counting falls
+        behind, the oldest buffered frames are dropped instead of queueing up, and frames
+        older than `max_latency` seconds are skipped, so events stay close to real time.
+        Event frame indices and eviction refer to the frame's position in the source.
+
+        Event timestamps are stream time: the frame index divided by `fps`, or the timestamp
+        yielded with each frame if the source yields (timestamp, frame) pairs. Without a
+        known frame rate, they are the seconds since the first frame arrived.
+
+        :param flow_counter: Counter used for tracking and counting. Its state and its tracker are reset.
+        :param source: Capture URL, video file, device index, or any iterable of frames
+                       or of (timestamp in seconds, frame) pairs.
+        :param line_map: A dict of two lines ((x1, y1), (x2, y2))
+        :param buffer_size: Maximum number of frames waiting to be counted.
+        :param max_latency: If given, skip frames that waited longer than this many seconds.
+        :param fps: Frame rate of the source. Defaults to the one reported by the capture, if any.
+        """
+        self.flow_counter = flow_counter
+        self.source = source
+        self.line_map = line_map
+        self.max_latency = max_latency
+        self.fps = fps
+        self.stats = StreamStats()
+        self._buffer: deque = deque(maxlen=buffer_size)
+        # Arrival of the oldest frame not counted yet, including frames dropped for newer ones.
+        self._waiting_since: float | None = None
+        self._ready = threading.Condition()
+        self._stop = threading.Event()
+        self._source_done = False
+        self._error: BaseException | None = None
+
+    def stop(self) -> None:
+        """
+        Stop reading the source. `run` returns after the frame being counted.
+        """
+        self._stop.set()
+        with self._ready:
+            self._ready.notify_all()
+
+    def _read(self) -> None:
+        try:
+            fps = self.fps
+            if isinstance(self.source, (str, int)):
+                cap = _open_capture(self.source)
+                fps = fps or cap.get(cv2.CAP_PROP_FPS) or None
+                frames = _capture_frames(cap)
+            else:
+                frames = self.source
+            start = None
+            for index, frame in enumerate(frames):
+                if self._stop.is_set():
+                    break
+                with self._ready:
+                    self.stats.received += 1
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self.stats.dropped += 1
+                    arrival = time.perf_counter()
+                    if start is None:
+                        start = arrival
+                    if isinstance(frame, tuple):
+                        timestamp, frame = frame
+                    elif fps:
+                        timestamp = index / fps
+                    else:
+                        timestamp = arrival - start
+                    if not self._buffer:
+                        self._waiting_since = arrival
+                    self._buffer.append((index, timestamp, arrival, frame))
+                    self._ready.notify()
+        except BaseException as e:
+            self._error = e
+        finally:
+            with self._ready:
+                self._source_done = True
+                self._ready.notify()
+
+    def _next(self):
+        with self._ready:
+            while not self._buffer and not self._source_done and not self._stop.is_set():
+                self._ready.wait()
+            if self._stop.is_set() or not self._buffer:
+                return _END
+            return self._pop()
+
+    def _pop(self) -> tuple:
+        """
+        Take the oldest buffered frame. Call with `_ready` held.
+        """
+        item = self._buffer.popleft()
+        self._waiting_since = self._buffer[0][2] if self._buffer else None
+        return item
+
+    def run(self, on_event: Callable[[CrossingEvent], None] | None = None) -> StreamStats:
+        """
+        Count frames until the source ends or `stop` is called.
+
+        :param on_event: Called on this thread with every CrossingEvent.
+        :return: Frame statistics of the stream.
+        """
+        counter = self.flow_counter
+        counter._reset()
+        # A new stream starts without the tracks of the previous one.
+        counter._reset_tracker()
+        if on_event is not None:
+            counter.event_listeners.append(on_event)
+        reader = threading.Thread(target=self._read, name="flow-counter-stream", daemon=True)
+        reader.start()
+        try:
+            while (item := self._next()) is not _END:
+                index, timestamp, arrival, frame = item
+                if self.max_latency is not None and time.perf_counter() - arrival > self.max_latency:
+                    # The reader thread counts its drops too, under the same lock.
+                    with self._ready:
+                        self.stats.dropped += 1
+                    continue
+                counter.frame_index = index
+                counter.frame_timestamp = timestamp
+                counter._count_crossing_objects(*counter._extract_tracks(counter._track(frame).boxes), self.line_map)
+
+                latency = time.perf_counter() - arrival
+                self.stats.processed += 1
+                self.stats.max_latency = max(self.stats.max_latency, latency)
+                self.stats.total_latency += latency
+        finally:
+            self.stop()
+            if on_event is not None:
+                counter.event_listeners.remove(on_event)
+            reader.join(timeout=1.0)
+        if self._error is not None:
+            raise self._error
+        return self.stats
+
+    def events(self) -> Iterator[CrossingEvent]:
+        """
+        Count on a background thread and yield crossing events as they happen.
+        """
+        events: queue.Queue = queue.Queue()
+        errors: list[BaseException] = []
+
+        def work() -> None:
+            try:
+                self.run(events.put)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                events.put(_END)
+
+        worker = threading.Thread(target=work, name="flow-counter-count", daemon=True)
+        worker.start()
+        try:
+            while (event := events.get()) is not _END:
+                yield event
+        finally:
+            self.stop()
+            worker.join()
+        if errors:
+            raise errors[0]
+
+    async def aevents(self) -> AsyncIterator[CrossingEvent]:
+        """
+        Count on a background thread and asynchronously yield crossing events as they happen.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def on_event(event: CrossingEvent) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        def work() -> None:
+            try:
+                self.run(on_event)
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, _END)
+
+        task = loop.run_in_executor(None, work)
+        try:
+            while (event := await events.get()) is not _END:
+                yield event
+        finally:
+            self.stop()
+            await task
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+from typing import Iterator
+
+import numpy as np
+
+TRACKS = tuple[np.ndarray, list[int], np.ndarray]
+
+_META_FILE = "meta.json"
+
+def _file_fingerprint(path: str | None) -> str:
+    """
+    Identify a file by its absolute path, size and modification time.
+    Names that are not files (e.g. built-in tracker configs) are used as they are.
+    """
+    if path is None:
+        return "default"
+    if not os.path.isfile(path):
+        return path
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def cache_key(video_path: str, model_path: str, tracker_file: str | None, options: str | None = None) -> str:
+    """
+    Build a cache key from the video, the model and the tracker configuration.
+
+    :param video_path: Path to the input video file.
+    :param model_path: Path to the YOLO model file.
+    :param tracker_file: YAML file including tracker parameters, or None for the default.
+    :param options: Other settings that change the tracker output, e.g. decode-side downscaling.
+    :return: Hex digest identifying the tracker output of this combination.
+    """
+    digest = hashlib.sha256()
+    for path in (video_path, model_path, tracker_file):
+        digest.update(_file_fingerprint(path).encode())
+        digest.update(b"\0")
+    if tracker_file is not None and os.path.isfile(tracker_file):
+        with open(tracker_file, "rb") as f:
+            digest.update(f.read())
+    if options is not None:
+        digest.update(b"\0" + options.encode())
+    return digest.hexdigest()[:32]
+
+class TrackCacheWriter:
+    def __init__(self, path: str, names: dict[int, str], fps: float = 0.0, chunk_frames: int = 1000):
+        """
+        Write per-frame tracker output as chunked .npz files with frame offsets.
+
+        Each chunk holds the concatenated boxes of `chunk_frames` frames in columns
+        (xyxys, ids, classes) plus an `offsets` array of length frames + 1.
+        The cache only becomes readable once `close` writes its metadata.
+
+        :param path: Cache directory.
+        :param names: Class names of the model, stored for replay.
+        :param fps: Frame rate of the video, stored for replay.
+        :param chunk_frames: Number of frames per chunk file.
+        """
+        self.path = path
+        self.names = names
+        self.fps = fps
+        self.chunk_frames = chunk_frames
+        self.num_frames = 0
+        self._num_chunks = 0
+        self._buffer: list[TRACKS] = []
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, _META_FILE)):
+            os.remove(os.path.join(path, _META_FILE))
+
+    def append(self, xyxys: np.ndarray, ids: list[int], classes: np.ndarray) -> None:
+        """
+        Append the tracker output of the next frame.
+        """
+        self._buffer.append((xyxys, ids, classes))
+        self.num_frames += 1
+        if len(self._buffer) >= self.chunk_frames:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        lengths = [len(ids) for _, ids, _ in self._buffer]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        np.savez(
+            os.path.join(self.path, f"chunk_{self._num_chunks:06d}.npz"),
+            xyxys=np.concatenate([np.asarray(x, dtype=np.float32).reshape(-1, 4) for x, _, _ in self._buffer]),
+            ids=np.concatenate([np.asarray(i, dtype=np.int64) for _, i, _ in self._buffer]),
+            classes=np.concatenate([np.asarray(c, dtype=np.float32) for _, _, c in self._buffer]),
+            offsets=offsets,
+        )
+        self._num_chunks += 1
+        self._buffer = []
+
+    def close(self) -> None:
+        """
+        Flush the remaining frames and mark the cache as complete.
+        """
+        self._flush()
+        meta = {
+            "num_frames": self.num_frames,
+            "num_chunks": self._num_chunks,
+            "fps": self.fps,
+            "names": {str(k): v for k, v in self.names.items()},
+        }
+        tmp_path = os.path.join(self.path, _META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, _META_FILE))
+
+class TrackCache:
+    def __init__(self, path: str):
+        """
+        Read tracker output written by TrackCacheWriter, streaming one chunk at a time.
+
+        :param path: Cache directory.
+        """
+        self.path = path
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+        self.num_frames: int = meta["num_frames"]
+        self.num_chunks: int = meta["num_chunks"]
+        self.fps: float = meta["fps"]
+        self.names: dict[int, str] = {int(k): v for k, v in meta["names"].items()}
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """
+        Whether a complete cache exists at the given directory.
+        """
+        return os.path.isfile(os.path.join(path, _META_FILE))
+
+    def __len__(self) -> int:
+        return self.num_frames
+
+    def __iter__(self) -> Iterator[TRACKS]:
+        """
+        Yield (xyxys, ids, classes) for every frame in order.
+        """
+        for n in range(self.num_chunks):
+            with np.load(os.path.join(self.path, f"chunk_{n:06d}.npz")) as chunk:
+                xyxys, ids, classes, offsets = chunk["xyxys"], chunk["ids"], chunk["classes"], chunk["offsets"]
+            ids = ids.tolist()
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                yield xyxys[start:end], ids[start:end], classes[start:end]
@@ -0,0 +1,54 @@
+import torch
+from ultralytics.engine.results import Results
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import YAML, IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+# Confidence threshold of `model.track`. Trackers need low-confidence detections too.
+TRACK_CONF = 0.1
+
+class Tracker:
+    def __init__(self, tracker_file: str | None = None, device: str = "cpu"):
+        """
+        Multi-object tracker fed with detections, decoupled from the detector.
+
+        It updates the tracker from the same config in the same way as `model.track`
+        of ultralytics 8.4.174 and later, the floor in pyproject.toml, so detections from
+        `model.predict(..., conf=TRACK_CONF)` get the same track IDs.
+        Appearance features of the detector itself (`with_reid` with `model: auto`) are
+        only available through `model.track` and are not supported.
+
+        :param tracker_file: YAML file including tracker parameters. Defaults to BoT-SORT,
+                             the default of `model.track`.
+        :param device: Device of a separate ReID model, if the config uses one.
+        """
+        cfg = IterableSimpleNamespace(**YAML.load(check_yaml(tracker_file or "botsort.yaml")))
+        if cfg.tracker_type not in TRACKER_MAP:
+            raise ValueError(f"Unsupported tracker type: {cfg.tracker_type}")
+        tracker_cls = TRACKER_MAP[cfg.tracker_type]
+        if hasattr(tracker_cls, "setup_predictor") or (
+            getattr(cfg, "with_reid", False) and getattr(cfg, "model", "auto") == "auto"
+        ):
+            raise ValueError(f"{cfg.tracker_type} with detector features can only be used through model.track")
+        cfg.device = device
+        self.tracker = tracker_cls(args=cfg)
+
+    def update(self, result: Results) -> Results:
+        """
+        Track the detections of one frame.
+
+        :param result: Detection result of the next frame, in order.
+        :return: The result restricted to tracked boxes, with track IDs.
+        """
+        tracks = self.tracker.update(result.boxes.cpu().numpy(), result.orig_img)
+        if len(tracks) == 0:
+            # Same as model.track: new tracks are hidden until they are confirmed.
+            if any(not t.is_activated for t in self.tracker.tracked_stracks):
+                return result[:0]
+            return result
+        tracked = result[tracks[:, -1].astype(int)]
+        tracked.update(boxes=torch.as_tensor(tracks[:, :-1], device=result.boxes.data.device))
+        return tracked
+
+    def reset(self) -> None:
+        self.tracker.reset()
@@ -1,3 +1,10 @@
+from array import array
+import sys
+from typing import Hashable, Iterable
+
+import numpy as np
+
+
 class DictUnionFind:
     def __init__(self):
         """
@@ -10,23 +17,183 @@ class DictUnionFind:
         if x not in self.parent:
             self.parent[x] = x
             self.size[x] = 1
-        if self.parent[x] != x:
-            self.parent[x] = self.find(self.parent[x])
-        return self.parent[x]
+            return x
+        # Iterative path halving
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
 
     def unite(self, x, y):
+        """
+        Merge the sets containing x and y.
+
+        :return: The root of the merged set.
+        """
         x_root = self.find(x)
         y_root = self.find(y)
         if x_root == y_root:
-            return
+            return x_root
         # Union by size
         if self.size[x_root] < self.size[y_root]:
             x_root, y_root = y_root, x_root
         self.parent[y_root] = x_root
         self.size[x_root] = self.size.get(x_root, 1) + self.size.get(y_root, 1)
+        return x_root
 
     def is_connected(self, x, y):
         return self.find(x) == self.find(y)
 
     def get_size(self, x):
         return self.size[self.find(x)]
+
+
+class ArrayUnionFind:
+    def __init__(self):
+        """
+        UnionFind with the same API as DictUnionFind, backed by growable integer arrays.
+
+        Arbitrary IDs are remapped to dense indices, so parents and sizes are stored
+        in two compact arrays, and `find` is iterative.
+        """
+        self._index: dict[Hashable, int] = {}
+        self._ids: list[Hashable] = []
+        self._parent = array("q")
+        self._size = array("q")
+        self._num_sets = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, x) -> bool:
+        return x in self._index
+
+    def _find_index(self, x) -> int:
+        i = self._index.get(x)
+        if i is None:
+            i = len(self._ids)
+            self._index[x] = i
+            self._ids.append(x)
+            self._parent.append(i)
+            self._size.append(1)
+            self._num_sets += 1
+            return i
+        # Iterative path halving
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    @property
+    def num_sets(self) -> int:
+        """
+        Number of disjoint sets, i.e. distinct roots.
+        """
+        return self._num_sets
+
+    def find(self, x):
+        return self._ids[self._find_index(x)]
+
+    def find_many(self, xs: Iterable) -> list:
+        """
+        Resolve the roots of many IDs at once, e.g. all IDs of a frame.
+
+        Parents of all IDs are followed together with NumPy, one level per step until
+        every ID reaches its root, and the IDs are then pointed directly at their roots.
+
+        :param xs: IDs to resolve.
+        :return: List of root IDs in the same order.
+        """
+        index = self._index
+        xs = list(xs)
+        indices = [index.get(x) for x in xs]
+        for k, i in enumerate(indices):
+            if i is None:
+                indices[k] = self._find_index(xs[k])
+        if not indices:
+            return []
+
+        # A view of the parent array, released before it can grow again.
+        parent = np.frombuffer(self._parent, dtype=np.int64)
+        start = np.array(indices, dtype=np.int64)
+        roots = start
+        while True:
+            up = parent[roots]
+            if np.array_equal(up, roots):
+                break
+            roots = up
+        parent[start] = roots
+        del parent
+
+        ids = self._ids
+        return [ids[i] for i in roots.tolist()]
+
+    def unite(self, x, y):
+        """
+        Merge the sets containing x and y.
+
+        :return: The root of the merged set.
+        """
+        x_root = self._find_index(x)
+        y_root = self._find_index(y)
+        if x_root != y_root:
+            # Union by size
+            if self._size[x_root] < self._size[y_root]:
+                x_root, y_root = y_root, x_root
+            self._parent[y_root] = x_root
+            self._size[x_root] += self._size[y_root]
+            self._num_sets -= 1
+        return self._ids[x_root]
+
+    def is_connected(self, x, y):
+        return self._find_index(x) == self._find_index(y)
+
+    def get_size(self, x):
+        return self._size[self._find_index(x)]
+
+    def memory_bytes(self) -> int:
+        """
+        Rough estimate of the memory held by the structure in bytes.
+        """
+        return (
+            self._parent.buffer_info()[1] * self._parent.itemsize
+            + self._size.buffer_info()[1] * self._size.itemsize
+            + sys.getsizeof(self._index)
+            + sys.getsizeof(self._ids)
+        )
+
+    def compact(self, keep: Iterable) -> int:
+        """
+        Drop every set that does not contain one of the given IDs.
+
+        Retained sets keep all their members and their root, so `find` returns the
+        same root as before for every retained ID. The arrays are rebuilt densely.
+
+        :param keep: IDs that are still referenced.
+        :return: Number of IDs dropped.
+        """
+        keep_roots = {self._find_index(x) for x in keep if x in self._index}
+        roots = [self._find_index(x) for x in self._ids]
+
+        new_index: dict[Hashable, int] = {}
+        new_ids: list[Hashable] = []
+        for x, root in zip(self._ids, roots):
+            if root in keep_roots:
+                new_index[x] = len(new_ids)
+                new_ids.append(x)
+
+        new_parent = array("q", bytes(8 * len(new_ids)))
+        new_size = array("q", bytes(8 * len(new_ids)))
+        for x, root in zip(self._ids, roots):
+            i = new_index.get(x)
+            if i is not None:
+                new_parent[i] = new_index[self._ids[root]]
+                new_size[i] = self._size[self._index[x]]
+
+        dropped = len(self._ids) - len(new_ids)
+        self._index, self._ids = new_index, new_ids
+        self._parent, self._size = new_parent, new_size
+        self._num_sets = len(keep_roots)
+        return dropped
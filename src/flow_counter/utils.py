@@ -1,5 +1,4 @@
 from typing import Tuple
-import cv2
 import numpy as np
 
 Point = Tuple[int, int]
@@ -28,6 +27,61 @@ def ccw(a: Point, b: Point, c: Point) -> bool:
     """
     return (c[1] - a[1]) * (b[0] - a[0]) > (b[1] - a[1]) * (c[0] - a[0])
 
+def intersect_many(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of :func:`intersect` over broadcastable arrays of points.
+
+    :param a: Start points of segments AB, shape (..., 2)
+    :param b: End points of segments AB, shape (..., 2)
+    :param c: Start points of segments CD, shape (..., 2)
+    :param d: End points of segments CD, shape (..., 2)
+    :return: Boolean array, True where the segments intersect
+    """
+    return (ccw_many(a, c, d) != ccw_many(b, c, d)) & (ccw_many(a, b, c) != ccw_many(a, b, d))
+
+def ccw_many(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of :func:`ccw` over broadcastable arrays of points.
+
+    :param a: First points, shape (..., 2)
+    :param b: Second points, shape (..., 2)
+    :param c: Third points, shape (..., 2)
+    :return: Boolean array, True where the points are in counter-clockwise order
+    """
+    return (
+        (c[..., 1] - a[..., 1]) * (b[..., 0] - a[..., 0])
+        > (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+    )
+
+def line_map_to_array(line_map: dict) -> np.ndarray:
+    """
+    Convert a line map into an integer array of line end points.
+
+    :param line_map: A dict of area name to two lines ((x1, y1), (x2, y2)), ((x3, y3), (x4, y4)).
+    :return: Array of shape (areas, 2, 2, 2) indexed as [area, line, point, xy].
+    """
+    if not line_map:
+        return np.zeros((0, 2, 2, 2), dtype=np.int64)
+    return np.array(list(line_map.values()), dtype=np.int64).reshape(-1, 2, 2, 2)
+
+def bottom_edge_hits(xyxys: np.ndarray, lines: np.ndarray) -> np.ndarray:
+    """
+    Test the bottom edge of every box against every counting line at once.
+
+    Box coordinates are truncated to integers in the same way as ``int()``.
+
+    :param xyxys: Array of bounding boxes [[x1, y1, x2, y2], ...], shape (N, 4)
+    :param lines: Array of counting lines from :func:`line_map_to_array`, shape (L, 2, 2, 2)
+    :return: Boolean hit mask of shape (N, L, 2), where [i, j, k] is True if
+             box i crosses line k of area j.
+    """
+    boxes = np.asarray(xyxys).reshape(-1, 4).astype(np.int64)
+    a = np.stack([boxes[:, 0], boxes[:, 3]], axis=-1)[:, None, None, :]
+    b = np.stack([boxes[:, 2], boxes[:, 3]], axis=-1)[:, None, None, :]
+    c = lines[None, :, :, 0, :]
+    d = lines[None, :, :, 1, :]
+    return intersect_many(a, b, c, d)
+
 def compute_iou(box1: np.ndarray, box2: np.ndarray) -> float:
     """
     Calculate IoU (Intersection over Union) between two boxes.
@@ -47,6 +101,59 @@ def compute_iou(box1: np.ndarray, box2: np.ndarray) -> float:
         return 0.0
     return inter_area / union_area
 
+def compute_iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Calculate pairwise IoU between two sets of boxes, matching :func:`compute_iou`.
+
+    :param boxes1: Array of boxes [[x1, y1, x2, y2], ...], shape (N, 4)
+    :param boxes2: Array of boxes [[x1, y1, x2, y2], ...], shape (M, 4)
+    :return: IoU matrix of shape (N, M)
+    """
+    boxes1 = np.asarray(boxes1).reshape(-1, 4)[:, None, :]
+    boxes2 = np.asarray(boxes2).reshape(-1, 4)[None, :, :]
+    x1 = np.maximum(boxes1[..., 0], boxes2[..., 0])
+    y1 = np.maximum(boxes1[..., 1], boxes2[..., 1])
+    x2 = np.minimum(boxes1[..., 2], boxes2[..., 2])
+    y2 = np.minimum(boxes1[..., 3], boxes2[..., 3])
+
+    inter_area = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+    area1 = (boxes1[..., 2] - boxes1[..., 0]) * (boxes1[..., 3] - boxes1[..., 1])
+    area2 = (boxes2[..., 2] - boxes2[..., 0]) * (boxes2[..., 3] - boxes2[..., 1])
+    union_area = area1 + area2 - inter_area
+    nonzero = union_area != 0
+    return np.divide(inter_area, union_area, out=np.zeros(union_area.shape), where=nonzero)
+
+def scale_line_map(line_map: dict, sx: float, sy: float) -> dict:
+    """
+    Scale every point of a line map, e.g. to draw it on downscaled frames.
+
+    :param line_map: A dict of two lines ((x1, y1), (x2, y2)) per area.
+    :param sx: Horizontal scale factor.
+    :param sy: Vertical scale factor.
+    :return: Line map with integer points.
+    """
+    return {
+        name: tuple(tuple((round(x * sx), round(y * sy)) for x, y in line) for line in lines)
+        for name, lines in line_map.items()
+    }
+
+def table_size(
+    num_cols: int,
+    num_rows: int,
+    start_x: int = 10,
+    start_y: int = 10,
+    first_col_width: int = 120,
+    other_col_width: int = 70,
+    cell_height: int = 30,
+) -> tuple[int, int]:
+    """
+    Size (width, height) of the region from the top-left corner of an image that
+    `draw_table_on_image` draws into, with a margin for text wider than its cell.
+    """
+    width = start_x + first_col_width + (num_cols - 1) * other_col_width
+    height = start_y + num_rows * cell_height
+    return width + other_col_width, height + cell_height
+
 def draw_table_on_image(
     image: np.ndarray,
     table_data: list[list[str]],
@@ -75,6 +182,9 @@ def draw_table_on_image(
     Returns:
         np.ndarray: The image with the table drawn on it.
     """
+    # OpenCV is only needed for drawing, so the geometry above works with NumPy alone.
+    import cv2
+
     font = cv2.FONT_HERSHEY_SIMPLEX
 
     for i, row in enumerate(table_data):
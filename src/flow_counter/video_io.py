@@ -0,0 +1,257 @@
+from dataclasses import dataclass
+import shutil
+import subprocess
+from typing import Iterator
+
+import numpy as np
+
+@dataclass
+class VideoOptions:
+    """
+    How videos are decoded and encoded.
+
+    :param backend: "opencv" for cv2.VideoCapture / cv2.VideoWriter, or "ffmpeg" to pipe
+                    raw frames through an ffmpeg subprocess.
+    :param codec: FourCC for OpenCV (default "mp4v") or encoder name for ffmpeg (default "libx264").
+    :param crf: Constant rate factor of the ffmpeg encoder. Lower is better quality, larger files.
+    :param preset: Speed preset of the ffmpeg encoder, e.g. "veryfast".
+    :param threads: Number of decoder and encoder threads, None for the library default.
+    :param scale: If given, frames are downscaled by this factor right after decoding, e.g. 0.5.
+    """
+    backend: str = "opencv"
+    codec: str | None = None
+    crf: int | None = None
+    preset: str | None = None
+    threads: int | None = None
+    scale: float | None = None
+
+def _scaled_size(size: tuple[int, int], scale: float | None) -> tuple[int, int]:
+    if scale is None:
+        return size
+    # Even sizes keep chroma-subsampled encoders happy.
+    return max(2, round(size[0] * scale / 2) * 2), max(2, round(size[1] * scale / 2) * 2)
+
+def _require_ffmpeg() -> str:
+    path = shutil.which("ffmpeg")
+    if path is None:
+        raise RuntimeError("The ffmpeg video backend requires the ffmpeg binary on PATH")
+    return path
+
+class OpenCVReader:
+    def __init__(self, path: str, scale: float | None = None, threads: int | None = None):
+        """
+        Decode a video with cv2.VideoCapture.
+
+        :param path: Path to the video file.
+        :param scale: If given, downscale frames by this factor.
+        :param threads: Number of decoder threads, if the OpenCV build supports setting it.
+        """
+        import cv2
+
+        params = []
+        if threads is not None and hasattr(cv2, "CAP_PROP_N_THREADS"):
+            params = [cv2.CAP_PROP_N_THREADS, threads]
+        self.cap = cv2.VideoCapture(path, cv2.CAP_ANY, params)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Could not open video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.frame_size = _scaled_size(self.source_size, scale)
+
+    def seek(self, frame_index: int) -> None:
+        import cv2
+
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        import cv2
+
+        while self.cap.isOpened():
+            success, frame = self.cap.read()
+            if not success:
+                break
+            if self.frame_size != self.source_size:
+                frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+            yield frame
+
+    def release(self) -> None:
+        self.cap.release()
+
+class FFmpegReader:
+    def __init__(self, path: str, scale: float | None = None, threads: int | None = None, buffers: int = 2):
+        """
+        Decode a video with an ffmpeg subprocess writing raw BGR frames to a pipe.
+
+        Frames are read into a fixed pool of `buffers` arrays that are reused in turn, so a
+        frame is only valid until `buffers` more frames have been read.
+
+        :param path: Path to the video file.
+        :param scale: If given, ffmpeg downscales frames by this factor.
+        :param threads: Number of decoder threads.
+        :param buffers: Number of frame buffers in the pool.
+        """
+        self._ffmpeg = _require_ffmpeg()
+        # OpenCV is only used to read the metadata.
+        probe = OpenCVReader(path, scale)
+        probe.release()
+        self.path = path
+        self.fps = probe.fps
+        self.frame_count = probe.frame_count
+        self.source_size = probe.source_size
+        self.frame_size = probe.frame_size
+        self.threads = threads
+        self.buffers = max(1, buffers)
+        self._start = 0
+        self._process: subprocess.Popen | None = None
+
+    def seek(self, frame_index: int) -> None:
+        self.release()
+        self._start = frame_index
+
+    def _command(self) -> list[str]:
+        command = [self._ffmpeg, "-v", "error", "-nostdin"]
+        if self.threads is not None:
+            command += ["-threads", str(self.threads)]
+        if self._start and self.fps:
+            command += ["-ss", f"{self._start / self.fps:.6f}"]
+        command += ["-i", self.path]
+        if self.frame_size != self.source_size:
+            command += ["-vf", f"scale={self.frame_size[0]}:{self.frame_size[1]}:flags=area"]
+        return command + ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        width, height = self.frame_size
+        pool = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.buffers)]
+        self._process = subprocess.Popen(self._command(), stdout=subprocess.PIPE, bufsize=width * height * 3)
+        stdout = self._process.stdout
+        try:
+            for k in range(1 << 62):
+                frame = pool[k % self.buffers]
+                view = memoryview(frame).cast("B")
+                filled = 0
+                while filled < len(view):
+                    n = stdout.readinto(view[filled:])
+                    if not n:
+                        return
+                    filled += n
+                yield frame
+        finally:
+            self.release()
+
+    def release(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+class OpenCVWriter:
+    def __init__(self, path: str, fps: float, frame_size: tuple[int, int], codec: str | None = None):
+        """
+        Encode a video with cv2.VideoWriter.
+
+        :param path: Path to the output video file.
+        :param fps: Frame rate of the output.
+        :param frame_size: Frame size (width, height).
+        :param codec: FourCC of the codec, "mp4v" by default.
+        """
+        import cv2
+
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*(codec or "mp4v")), fps, frame_size)
+
+    def write(self, frame: np.ndarray) -> None:
+        self.writer.write(frame)
+
+    def release(self) -> None:
+        self.writer.release()
+
+    def abort(self) -> None:
+        """
+        Stop encoding after an error. The partial video is kept.
+        """
+        self.writer.release()
+
+class FFmpegWriter:
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        frame_size: tuple[int, int],
+        codec: str | None = None,
+        crf: int | None = None,
+        preset: str | None = None,
+        threads: int | None = None,
+    ):
+        """
+        Encode a video with an ffmpeg subprocess reading raw BGR frames from a pipe.
+
+        :param path: Path to the output video file.
+        :param fps: Frame rate of the output.
+        :param frame_size: Frame size (width, height).
+        :param codec: Encoder name, "libx264" by default.
+        :param crf: Constant rate factor of the encoder.
+        :param preset: Speed preset of the encoder.
+        :param threads: Number of encoder threads.
+        """
+        width, height = frame_size
+        command = [
+            _require_ffmpeg(), "-v", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps:g}", "-i", "-",
+            "-c:v", codec or "libx264",
+        ]
+        if crf is not None:
+            command += ["-crf", str(crf)]
+        if preset is not None:
+            command += ["-preset", preset]
+        if threads is not None:
+            command += ["-threads", str(threads)]
+        command += ["-pix_fmt", "yuv420p", path]
+        self.path = path
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray) -> None:
+        self._process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self) -> None:
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {self.path} (exit code {self._process.returncode})")
+
+    def abort(self) -> None:
+        """
+        Stop encoding after an error: kill the encoder and close its pipe, without raising.
+        """
+        self._process.kill()
+        self._process.wait()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            # The pipe is broken, as the encoder is gone.
+            pass
+
+VideoReader = OpenCVReader | FFmpegReader
+
+VideoWriter = OpenCVWriter | FFmpegWriter
+
+def open_reader(path: str, options: VideoOptions, buffers: int = 2) -> VideoReader:
+    """
+    Open a video for decoding with the backend of `options`.
+
+    :param buffers: Frames that must stay valid at the same time (ffmpeg backend only).
+    """
+    if options.backend == "opencv":
+        return OpenCVReader(path, options.scale, options.threads)
+    if options.backend == "ffmpeg":
+        return FFmpegReader(path, options.scale, options.threads, buffers)
+    raise ValueError(f"Unknown video backend: {options.backend}")
+
+def open_writer(path: str, fps: float, frame_size: tuple[int, int], options: VideoOptions) -> VideoWriter:
+    """
+    Open a video for encoding with the backend of `options`.
+    """
+    if options.backend == "opencv":
+        return OpenCVWriter(path, fps, frame_size, options.codec)
+    if options.backend == "ffmpeg":
+        return FFmpegWriter(path, fps, frame_size, options.codec, options.crf, options.preset, options.threads)
+    raise ValueError(f"Unknown video backend: {options.backend}")
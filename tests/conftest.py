@@ -1,7 +1,12 @@
+import cv2
+import numpy as np
 import pytest
 from pytest_mock import MockerFixture
+import torch
+from ultralytics.engine.results import Results
 
 from flow_counter import FlowCounter
+from flow_counter.line_index import LineIndex
 from flow_counter.utils import Point
 
 LINE = tuple[Point, Point]
@@ -15,9 +20,187 @@ def dummy_two_lines() -> dict[str, tuple[LINE, LINE]]:
     return {"dummy": (((0, 0), (100, 0)), ((0, 100), (100, 100)))}
 
 @pytest.fixture
-def flow_counter(mocker: MockerFixture) -> FlowCounter:
+def mock_yolo(mocker: MockerFixture):
+    """
+    Patches YOLO to avoid real model loading.
+    """
+    return mocker.patch("flow_counter.flow_counter.YOLO", autospec=True)
+
+@pytest.fixture(params=[True, False], ids=["vectorized", "scalar"])
+def flow_counter(request, mock_yolo) -> FlowCounter:
     """
     Returns a FlowCounter instance with a mocked YOLO model to avoid real model loading.
+    Tests run with both crossing engines, the default vectorized one and the scalar one.
+    """
+    return FlowCounter("dummy_model.pt", vectorized=request.param)
+
+@pytest.fixture
+def scalar_flow_counter(mock_yolo) -> FlowCounter:
+    """
+    Returns a FlowCounter instance with a mocked YOLO model using the scalar crossing engine.
+    """
+    return FlowCounter("dummy_model.pt", vectorized=False)
+
+@pytest.fixture
+def vectorized_flow_counter(mock_yolo) -> FlowCounter:
+    """
+    Returns a FlowCounter instance with a mocked YOLO model using the vectorized crossing engine.
+    """
+    return FlowCounter("dummy_model.pt")
+
+@pytest.fixture
+def patch_intersect(mocker: MockerFixture):
+    """
+    Patches the crossing test of both engines like `mocker.patch` on `intersect`.
+
+    The vectorized engine's line index then calls the patched `intersect` for every box
+    and line, in the order of the scalar engine.
+    """
+    def patch(**kwargs):
+        intersect = mocker.patch("flow_counter.flow_counter.intersect", **kwargs)
+
+        def hits(index: LineIndex, xyxys: np.ndarray) -> np.ndarray:
+            boxes = np.asarray(xyxys).reshape(-1, 4).astype(np.int64).tolist()
+            mask = np.zeros((len(boxes), len(index.lines), 2), dtype=bool)
+            for i, (x1, _, x2, y2) in enumerate(boxes):
+                for j, (line1, line2) in enumerate(index.lines.tolist()):
+                    mask[i, j] = intersect((x1, y2), (x2, y2), *line1), intersect((x1, y2), (x2, y2), *line2)
+            return mask
+
+        mocker.patch.object(LineIndex, "hits", hits)
+        return intersect
+
+    return patch
+
+class FakeTensor:
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+    def cpu(self) -> "FakeTensor":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.array
+
+class FakeBoxes:
+    def __init__(self, xyxys: np.ndarray, ids: np.ndarray | None, classes: np.ndarray):
+        self.xyxy = FakeTensor(xyxys.astype(np.float32))
+        self.id = None if ids is None else FakeTensor(ids.astype(np.float32))
+        self.cls = FakeTensor(classes.astype(np.float32))
+
+    def __len__(self) -> int:
+        return len(self.xyxy.array)
+
+class FakeResult:
+    def __init__(self, frame: np.ndarray, boxes: FakeBoxes):
+        self.orig_img = frame
+        self.boxes = boxes
+
+    def plot(self, **kwargs) -> np.ndarray:
+        return self.orig_img.copy()
+
+def moving_car(frame_index: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    A single car (class 0, ID 1) moving down by 2 pixels per frame.
+    """
+    y2 = 10 + 2 * frame_index
+    return np.array([[40, y2 - 20, 60, y2]]), np.array([1]), np.array([0])
+
+@pytest.fixture
+def slanted_lines() -> dict[str, tuple[LINE, LINE]]:
+    """
+    Two slanted lines crossed by `moving_car` around frames 11 and 31.
     """
-    mock_yolo = mocker.patch("flow_counter.flow_counter.YOLO", autospec=True)
-    return FlowCounter("dummy_model.pt")
\ No newline at end of file
+    return {"road": (((0, 20), (160, 60)), ((0, 60), (160, 100)))}
+
+@pytest.fixture
+def sample_video(tmp_path) -> str:
+    """
+    Writes a short 160x120 video and returns its path. See `frame_index_of`.
+    """
+    path = str(tmp_path / "input.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (160, 120))
+    for i in range(40):
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        frame[:, :4 * i] = 255
+        writer.write(frame)
+    writer.release()
+    return path
+
+def frame_index_of(frame: np.ndarray) -> int:
+    """
+    Recover the frame index of a `sample_video` frame from the width of its white band.
+    """
+    return round(int((frame.mean(axis=(0, 2)) > 127).sum()) / 4)
+
+@pytest.fixture
+def tiny_model(tmp_path) -> str:
+    """
+    Untrained yolo11n weights, to run the real model without downloads.
+    """
+    from ultralytics import YOLO
+
+    path = str(tmp_path / "tiny.pt")
+    YOLO("yolo11n.yaml").save(path)
+    return path
+
+def scripted_detections(frame: np.ndarray) -> np.ndarray:
+    """
+    Detections (x1, y1, x2, y2, conf, class) of a `sample_video` frame: `moving_car` until
+    frame 12, then nothing, then a parked car from frame 20 on, so that a frame shows only
+    a new, unconfirmed track.
+    """
+    i = frame_index_of(frame)
+    boxes = []
+    if i < 12:
+        xyxys, _, classes = moving_car(i)
+        boxes += [[*xyxy, 0.9, cls] for xyxy, cls in zip(xyxys.tolist(), classes.tolist())]
+    if i >= 20:
+        boxes.append([100, 60, 130, 90, 0.9, 0])
+    return np.array(boxes, dtype=np.float32).reshape(-1, 6)
+
+@pytest.fixture
+def scripted_detector(mocker: MockerFixture) -> None:
+    """
+    Makes the real detector output `scripted_detections`, so `model.track` and `model.predict`
+    run ultralytics' own tracking and batching on known boxes.
+    """
+    def postprocess(predictor, preds, img, orig_imgs, **kwargs):
+        return [
+            Results(orig, path="", names={0: "car"}, boxes=torch.as_tensor(scripted_detections(orig)))
+            for orig in orig_imgs
+        ]
+
+    mocker.patch("ultralytics.models.yolo.detect.DetectionPredictor.postprocess", postprocess)
+
+@pytest.fixture
+def fake_track(flow_counter: FlowCounter):
+    """
+    Makes the mocked model return `moving_car` tracks for the given `sample_video` frame.
+    """
+    flow_counter.model.names = {0: "car"}
+
+    def track(frame, *args, **kwargs):
+        return [FakeResult(frame, FakeBoxes(*moving_car(frame_index_of(frame))))]
+
+    flow_counter.model.track.side_effect = track
+    return flow_counter.model.track
+
+@pytest.fixture
+def batch_counter(mock_yolo) -> FlowCounter:
+    """
+    A counter whose mocked model detects `moving_car` in batches of `sample_video` frames.
+    """
+    counter = FlowCounter("dummy_model.pt", tracker_file="bytetrack.yaml")
+    counter.model.names = {0: "car"}
+
+    def predict(frames, *args, **kwargs):
+        results = []
+        for frame in frames:
+            xyxys, _, classes = moving_car(frame_index_of(frame))
+            boxes = np.concatenate([xyxys, np.full((len(xyxys), 1), 0.9), classes[:, None]], axis=1)
+            results.append(Results(frame, path="", names={0: "car"}, boxes=torch.as_tensor(boxes, dtype=torch.float32)))
+        return results
+
+    counter.model.predict.side_effect = predict
+    return counter
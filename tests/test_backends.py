@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+from ultralytics import YOLO
+
+from flow_counter import FlowCounter
+from flow_counter.backends import BackendOptions, export_model, exported_model_path
+
+def test_backend_options_validation() -> None:
+    with pytest.raises(ValueError):
+        BackendOptions(backend="tensorrt")
+    with pytest.raises(ValueError):
+        BackendOptions(backend="onnx", quantize=4)
+    with pytest.raises(ValueError):
+        BackendOptions(quantize=16)
+
+def test_backend_changes_video_key(mock_yolo, sample_video: str) -> None:
+    mock_yolo.return_value.overrides = {}
+    counter = FlowCounter("dummy_model.pt", backend_options=BackendOptions(imgsz=320))
+
+    assert FlowCounter("dummy_model.pt")._video_key(sample_video, {}) != counter._video_key(sample_video, {})
+    # The image size is set when the model is loaded.
+    assert counter.model.overrides == {"imgsz": 320}
+
+def test_exported_model_is_cached(mocker, tmp_path) -> None:
+    """
+    Test that a model is exported once per weights, backend and image size, and loaded from the cache after.
+    """
+    pytest.importorskip("onnxruntime")
+    weights = str(tmp_path / "tiny.pt")
+    YOLO("yolo11n.yaml").save(weights)
+    options = BackendOptions(backend="onnx", imgsz=160, cache_dir=str(tmp_path / "models"))
+    export = mocker.spy(YOLO, "export")
+
+    counter = FlowCounter(weights, backend_options=options)
+    path = export_model(weights, options)
+    result = counter.model.predict(np.zeros((120, 160, 3), dtype=np.uint8), verbose=False)[0]
+
+    assert export.call_count == 1
+    assert path == exported_model_path(weights, options)
+    assert os.listdir(tmp_path / "models") == [os.path.basename(path)]
+    assert counter.model.predictor.args.imgsz == 160
+    assert result.orig_shape == (120, 160)
+    assert exported_model_path(weights, BackendOptions(backend="onnx", cache_dir=options.cache_dir)) != path
+
+def test_fp16_export_passes_quantize(mocker, tmp_path) -> None:
+    """
+    Test that FP16 exports reach ultralytics as `quantize`, which the required ultralytics knows.
+    """
+    pytest.importorskip("onnxruntime")
+    weights = str(tmp_path / "tiny.pt")
+    YOLO("yolo11n.yaml").save(weights)
+    options = BackendOptions(backend="onnx", imgsz=160, quantize=16, cache_dir=str(tmp_path / "models"))
+    export = mocker.spy(YOLO, "export")
+
+    path = export_model(weights, options)
+
+    assert export.call_args.kwargs["quantize"] == 16
+    assert "data" not in export.call_args.kwargs
+    assert os.path.exists(path)
+    assert path == exported_model_path(weights, options)
@@ -0,0 +1,100 @@
+import os
+import shutil
+
+import pytest
+
+from flow_counter import FlowCounter
+from flow_counter.backends import BackendOptions
+from flow_counter.batch import VideoResult, _output_paths, merge_counts
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def test_merge_counts_sums_successful_results() -> None:
+    results = [
+        VideoResult("a.mp4", {"car": {"road": 2}, "bus": {}}),
+        VideoResult("b.mp4", {"car": {"road": 1, "bridge": 4}, "bus": {"road": 1}}),
+        VideoResult("c.mp4", None, "FileNotFoundError: Could not open video: c.mp4"),
+    ]
+
+    assert merge_counts(results) == {"car": {"road": 3, "bridge": 4}, "bus": {"road": 1}}
+
+def test_output_paths_are_unique_for_shared_file_names() -> None:
+    paths = _output_paths(["a/clip.mp4", "b/clip.mp4", "c/other.mp4", "clip_0.mp4"], "out")
+
+    assert paths == [
+        os.path.join("out", "clip_0_0.mp4"),
+        os.path.join("out", "clip_1.mp4"),
+        os.path.join("out", "other.mp4"),
+        os.path.join("out", "clip_0.mp4"),
+    ]
+    assert _output_paths(["a/clip.mp4"], None) == [None]
+
+def test_object_counts_many_isolates_failures(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that a broken input is reported without affecting the other videos.
+    """
+    paths = [sample_video, str(tmp_path / "missing.mp4"), sample_video]
+
+    report = flow_counter.object_counts_many(paths, slanted_lines, workers=0)
+
+    assert [r.path for r in report.results] == paths
+    assert report.cls_counts["car"] == {"road": 2}
+    assert [r.path for r in report.failures] == [str(tmp_path / "missing.mp4")]
+    assert "Could not open video" in report.failures[0].error
+
+class _ExitOnUnpickle:
+    """
+    Kills the process that unpickles it, like a worker crashing.
+    """
+    def __reduce__(self):
+        return os._exit, (1,)
+
+def test_object_counts_many_in_spawned_workers(
+    tiny_model: str,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that two spawned workers count videos sharing a file name into distinct outputs.
+    """
+    paths = [str(tmp_path / "a" / "clip.mp4"), str(tmp_path / "b" / "clip.mp4")]
+    for path in paths:
+        os.makedirs(os.path.dirname(path))
+        shutil.copy(sample_video, path)
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    counter = FlowCounter(tiny_model, backend_options=BackendOptions(imgsz=160))
+
+    report = counter.object_counts_many(paths, slanted_lines, workers=2, output_dir=str(output_dir))
+
+    assert report.failures == []
+    assert sorted(r.path for r in report.results) == paths
+    outputs = sorted(r.output_path for r in report.results)
+    assert outputs == [str(output_dir / "clip_0.mp4"), str(output_dir / "clip_1.mp4")]
+    assert all(os.path.getsize(path) > 0 for path in outputs)
+
+def test_object_counts_many_reports_crashed_workers(
+    tiny_model: str,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that videos of dead workers yield error results instead of stopping the batch.
+    """
+    counter = FlowCounter(tiny_model)
+    counter._init_kwargs = {**counter._init_kwargs, "tracker_file": _ExitOnUnpickle()}
+
+    report = counter.object_counts_many([sample_video, sample_video], slanted_lines, workers=2)
+
+    assert len(report.results) == 2
+    assert len(report.failures) == 2
+    assert all(r.error.startswith("BrokenProcessPool") for r in report.failures)
+    assert report.cls_counts == {}
@@ -0,0 +1,57 @@
+import numpy as np
+
+from flow_counter import FlowCounter
+from flow_counter.buckets import BucketedCounts
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def test_rolling_counts_match_brute_force() -> None:
+    """
+    Test that rolling totals and the bucket matrix match counting events directly,
+    including skipped buckets and buckets dropped from the ring.
+    """
+    rng = np.random.default_rng(0)
+    buckets = BucketedCounts(["car", "bus"], bucket_seconds=10.0, num_buckets=8)
+    events = []
+    t = 0.0
+    for _ in range(300):
+        t += float(rng.exponential(2.0))
+        buckets.advance(t)
+        if rng.random() < 0.5:
+            event = (t, ["car", "bus"][rng.integers(2)], ["north", "south"][rng.integers(2)])
+            events.append(event)
+            buckets.add(event[1], event[2])
+
+        current = int(t // 10)
+        for seconds in (5.0, 30.0, 80.0, 500.0):
+            first = max(current - max(1, int(np.ceil(seconds / 10))) + 1, current - 7)
+            expected = sum(1 for et, c, a in events if int(et // 10) >= first and (c, a) == ("car", "north"))
+            assert buckets.rolling_total("car", "north", seconds) == expected
+            assert buckets.rolling(seconds)["car"].get("north", 0) == expected
+
+    starts, counts = buckets.matrix()
+    assert counts.shape == (8, 2, 2)
+    for start, bucket_counts in zip(starts, counts):
+        for c, class_name in enumerate(buckets.class_names):
+            for a, area in enumerate(buckets.areas):
+                expected = sum(1 for et, cn, an in events if start <= et < start + 10 and (cn, an) == (class_name, area))
+                assert bucket_counts[c, a] == expected
+
+def test_object_counts_fills_buckets(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that a counted car lands in the bucket of its video timestamp.
+    """
+    flow_counter.bucket_seconds = 0.5
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+
+    event = next(iter(flow_counter.event_log))
+    starts, counts = flow_counter.bucketed_counts.matrix()
+    car, road = flow_counter.counted_cls_names.index("car"), flow_counter.bucketed_counts.areas.index("road")
+    assert counts[:, car, road].sum() == 1
+    assert starts[np.argmax(counts[:, car, road])] == event.timestamp // 0.5 * 0.5
@@ -0,0 +1,152 @@
+from types import SimpleNamespace
+
+import pytest
+
+from flow_counter import FlowCounter
+from flow_counter.utils import Point
+
+from conftest import frame_index_of
+
+LINE = tuple[Point, Point]
+
+def _crash_at(fake_track, crash_frame: int) -> None:
+    """
+    Makes the mocked model raise once when it reaches `crash_frame`.
+    """
+    track = fake_track.side_effect
+    crashed = []
+
+    def crashing_track(frame, *args, **kwargs):
+        if frame_index_of(frame) == crash_frame and not crashed:
+            crashed.append(crash_frame)
+            raise RuntimeError("preempted")
+        return track(frame, *args, **kwargs)
+
+    fake_track.side_effect = crashing_track
+
+def test_resume_matches_uninterrupted_run(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that a run resumed from a checkpoint ends with the same counts and events
+    as an uninterrupted run, without re-processing the checkpointed frames.
+    """
+    flow_counter.model.predictor = SimpleNamespace(trackers=[{"frame": 0}])
+    expected = flow_counter.object_counts(sample_video, None, slanted_lines)
+    expected_events = list(flow_counter.event_log)
+
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    _crash_at(fake_track, 23)
+    with pytest.raises(RuntimeError):
+        flow_counter.object_counts(sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, checkpoint_every=10)
+
+    fake_track.reset_mock()
+    cls_counts = flow_counter.object_counts(
+        sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, checkpoint_every=10, resume=True,
+    )
+
+    assert cls_counts == expected
+    assert list(flow_counter.event_log) == expected_events
+    assert flow_counter.model.predictor.trackers == [{"frame": 0}]
+    # 20 frames remain after the checkpoint at frame 20, plus one warm-up frame.
+    assert fake_track.call_count == 21
+
+def test_resume_without_tracker_state_offsets_ids(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that tracks after resuming without the tracker's state get IDs that do not clash
+    with restored ones.
+    """
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    _crash_at(fake_track, 7)
+    with pytest.raises(RuntimeError):
+        flow_counter.object_counts(sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, checkpoint_every=5)
+
+    cls_counts = flow_counter.object_counts(
+        sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, checkpoint_every=5, resume=True,
+    )
+
+    assert cls_counts["car"] == {"road": 1}
+    # The only restored ID is 1, so new IDs are offset by 2.
+    assert [event.track_id for event in flow_counter.event_log] == [3]
+
+def test_resume_rejects_checkpoint_of_other_video(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    flow_counter.object_counts(sample_video, None, slanted_lines, checkpoint_path=checkpoint_path)
+    flow_counter.model_path = "other.pt"
+
+    with pytest.raises(ValueError):
+        flow_counter.object_counts(sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, resume=True)
+
+def test_resume_rejects_checkpoint_of_other_line_map(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that crossings recorded against one line map are not resumed with another.
+    """
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    flow_counter.object_counts(sample_video, None, slanted_lines, checkpoint_path=checkpoint_path)
+    moved_lines = {"road": (slanted_lines["road"][0], ((0, 70), (160, 110)))}
+
+    with pytest.raises(ValueError, match="line map"):
+        flow_counter.object_counts(sample_video, None, moved_lines, checkpoint_path=checkpoint_path, resume=True)
+    assert flow_counter._video_key(sample_video, moved_lines) == flow_counter._video_key(sample_video, slanted_lines)
+
+def test_batched_resume_restores_standalone_tracker(
+    batch_counter: FlowCounter,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that a batched run resumes with the state of its standalone tracker, keeping track IDs.
+    """
+    expected = batch_counter.object_counts(sample_video, None, slanted_lines, detect_batch=4)
+    expected_events = list(batch_counter.event_log)
+
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    predict = batch_counter.model.predict.side_effect
+    crashed = []
+
+    def crashing_predict(frames, *args, **kwargs):
+        if any(frame_index_of(frame) == 23 for frame in frames) and not crashed:
+            crashed.append(True)
+            raise RuntimeError("preempted")
+        return predict(frames, *args, **kwargs)
+
+    batch_counter.model.predict.side_effect = crashing_predict
+    with pytest.raises(RuntimeError):
+        batch_counter.object_counts(
+            sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, checkpoint_every=10, detect_batch=4,
+        )
+
+    batch_counter.model.predict.reset_mock()
+    cls_counts = batch_counter.object_counts(
+        sample_video, None, slanted_lines, checkpoint_path=checkpoint_path, checkpoint_every=10, resume=True,
+        detect_batch=4,
+    )
+
+    assert cls_counts == expected
+    assert list(batch_counter.event_log) == expected_events
+    # The 20 frames after the checkpoint at frame 20, without a warm-up frame.
+    assert sum(len(call.args[0]) for call in batch_counter.model.predict.call_args_list) == 20
+    assert batch_counter._id_offset == 0
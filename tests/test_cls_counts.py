@@ -1,5 +1,4 @@
 import numpy as np
-from pytest_mock import MockerFixture
 
 from flow_counter import FlowCounter
 from flow_counter.utils import Point
@@ -7,7 +6,7 @@ from flow_counter.utils import Point
 LINE = tuple[Point, Point]
 
 def test_count_crossing_objects_updates_cls_counts(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: dict[str, tuple[LINE, LINE]], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -18,7 +17,7 @@ def test_count_crossing_objects_updates_cls_counts(
     ids = np.array([1])
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car"}
 
     flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -26,7 +25,7 @@ def test_count_crossing_objects_updates_cls_counts(
     assert flow_counter.cls_counts == {"person": {}, "car": {"dummy": 1}, "motorcycle": {}, "bus": {}, "truck": {}}
 
 def test_count_crossing_objects_accumulates_same_class(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: dict[str, tuple[LINE, LINE]], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -37,7 +36,7 @@ def test_count_crossing_objects_accumulates_same_class(
     ids = np.array([1, 2])
     classes = np.array([0, 0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car"}
 
     flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -45,7 +44,7 @@ def test_count_crossing_objects_accumulates_same_class(
     assert flow_counter.cls_counts == {"person": {}, "car": {"dummy": 2}, "motorcycle": {}, "bus": {}, "truck": {}}
 
 def test_count_crossing_objects_only_vehicles(
-    mocker, dummy_line, flow_counter
+    patch_intersect, dummy_line, flow_counter
 ):
     """
     Only vehicle classes in counted_cls_name should be counted.
@@ -54,7 +53,7 @@ def test_count_crossing_objects_only_vehicles(
     ids = np.array([1, 2])
     classes = np.array([0, 1])  # 0: "car", 1: "dog"
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car", 1: "dog"}
 
     flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -63,7 +62,7 @@ def test_count_crossing_objects_only_vehicles(
     assert flow_counter.cls_counts == {"person": {}, "car": {"dummy": 1}, "motorcycle": {}, "bus": {}, "truck": {}}
 
 def test_count_crossing_objects_multiple_vehicle_types(
-    mocker, dummy_line, flow_counter
+    patch_intersect, dummy_line, flow_counter
 ):
     """
     Different vehicle types are counted separately if they cross.
@@ -72,7 +71,7 @@ def test_count_crossing_objects_multiple_vehicle_types(
     ids = np.array([1, 2, 3])
     classes = np.array([0, 1, 2])  # 0: car, 1: bus, 2: dog
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car", 1: "bus", 2: "dog"}
 
     flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -81,7 +80,7 @@ def test_count_crossing_objects_multiple_vehicle_types(
     assert flow_counter.cls_counts == {"person": {}, "car": {"dummy": 1}, "motorcycle": {}, "bus": {"dummy": 1}, "truck": {}}
 
 def test_count_crossing_objects_skips_non_intersecting_boxes(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: dict[str, tuple[LINE, LINE]], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -92,7 +91,7 @@ def test_count_crossing_objects_skips_non_intersecting_boxes(
     ids = np.array([1])
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=False)
+    patch_intersect(return_value=False)
     flow_counter.model.names = {0: "car"}
 
     result = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -101,7 +100,7 @@ def test_count_crossing_objects_skips_non_intersecting_boxes(
     assert flow_counter.cls_counts == {"person": {}, "car": {}, "motorcycle": {}, "bus": {}, "truck": {}}
 
 def test_count_crossing_objects_skips_already_counted_id(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: dict[str, tuple[LINE, LINE]], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -112,7 +111,7 @@ def test_count_crossing_objects_skips_already_counted_id(
     ids = np.array([1])
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car"}
     flow_counter.counted_ids = {1}
 
@@ -122,7 +121,7 @@ def test_count_crossing_objects_skips_already_counted_id(
     assert flow_counter.cls_counts == {"person": {}, "car": {}, "motorcycle": {}, "bus": {}, "truck": {}}
 
 def test_count_when_crossing_both_lines(
-    mocker: MockerFixture,
+    patch_intersect,
     dummy_two_lines: dict[str, tuple[LINE, LINE]], 
     flow_counter: FlowCounter,
 ) -> None:
@@ -137,11 +136,11 @@ def test_count_when_crossing_both_lines(
     classes = np.array([0])
 
     # 1st frame: object crosses the first line only
-    mocker.patch("flow_counter.flow_counter.intersect", side_effect=[True, False])
+    patch_intersect(side_effect=[True, False])
     flow_counter._count_crossing_objects(boxes, ids, classes, dummy_two_lines)
 
     # 2nd frame: same object now crosses the second line
-    mocker.patch("flow_counter.flow_counter.intersect", side_effect=[False, True])
+    patch_intersect(side_effect=[False, True])
     count = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_two_lines)
 
     # Now it should be counted after crossing both lines
@@ -150,7 +149,7 @@ def test_count_when_crossing_both_lines(
 
 
 def test_not_count_when_crossing_only_one_line(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_two_lines: dict[str, tuple[LINE, LINE]], 
     flow_counter: FlowCounter,
 ) -> None:
@@ -165,13 +164,74 @@ def test_not_count_when_crossing_only_one_line(
     classes = np.array([0])
 
     # 1st frame: object crosses the first line only
-    mocker.patch("flow_counter.flow_counter.intersect", side_effect=[True, False])
+    patch_intersect(side_effect=[True, False])
     flow_counter._count_crossing_objects(boxes, ids, classes, dummy_two_lines)
 
     # 2nd frame: same object now crosses the second line
-    mocker.patch("flow_counter.flow_counter.intersect", side_effect=[False, False])
+    patch_intersect(side_effect=[False, False])
     count = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_two_lines)
 
     # Now it should be counted after crossing both lines
     assert count == 0
-    assert "dummy" not in flow_counter.cls_counts["car"]
\ No newline at end of file
+    assert "dummy" not in flow_counter.cls_counts["car"]
+
+def _random_frames(seed: int, n_frames: int = 40, n_boxes: int = 12) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(n_frames):
+        xy = rng.uniform(0, 200, size=(n_boxes, 2))
+        wh = rng.uniform(5, 60, size=(n_boxes, 2))
+        boxes = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+        ids = rng.integers(-1, 20, size=n_boxes)
+        classes = rng.integers(0, 3, size=n_boxes).astype(np.float32)
+        frames.append((boxes, ids, classes))
+    return frames
+
+def test_vectorized_engine_matches_scalar_engine(
+    scalar_flow_counter: FlowCounter,
+    vectorized_flow_counter: FlowCounter,
+) -> None:
+    """
+    The vectorized crossing engine gives exactly the same counts as the scalar path.
+    """
+    line_map = {
+        "a": (((0, 50), (200, 60)), ((0, 120), (200, 110))),
+        "b": (((100, 0), (100, 250)), ((150, 0), (160, 250))),
+        "c": (((0, 0), (250, 250)), ((0, 180), (250, 180))),
+    }
+    for fc in (scalar_flow_counter, vectorized_flow_counter):
+        fc.model.names = {0: "car", 1: "bus", 2: "dog"}
+
+    for seed in range(5):
+        scalar_flow_counter._reset()
+        vectorized_flow_counter._reset()
+        for boxes, ids, classes in _random_frames(seed):
+            expected = scalar_flow_counter._count_crossing_objects(boxes, ids, classes, line_map)
+            actual = vectorized_flow_counter._count_crossing_objects(boxes, ids, classes, line_map)
+            assert actual == expected
+
+        assert vectorized_flow_counter.cls_counts == scalar_flow_counter.cls_counts
+        assert vectorized_flow_counter.counted_ids == scalar_flow_counter.counted_ids
+        assert vectorized_flow_counter.crossed_lines == scalar_flow_counter.crossed_lines
+        assert vectorized_flow_counter.uf._ids == scalar_flow_counter.uf._ids
+
+def test_vectorized_engine_counts_when_crossing_both_lines(
+    vectorized_flow_counter: FlowCounter,
+) -> None:
+    """
+    Same scenario as test_count_when_crossing_both_lines, with real geometry.
+    """
+    line_map = {"dummy": (((0, 0), (100, 10)), ((0, 100), (100, 110)))}
+    vectorized_flow_counter.model.names = {0: "car"}
+    ids = np.array([1])
+    classes = np.array([0])
+
+    # 1st frame: bottom edge crosses the first line only
+    vectorized_flow_counter._count_crossing_objects(np.array([[10, -10, 20, 2]]), ids, classes, line_map)
+    assert vectorized_flow_counter.cls_counts["car"] == {}
+
+    # 2nd frame: same object now crosses the second line
+    count = vectorized_flow_counter._count_crossing_objects(np.array([[10, 90, 20, 102]]), ids, classes, line_map)
+
+    assert count == 1
+    assert vectorized_flow_counter.cls_counts["car"]["dummy"] == 1
@@ -1,11 +1,10 @@
 import numpy as np
-from pytest_mock import MockerFixture
 
 from flow_counter import FlowCounter
 from flow_counter.utils import Point
 
 def test_count_crossing_objects_counts_new_ids(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: tuple[Point, Point], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -16,7 +15,7 @@ def test_count_crossing_objects_counts_new_ids(
     ids = np.array([1])
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car"}
 
     result = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -25,7 +24,7 @@ def test_count_crossing_objects_counts_new_ids(
     assert 1 in flow_counter.counted_ids
 
 def test_count_crossing_objects_skips_non_intersection(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: tuple[Point, Point], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -36,7 +35,7 @@ def test_count_crossing_objects_skips_non_intersection(
     ids = np.array([2])
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=False)
+    patch_intersect(return_value=False)
     flow_counter.model.names = {0: "car"}
 
     result = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -45,7 +44,7 @@ def test_count_crossing_objects_skips_non_intersection(
     assert 2 not in flow_counter.counted_ids
 
 def test_count_crossing_objects_skips_already_counted(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: tuple[Point, Point], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -57,7 +56,7 @@ def test_count_crossing_objects_skips_already_counted(
     flow_counter.counted_ids.add(3)
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car"}
 
     result = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
@@ -66,7 +65,7 @@ def test_count_crossing_objects_skips_already_counted(
     assert flow_counter.counted_ids == {3}
 
 def test_count_crossing_objects_skips_invalid_id(
-    mocker: MockerFixture, 
+    patch_intersect, 
     dummy_line: tuple[Point, Point], 
     flow_counter: FlowCounter, 
 ) -> None:
@@ -77,10 +76,81 @@ def test_count_crossing_objects_skips_invalid_id(
     ids = np.array([-1])
     classes = np.array([0])
 
-    mocker.patch("flow_counter.flow_counter.intersect", return_value=True)
+    patch_intersect(return_value=True)
     flow_counter.model.names = {0: "car"}
 
     result = flow_counter._count_crossing_objects(boxes, ids, classes, dummy_line)
 
     assert result == 0
-    assert flow_counter.counted_ids == set()
\ No newline at end of file
+    assert flow_counter.counted_ids == set()
+
+def test_merge_with_counted_track_keeps_counted_root(
+    patch_intersect, 
+    dummy_line: tuple[Point, Point], 
+    flow_counter: FlowCounter, 
+) -> None:
+    """
+    Test that a new ID overlapping a counted track is merged into it and not counted again.
+    """
+    patch_intersect(return_value=True)
+    flow_counter.model.names = {0: "car"}
+    flow_counter._count_crossing_objects(np.array([[10, 10, 20, 20]]), np.array([1]), np.array([0]), dummy_line)
+
+    # The tracker switches ID while the old ID lingers on the same box
+    boxes = np.array([[10, 10, 20, 20], [10, 10, 20, 20]])
+    result = flow_counter._count_crossing_objects(boxes, np.array([1, 2]), np.array([0, 0]), dummy_line)
+
+    assert result == 0
+    assert flow_counter.uf.is_connected(1, 2)
+    assert flow_counter.counted_ids == {flow_counter.uf.find(2)}
+
+def _overlapping_tracks(seed: int, n_frames: int = 80) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Objects moving down through two lines, often detected twice (IoU > 0.5) and switching IDs.
+    """
+    rng = np.random.default_rng(seed)
+    boxes = np.concatenate([rng.uniform(0, 150, size=(8, 1)), rng.uniform(-60, 0, size=(8, 1))], axis=1)
+    boxes = np.concatenate([boxes, boxes + 30], axis=1)
+    ids = np.arange(1, 9)
+    next_id = 9
+    frames = []
+    for _ in range(n_frames):
+        boxes[:, [1, 3]] += rng.uniform(1, 5, size=(8, 1))
+        switched = rng.random(8) < 0.05
+        ids[switched] = np.arange(next_id, next_id + switched.sum())
+        next_id += switched.sum()
+        duplicated = rng.random(8) < 0.3
+        duplicates = boxes[duplicated] + rng.uniform(-2, 2, size=(duplicated.sum(), 4))
+        duplicate_ids = np.arange(next_id, next_id + duplicated.sum())
+        next_id += duplicated.sum()
+        frames.append((
+            np.concatenate([boxes, duplicates]).astype(np.float32),
+            np.concatenate([ids, duplicate_ids]).tolist(),
+            np.zeros(8 + duplicated.sum()),
+        ))
+    return frames
+
+def test_vectorized_suppression_matches_scalar_engine(
+    scalar_flow_counter: FlowCounter,
+    vectorized_flow_counter: FlowCounter,
+) -> None:
+    """
+    Test that both engines suppress duplicates and count the same roots on overlapping tracks.
+    """
+    line_map = {"road": (((0, 40), (200, 90)), ((0, 110), (200, 160)))}
+    for fc in (scalar_flow_counter, vectorized_flow_counter):
+        fc.model.names = {0: "car"}
+
+    for seed in range(5):
+        scalar_flow_counter._reset()
+        vectorized_flow_counter._reset()
+        for boxes, ids, classes in _overlapping_tracks(seed):
+            expected = scalar_flow_counter._count_crossing_objects(boxes, ids, classes, line_map)
+            actual = vectorized_flow_counter._count_crossing_objects(boxes, ids, classes, line_map)
+            assert actual == expected
+
+        assert vectorized_flow_counter.counted_ids == scalar_flow_counter.counted_ids
+        assert vectorized_flow_counter.cls_counts == scalar_flow_counter.cls_counts
+        # Duplicates were merged, and only union-find roots are kept as counted.
+        assert vectorized_flow_counter.uf.num_sets < len(vectorized_flow_counter.uf)
+        assert all(vectorized_flow_counter.uf.find(root) == root for root in vectorized_flow_counter.counted_ids)
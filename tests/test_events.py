@@ -0,0 +1,72 @@
+import csv
+import json
+
+import numpy as np
+
+from flow_counter import FlowCounter
+from flow_counter.events import CrossingEvent, EventLog
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def test_event_log_grows_and_exports(tmp_path) -> None:
+    """
+    Test that the event log grows past its capacity and exports the same rows in every format.
+    """
+    log = EventLog(capacity=2)
+    events = [
+        CrossingEvent(10 + i, 0.5 * i, i, ["car", "bus"][i % 2], ["north", "south", "east"][i % 3], i, i + 5)
+        for i in range(7)
+    ]
+    for event in events:
+        log.append(event)
+
+    assert len(log) == 7
+    assert list(log) == events
+
+    arrays = log.to_numpy()
+    assert arrays["frame_index"].tolist() == [e.frame_index for e in events]
+    assert arrays["class_name"].tolist() == [e.class_name for e in events]
+    assert arrays["area"].tolist() == [e.area for e in events]
+    codes = log.to_numpy(decode=False)
+    assert codes["class_name"].dtype == np.int32
+    assert [log.class_names[c] for c in codes["class_name"]] == [e.class_name for e in events]
+
+    log.to_csv(str(tmp_path / "events.csv"))
+    with open(tmp_path / "events.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["line2_frame"]) for row in rows] == [e.line2_frame for e in events]
+    assert [row["area"] for row in rows] == [e.area for e in events]
+
+    log.to_jsonl(str(tmp_path / "events.jsonl"))
+    with open(tmp_path / "events.jsonl") as f:
+        assert [CrossingEvent(**json.loads(line)) for line in f] == events
+
+def test_empty_event_log_exports(tmp_path) -> None:
+    """
+    Test that an empty log exports empty columns.
+    """
+    log = EventLog()
+
+    assert all(len(column) == 0 for column in log.to_numpy().values())
+    log.to_csv(str(tmp_path / "events.csv"))
+    with open(tmp_path / "events.csv") as f:
+        assert len(f.readlines()) == 1
+
+def test_object_counts_records_events(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that a counted car is logged with the frames at which it crossed each line.
+    """
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+
+    events = list(flow_counter.event_log)
+    assert len(events) == 1
+    event = events[0]
+    assert (event.track_id, event.class_name, event.area) == (1, "car", "road")
+    assert event.line1_frame < event.line2_frame == event.frame_index
+    assert event.timestamp == event.frame_index / 25
@@ -0,0 +1,74 @@
+import numpy as np
+
+from flow_counter import FlowCounter
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def _run_frames(flow_counter: FlowCounter, line_map, frames) -> None:
+    for ids in frames:
+        boxes = np.array([[10 + 30 * i, 10, 20 + 30 * i, 20] for i in range(len(ids))])
+        flow_counter._count_crossing_objects(boxes, np.array(ids), np.zeros(len(ids)), line_map)
+
+def test_idle_tracks_are_evicted_without_changing_counts(
+    patch_intersect,
+    dummy_line: dict[str, tuple[LINE, LINE]],
+    flow_counter: FlowCounter,
+) -> None:
+    """
+    Test that tracks unseen for longer than track_ttl are dropped from all tracking state.
+    """
+    patch_intersect(return_value=True)
+    flow_counter.model.names = {0: "car"}
+    flow_counter.track_ttl = 4
+
+    _run_frames(flow_counter, dummy_line, [[1, 2]] + [[3]] * 10)
+
+    assert flow_counter.cls_counts["car"]["dummy"] == 3
+    assert flow_counter.counted_ids == {3}
+    assert set(flow_counter.crossed_lines) == {3}
+    assert 1 not in flow_counter.uf and 2 not in flow_counter.uf
+
+    stats = flow_counter.eviction_stats()
+    assert stats.live_roots == 1
+    assert stats.evicted_roots == 2
+    assert stats.evicted_ids == 2
+    assert stats.bytes_estimate > 0
+
+def test_max_tracks_evicts_least_recently_seen(
+    patch_intersect,
+    dummy_line: dict[str, tuple[LINE, LINE]],
+    flow_counter: FlowCounter,
+) -> None:
+    """
+    Test that the hard cap keeps only the most recently seen tracks.
+    """
+    patch_intersect(return_value=True)
+    flow_counter.model.names = {0: "car"}
+    flow_counter.max_tracks = 2
+
+    _run_frames(flow_counter, dummy_line, [[1], [2], [3], [4]])
+
+    assert set(flow_counter.last_seen) == {3, 4}
+    assert flow_counter.counted_ids == {3, 4}
+    assert flow_counter.cls_counts["car"]["dummy"] == 4
+    assert flow_counter.eviction_stats().evicted_roots == 2
+
+def test_max_tracks_keeps_visible_counted_tracks(
+    patch_intersect,
+    dummy_line: dict[str, tuple[LINE, LINE]],
+    flow_counter: FlowCounter,
+) -> None:
+    """
+    Test that a counted track still visible when the cap is exceeded is kept, and not counted again.
+    """
+    patch_intersect(return_value=True)
+    flow_counter.model.names = {0: "car"}
+    flow_counter.max_tracks = 2
+
+    _run_frames(flow_counter, dummy_line, [[1], [1, 2, 3], [1, 2, 3], [1]])
+
+    assert flow_counter.cls_counts["car"]["dummy"] == 3
+    # Once 2 and 3 are idle, the least recently seen of them is dropped.
+    assert set(flow_counter.last_seen) == {1, 3}
+    assert flow_counter.eviction_stats().evicted_roots == 1
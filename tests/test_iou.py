@@ -1,5 +1,5 @@
 import numpy as np
-from flow_counter.utils import compute_iou
+from flow_counter.utils import compute_iou, compute_iou_matrix
 
 def test_iou_perfect_overlap():
     box = np.array([10, 10, 20, 20])
@@ -32,3 +32,16 @@ def test_iou_contained():
     area2 = 36
     expected = inter / (area1 + area2 - inter)
     assert np.isclose(compute_iou(box1, box2), expected)
+
+def test_iou_matrix_matches_pairwise():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 100, size=(8, 2))
+    boxes = np.concatenate([xy, xy + rng.uniform(0, 50, size=(8, 2))], axis=1).astype(np.float32)
+    boxes[0] = boxes[1] = [5, 5, 5, 5]  # zero-area boxes
+
+    matrix = compute_iou_matrix(boxes[:3], boxes)
+
+    assert matrix.shape == (3, 8)
+    for i in range(3):
+        for j in range(8):
+            assert matrix[i, j] == compute_iou(boxes[i], boxes[j])
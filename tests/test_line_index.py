@@ -0,0 +1,61 @@
+import numpy as np
+
+from flow_counter import FlowCounter
+from flow_counter.line_index import LineIndex
+from flow_counter.utils import bottom_edge_hits
+
+def _grid_line_map(rows: int, cols: int, size: int = 40) -> dict:
+    """
+    Areas of two short slanted lines, tiled like the bays of a parking lot.
+    """
+    return {
+        f"bay{r}_{c}": (
+            ((c * size, r * size + 10), (c * size + 30, r * size + 14)),
+            ((c * size, r * size + 25), (c * size + 30, r * size + 29)),
+        )
+        for r in range(rows)
+        for c in range(cols)
+    }
+
+def test_index_matches_dense_hits() -> None:
+    """
+    Test that the indexed crossing tests agree with testing every box against every line.
+    """
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        lines = rng.integers(-50, 500, size=(rng.integers(0, 40), 2, 2, 2))
+        # Some horizontal and vertical lines, which share a coordinate with many bottom edges.
+        lines[:5, :, 1, 1] = lines[:5, :, 0, 1]
+        lines[5:10, :, 1, 0] = lines[5:10, :, 0, 0]
+        # Boxes partly outside the lines' extent, some with x1 > x2.
+        boxes = rng.uniform(-100, 600, size=(rng.integers(0, 30), 4))
+        index = LineIndex(lines, max_cells=int(rng.integers(1, 64)), dense_pairs=0)
+
+        assert np.array_equal(index.hits(boxes), bottom_edge_hits(boxes, lines))
+
+def test_index_of_many_areas_matches_scalar_engine(
+    scalar_flow_counter: FlowCounter,
+    vectorized_flow_counter: FlowCounter,
+) -> None:
+    """
+    Test that counting over hundreds of areas, where the index is used, matches the scalar path.
+    """
+    line_map = _grid_line_map(10, 15)
+    rng = np.random.default_rng(1)
+    for fc in (scalar_flow_counter, vectorized_flow_counter):
+        fc.model.names = {0: "car", 1: "bus"}
+
+    positions = rng.uniform(0, 560, size=(40, 2))
+    for _ in range(30):
+        positions[:, 1] += rng.uniform(0, 8, size=40)
+        boxes = np.concatenate([positions - 20, positions], axis=1).astype(np.float32)
+        ids = np.arange(40)
+        classes = np.arange(40) % 2
+        expected = scalar_flow_counter._count_crossing_objects(boxes, ids, classes, line_map)
+        actual = vectorized_flow_counter._count_crossing_objects(boxes, ids, classes, line_map)
+        assert actual == expected
+
+    assert len(boxes) * 2 * len(line_map) > vectorized_flow_counter._index.dense_pairs
+    assert sum(vectorized_flow_counter.cls_counts["car"].values()) > 0
+    assert vectorized_flow_counter.cls_counts == scalar_flow_counter.cls_counts
+    assert vectorized_flow_counter.crossed_lines == scalar_flow_counter.crossed_lines
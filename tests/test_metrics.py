@@ -0,0 +1,76 @@
+from flow_counter import FlowCounter
+from flow_counter.metrics import Histogram, RunMetrics
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def test_histogram_buckets() -> None:
+    """
+    Test that observations fall into the first bucket whose bound is not below them.
+    """
+    hist = Histogram((1, 2, 5))
+    for value in (0, 1, 1.5, 3, 7, 9):
+        hist.observe(value)
+
+    assert hist.counts == [2, 1, 1, 2]
+    assert (hist.count, hist.sum, hist.max) == (6, 21.5, 9)
+    assert hist.quantile(0.5) == 2
+    assert hist.quantile(1.0) == 9
+
+def test_prometheus_histograms_are_cumulative() -> None:
+    metrics = RunMetrics({"source": "cam1"})
+    metrics.stages["track"].observe(0.003)
+    metrics.stages["track"].observe(0.2)
+
+    text = metrics.to_prometheus()
+
+    assert 'flow_counter_stage_seconds_bucket{source="cam1",stage="track",le="0.0025"} 0' in text
+    assert 'flow_counter_stage_seconds_bucket{source="cam1",stage="track",le="0.005"} 1' in text
+    assert 'flow_counter_stage_seconds_bucket{source="cam1",stage="track",le="+Inf"} 2' in text
+    assert 'flow_counter_stage_seconds_count{source="cam1",stage="track"} 2' in text
+
+def test_prometheus_escapes_label_values() -> None:
+    metrics = RunMetrics({"source": 'cam "north"\\door\nleft'})
+
+    text = metrics.to_prometheus()
+
+    assert 'flow_counter_fps{source="cam \\"north\\"\\\\door\\nleft"} 0' in text
+    assert all(line.startswith(("#", "flow_counter_")) for line in text.splitlines())
+
+def test_object_counts_records_stage_metrics(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that every stage of every frame is timed and the metrics are exported at the end.
+    """
+    reports = []
+    metrics_path = str(tmp_path / "flow_counter.prom")
+    flow_counter.object_counts(
+        sample_video, str(tmp_path / "out.mp4"), slanted_lines, metrics_path=metrics_path, on_metrics=reports.append,
+    )
+
+    metrics = flow_counter.run_metrics
+    assert {stage: hist.count for stage, hist in metrics.stages.items()} == {
+        "decode": 40, "track": 40, "convert": 40, "count": 40, "render": 40, "write": 40,
+    }
+    assert metrics.frames == 40
+    assert metrics.detections.count == 40
+    assert metrics.counted == 1
+    assert metrics.fps > 0
+    assert reports[-1] is metrics
+    with open(metrics_path) as f:
+        assert f'flow_counter_frames_total{{source="{sample_video}"}} 40' in f.read()
+
+def test_object_counts_without_metrics(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+
+    assert flow_counter.run_metrics is None
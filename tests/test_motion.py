@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+
+from conftest import FakeBoxes, FakeResult
+from flow_counter import FlowCounter
+from flow_counter.motion import MotionGate, MotionOptions
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+LINE_MAP = {"road": (((0, 20), (160, 30)), ((0, 80), (160, 90)))}
+
+def _car_frame(y2: int | None) -> np.ndarray:
+    """
+    A 160x120 frame with a white car (x 60-100) whose bottom edge is at `y2`, or an empty road.
+    """
+    frame = np.full((120, 160, 3), 40, dtype=np.uint8)
+    if y2 is not None:
+        frame[max(0, y2 - 20):y2, 60:100] = 255
+    return frame
+
+@pytest.mark.parametrize("method", ["diff", "background"])
+def test_gate_skips_idle_frames(method: str) -> None:
+    gate = MotionGate(LINE_MAP, (160, 120), MotionOptions(method=method, band=8, downscale=2, keepalive=100))
+
+    assert gate.check(_car_frame(None))
+    assert not gate.check(_car_frame(None))
+    # Motion far from the lines.
+    frame = _car_frame(None)
+    frame[110:, :10] = 255
+    assert not gate.check(frame)
+    # A car entering the band around the first line.
+    assert gate.check(_car_frame(30))
+    assert gate.stats.skipped == 2
+    assert gate.stats.skip_ratio == 0.5
+
+def test_gate_keepalive() -> None:
+    gate = MotionGate(LINE_MAP, (160, 120), MotionOptions(keepalive=3))
+    runs = [gate.check(_car_frame(None)) for _ in range(7)]
+
+    assert runs == [True, False, False, True, False, False, True]
+    assert gate.stats.keepalives == 2
+
+def test_gated_object_counts_match_ungated(mock_yolo, tmp_path) -> None:
+    """
+    Test that skipping idle frames does not change the counts of a car crossing after an idle stretch.
+    """
+    path = str(tmp_path / "night.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (160, 120))
+    for i in range(80):
+        writer.write(_car_frame(None if i < 30 else 4 * (i - 30)))
+    writer.release()
+
+    def track(frame, *args, **kwargs):
+        ys, xs = np.nonzero(frame[..., 0] > 127)
+        if len(ys) == 0:
+            return [FakeResult(frame, FakeBoxes(np.zeros((0, 4)), np.zeros(0), np.zeros(0)))]
+        box = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]])
+        return [FakeResult(frame, FakeBoxes(box, np.array([1]), np.array([0])))]
+
+    counts = {}
+    for gated in (False, True):
+        counter = FlowCounter("dummy_model.pt", motion_options=MotionOptions(keepalive=10) if gated else None)
+        counter.model.names = {0: "car"}
+        counter.model.track.reset_mock()
+        counter.model.track.side_effect = track
+        counts[gated] = counter.object_counts(path, str(tmp_path / "out.mp4"), LINE_MAP)
+
+    assert counts[True] == counts[False]
+    assert counts[True]["car"] == {"road": 1}
+    assert counter.motion_stats.frames == 80
+    assert counter.motion_stats.skipped > 20
+    assert counter.model.track.call_count == 80 - counter.motion_stats.skipped
@@ -0,0 +1,131 @@
+import cv2
+import numpy as np
+import pytest
+
+from flow_counter import FlowCounter
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def _read_all(path: str) -> list[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def test_object_counts_counts_moving_car(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that a car crossing both lines in a video is counted once.
+    """
+    cls_counts = flow_counter.object_counts(sample_video, str(tmp_path / "out.mp4"), slanted_lines)
+
+    assert cls_counts["car"] == {"road": 1}
+    assert len(_read_all(str(tmp_path / "out.mp4"))) == 40
+
+def test_pipelined_object_counts_matches_serial(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that the pipelined run writes the same frames and counts as the serial run.
+    """
+    serial = flow_counter.object_counts(sample_video, str(tmp_path / "serial.mp4"), slanted_lines)
+    serial = {name: dict(counts) for name, counts in serial.items()}
+    pipelined = flow_counter.object_counts(
+        sample_video, str(tmp_path / "pipelined.mp4"), slanted_lines, pipelined=True, queue_size=2
+    )
+
+    assert pipelined == serial
+    serial_frames = _read_all(str(tmp_path / "serial.mp4"))
+    pipelined_frames = _read_all(str(tmp_path / "pipelined.mp4"))
+    assert len(pipelined_frames) == len(serial_frames) == 40
+    assert all(np.array_equal(a, b) for a, b in zip(serial_frames, pipelined_frames))
+    assert flow_counter.pipeline_stats.stages["encode"].items == 40
+
+def test_headless_object_counts_skips_rendering(
+    mocker,
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that without an output path no writer is opened and nothing is drawn.
+    """
+    writer = mocker.patch("flow_counter.flow_counter.cv2.VideoWriter")
+    render = mocker.spy(flow_counter, "_render")
+
+    cls_counts = flow_counter.object_counts(sample_video, None, slanted_lines)
+
+    assert cls_counts["car"] == {"road": 1}
+    writer.assert_not_called()
+    render.assert_not_called()
+
+def test_preview_every_writes_every_nth_frame(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that only every Nth frame is written while every frame is counted.
+    """
+    cls_counts = flow_counter.object_counts(sample_video, str(tmp_path / "preview.mp4"), slanted_lines, preview_every=4)
+
+    assert cls_counts["car"] == {"road": 1}
+    assert len(_read_all(str(tmp_path / "preview.mp4"))) == 10
+
+@pytest.mark.parametrize("preview_every", [0, -2])
+def test_preview_every_must_be_positive(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+    preview_every: int,
+) -> None:
+    with pytest.raises(ValueError):
+        flow_counter.object_counts(sample_video, str(tmp_path / "preview.mp4"), slanted_lines, preview_every=preview_every)
+    fake_track.assert_not_called()
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_batched_detection_counts_moving_car(
+    batch_counter: FlowCounter,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+    pipelined: bool,
+) -> None:
+    """
+    Test that detecting batches of frames and tracking them in order counts the car once,
+    on the same frames as per-frame tracking.
+    """
+    cls_counts = batch_counter.object_counts(
+        sample_video, str(tmp_path / "out.mp4"), slanted_lines, pipelined=pipelined, queue_size=2, detect_batch=16,
+    )
+
+    assert cls_counts["car"] == {"road": 1}
+    assert [(event.line1_frame, event.line2_frame) for event in batch_counter.event_log] == [(11, 31)]
+    assert [len(call.args[0]) for call in batch_counter.model.predict.call_args_list] == [16, 16, 8]
+    batch_counter.model.track.assert_not_called()
+    assert len(_read_all(str(tmp_path / "out.mp4"))) == 40
+    assert batch_counter._tracker is None
+
+def test_detect_batch_must_be_positive(batch_counter: FlowCounter, sample_video: str, dummy_line) -> None:
+    with pytest.raises(ValueError):
+        batch_counter.object_counts(sample_video, None, dummy_line, detect_batch=0)
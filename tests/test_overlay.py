@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+from pytest_mock import MockerFixture
+
+from flow_counter import FlowCounter
+import flow_counter.flow_counter as flow_counter_module
+from flow_counter.utils import draw_table_on_image
+
+def _annotate_directly(flow_counter: FlowCounter, frame: np.ndarray, line_map: dict, cls_counts: dict) -> np.ndarray:
+    for (line1, line2) in line_map.values():
+        cv2.line(frame, line1[0], line1[1], (0, 255, 255), 3)
+        cv2.line(frame, line2[0], line2[1], (0, 255, 0), 3)
+    table_data = [["Vehicle"] + list(line_map)]
+    for vehicle_name in flow_counter.counted_cls_names:
+        table_data.append([vehicle_name] + [str(cls_counts[vehicle_name].get(name, 0)) for name in line_map])
+    return draw_table_on_image(frame, table_data)
+
+def test_cached_overlay_matches_direct_drawing(flow_counter: FlowCounter, mocker: MockerFixture) -> None:
+    """
+    Test that annotated frames are pixel-identical to drawing everything on every frame,
+    while the table is only rendered again when the counts change.
+    """
+    draw_table = mocker.spy(flow_counter_module, "draw_table_on_image")
+    rng = np.random.default_rng(0)
+    line_map = {
+        "north": (((0, 200), (640, 260)), ((0, 300), (640, 360))),
+        "a_long_area_name": (((100, 0), (120, 480)), ((300, 0), (280, 480))),
+    }
+    cls_counts = {name: {} for name in flow_counter.counted_cls_names}
+
+    for i in range(12):
+        if i % 4 == 3:
+            cls_counts["car"]["north"] = cls_counts["car"].get("north", 0) + 1000
+        frame = rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+        expected = _annotate_directly(flow_counter, frame.copy(), line_map, cls_counts)
+        annotated = flow_counter._annotate_frame(frame, line_map, 0, cls_counts)
+        assert np.array_equal(annotated, expected)
+
+    # The initial table and one per change of the counts, each drawn on a black and a white canvas.
+    assert draw_table.call_count == 2 * 4
+
+def test_overlay_follows_frame_size(flow_counter: FlowCounter) -> None:
+    cls_counts = {name: {} for name in flow_counter.counted_cls_names}
+    line_map = {"road": (((0, 10), (50, 20)), ((0, 30), (50, 40)))}
+    for shape in ((480, 640, 3), (100, 80, 3)):
+        frame = np.zeros(shape, dtype=np.uint8)
+        expected = _annotate_directly(flow_counter, frame.copy(), line_map, cls_counts)
+        assert np.array_equal(flow_counter._annotate_frame(frame, line_map, 0, cls_counts), expected)
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from flow_counter.pipeline import run_pipeline
+
+def test_run_pipeline_preserves_order() -> None:
+    """
+    Test that items reach the sink in source order and stats are recorded.
+    """
+    received = []
+
+    def process(x: int) -> int:
+        time.sleep(0.001)
+        return x * 2
+
+    stats = run_pipeline(range(50), process, received.append, queue_size=2)
+
+    assert received == [x * 2 for x in range(50)]
+    assert [s.items for s in stats.stages.values()] == [50, 50, 50]
+    assert all(0 <= q.max_depth <= 2 for q in stats.queues.values())
+
+def test_run_pipeline_reraises_stage_errors() -> None:
+    """
+    Test that an exception in the sink stops the pipeline and is re-raised.
+    """
+    def sink(x: int) -> None:
+        if x == 5:
+            raise ValueError("broken writer")
+
+    with pytest.raises(ValueError, match="broken writer"):
+        run_pipeline(iter(range(1000)), lambda x: x, sink, queue_size=2)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from conftest import moving_car
+from flow_counter import FlowCounter
+from flow_counter.replay import LineMapReplay
+from flow_counter.track_cache import TrackCache, TrackCacheWriter
+
+def _random_tracks(seed: int, n_frames: int = 60, n_boxes: int = 15) -> list:
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(n_frames):
+        xy = rng.uniform(0, 120, size=(n_boxes, 2))
+        boxes = np.concatenate([xy, xy + rng.uniform(30, 90, size=(n_boxes, 2))], axis=1).astype(np.float32)
+        # Duplicate half of the boxes with jitter to exercise suppression
+        boxes[1::2] = boxes[::2][:n_boxes // 2] + rng.uniform(-3, 3, size=(n_boxes // 2, 4)).astype(np.float32)
+        frames.append((boxes, rng.integers(-1, 40, size=n_boxes).tolist(), rng.integers(0, 3, size=n_boxes).astype(np.float32)))
+    return frames
+
+def test_replay_matches_individual_runs(vectorized_flow_counter: FlowCounter) -> None:
+    """
+    Test that evaluating many line maps in one pass gives the same counts as separate runs.
+    """
+    vectorized_flow_counter.model.names = {0: "car", 1: "bus", 2: "dog"}
+    line_maps = {
+        f"shift_{dy}": {
+            "a": (((0, 50 + dy), (200, 60 + dy)), ((0, 120 + dy), (200, 110 + dy))),
+            "b": (((100, 0), (100 + dy, 250)), ((150, 0), (160, 250))),
+        }
+        for dy in range(0, 40, 5)
+    }
+    tracks = _random_tracks(0)
+
+    replay = LineMapReplay(vectorized_flow_counter, line_maps)
+    results = replay.run(tracks)
+
+    for name, line_map in line_maps.items():
+        expected = vectorized_flow_counter.count_tracks(tracks, line_map)
+        assert results[name] == expected
+    assert any(counts for config in results.values() for counts in config.values())
+
+def test_replay_table_lists_every_config(vectorized_flow_counter: FlowCounter) -> None:
+    vectorized_flow_counter.model.names = {0: "car"}
+    line_map = {"road": (((0, 20), (160, 60)), ((0, 60), (160, 100)))}
+
+    replay = LineMapReplay(vectorized_flow_counter, [line_map, {}])
+    replay.update(np.array([[40, 10, 60, 32]]), [1], np.array([0]))
+    replay.update(np.array([[40, 50, 60, 72]]), [1], np.array([0]))
+
+    rows = [row for row in replay.table() if row["class"] == "car"]
+    assert rows == [{"config": 0, "class": "car", "area": "road", "count": 1}]
+
+def test_replay_stamps_events_with_video_time(vectorized_flow_counter: FlowCounter, tmp_path) -> None:
+    """
+    Test that replayed counters take event timestamps and time buckets from the cache's frame rate,
+    and do not share line-map state with the source counter.
+    """
+    vectorized_flow_counter.model.names = {0: "car"}
+    vectorized_flow_counter.bucket_seconds = 1
+    writer = TrackCacheWriter(str(tmp_path / "cache"), {0: "car"}, fps=10.0)
+    for frame_index in range(40):
+        xyxys, ids, classes = moving_car(frame_index)
+        writer.append(xyxys, ids.tolist(), classes)
+    writer.close()
+    line_maps = {"low": {"road": (((0, 20), (160, 60)), ((0, 60), (160, 100)))}}
+
+    replay = LineMapReplay(vectorized_flow_counter, line_maps)
+    replay.run(TrackCache(str(tmp_path / "cache")))
+
+    counter = replay.counters["low"]
+    assert [(event.frame_index, event.timestamp) for event in counter.event_log] == [(31, 3.1)]
+    starts, counts = counter.bucketed_counts.matrix()
+    assert counts.sum() == 1 and starts[np.nonzero(counts.sum(axis=(1, 2)))[0][0]] == 3
+    assert counter._table_overlay is not vectorized_flow_counter._table_overlay
+    assert counter._index is not vectorized_flow_counter._index
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from flow_counter import FlowCounter
+from flow_counter.roi import RoiMosaic, RoiOptions, roi_rects
+
+def test_roi_rects_merge() -> None:
+    """
+    Test that overlapping areas share a crop, distant areas get their own, and `max_crops` is respected.
+    """
+    line_map = {
+        "left": (((0, 100), (100, 110)), ((0, 150), (100, 160))),
+        "left2": (((80, 100), (180, 110)), ((80, 150), (180, 160))),
+        "right": (((500, 300), (600, 310)), ((500, 350), (600, 360))),
+    }
+    options = RoiOptions(padding=10, headroom=20)
+
+    assert roi_rects(line_map, (640, 480), options) == [(0, 80, 190, 170), (490, 280, 610, 370)]
+    assert roi_rects(line_map, (640, 480), RoiOptions(padding=10, headroom=20, max_crops=1)) == [(0, 80, 610, 370)]
+    assert roi_rects({}, (640, 480), options) == [(0, 0, 640, 480)]
+
+def test_mosaic_maps_boxes_back_to_frame() -> None:
+    line_map = {
+        "a": (((10, 50), (60, 50)), ((10, 70), (60, 70))),
+        "b": (((200, 150), (260, 150)), ((200, 170), (260, 170))),
+    }
+    mosaic = RoiMosaic(line_map, (320, 240), RoiOptions(padding=0, headroom=10, gap=8))
+    frame = np.random.default_rng(0).integers(0, 255, size=(240, 320, 3), dtype=np.uint8)
+    image = mosaic.crop(frame)
+
+    assert mosaic.pixels < 320 * 240
+    for (x1, y1, x2, y2), (ox, oy) in zip(mosaic.rects, mosaic.offsets):
+        assert np.array_equal(image[oy:oy + y2 - y1, ox:ox + x2 - x1], frame[y1:y2, x1:x2])
+
+    # One box in each crop, in mosaic coordinates: x1, y1, x2, y2, id, conf, cls.
+    (ax, ay), (bx, by) = mosaic.offsets
+    boxes = torch.tensor([
+        [ax + 5, ay + 2, ax + 25, ay + 20, 1, 0.9, 2],
+        [bx + 0, by + 4, bx + 30, by + 24, 2, 0.8, 2],
+    ], dtype=torch.float32)
+    result = mosaic.to_frame(Results(image, path="", names={2: "car"}, boxes=boxes), frame)
+
+    assert result.orig_img is frame
+    assert result.boxes.xyxy.tolist() == [[15, 42, 35, 60], [200, 144, 230, 164]]
+    assert result.boxes.id.tolist() == [1, 2]
+
+def test_roi_object_counts_match_full_frame(mock_yolo, tmp_path) -> None:
+    """
+    Test that counting a car with the detector on a crop gives the counts of the full-frame run.
+    """
+    line_map = {"road": (((0, 80), (320, 140)), ((0, 130), (320, 190)))}
+    path = str(tmp_path / "road.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25.0, (320, 240))
+    for i in range(60):
+        frame = np.full((240, 320, 3), 40, dtype=np.uint8)
+        frame[max(0, 4 * i - 30):4 * i, 140:180] = 255
+        writer.write(frame)
+    writer.release()
+
+    shapes = []
+
+    def track(image, *args, **kwargs):
+        shapes.append(image.shape)
+        ys, xs = np.nonzero(image[..., 0] > 127)
+        boxes = torch.zeros((0, 7))
+        if len(ys):
+            boxes = torch.tensor([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 1, 0.9, 0]], dtype=torch.float32)
+        return [Results(image, path="", names={0: "car"}, boxes=boxes)]
+
+    counts = {}
+    for roi in (False, True):
+        counter = FlowCounter("dummy_model.pt", roi_options=RoiOptions(padding=16, headroom=40) if roi else None)
+        counter.model.names = {0: "car"}
+        counter.model.track.side_effect = track
+        shapes.clear()
+        counts[roi] = counter.object_counts(path, str(tmp_path / "out.mp4"), line_map)
+
+    assert counts[True] == counts[False]
+    assert counts[True]["car"] == {"road": 1}
+    assert set(shapes) == {(166, 320, 3)}
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from flow_counter import FlowCounter
+from flow_counter.motion import MotionOptions
+from flow_counter.roi import RoiOptions
+from flow_counter.segments import match_tracks, plan_segments
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def test_plan_segments_covers_video() -> None:
+    segments = plan_segments(100, 3, overlap=10)
+
+    assert [(s.start, s.end, s.read_start) for s in segments] == [(0, 34, 0), (34, 68, 24), (68, None, 58)]
+
+def test_match_tracks_pairs_overlapping_ids() -> None:
+    """
+    Test that IDs are matched one-to-one by the number of overlapping frames.
+    """
+    box_a = np.array([[0, 0, 10, 10]])
+    box_b = np.array([[50, 50, 60, 60]])
+    prev_frames = [(np.concatenate([box_a, box_b]), [1, 2], np.array([0, 0]))] * 3
+    next_frames = [(np.concatenate([box_b, box_a]), [7, 8], np.array([0, 0]))] * 3
+
+    assert sorted(match_tracks(prev_frames, next_frames)) == [(1, 8), (2, 7)]
+
+def test_match_tracks_ignores_other_classes() -> None:
+    box = np.array([[0, 0, 10, 10]])
+    assert match_tracks([(box, [1], np.array([0]))], [(box, [2], np.array([1]))]) == []
+
+@pytest.mark.parametrize("segments", [1, 2, 4])
+def test_segmented_counts_match_serial(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    segments: int,
+) -> None:
+    """
+    Test that a car crossing the lines in different segments is still counted exactly once.
+    """
+    cls_counts = flow_counter.object_counts_segmented(sample_video, slanted_lines, segments=segments, workers=0, overlap=5)
+
+    assert cls_counts["car"] == {"road": 1}
+    assert flow_counter.frame_index == 40
+
+@pytest.mark.parametrize("options", [{"roi_options": RoiOptions()}, {"motion_options": MotionOptions()}])
+def test_segmented_counts_reject_roi_and_motion_gating(
+    mock_yolo,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    options: dict,
+) -> None:
+    """
+    Test that options segment tracking would silently ignore are rejected.
+    """
+    counter = FlowCounter("dummy_model.pt", **options)
+
+    with pytest.raises(ValueError, match="does not support"):
+        counter.object_counts_segmented(sample_video, slanted_lines, segments=2, workers=0)
+    mock_yolo.return_value.track.assert_not_called()
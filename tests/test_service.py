@@ -0,0 +1,116 @@
+import time
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from flow_counter import FlowCounter
+from flow_counter.service import replay_video
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def synthetic_frames(n: int, fps: float | None = None):
+    """
+    Frames in the format of `sample_video`, optionally paced like a live camera.
+    """
+    for i in range(n):
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        frame[:, :4 * i] = 255
+        if fps is not None:
+            time.sleep(1 / fps)
+        yield frame
+
+def test_service_counts_every_stream(
+    batch_counter: FlowCounter,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that streams batched through one detector keep independent tracks and counts.
+    """
+    streams = {
+        "file": (sample_video, slanted_lines),
+        "replay": (replay_video(sample_video, realtime=False), slanted_lines),
+        "frames": (synthetic_frames(40), slanted_lines),
+    }
+    events = []
+    service = batch_counter.serve(streams, buffer_size=64)
+
+    stats = service.run(lambda name, event: events.append((name, event.area)))
+
+    assert service.results() == {name: {"person": {}, "car": {"road": 1}, "motorcycle": {}, "bus": {}, "truck": {}} for name in streams}
+    assert sorted(events) == [("file", "road"), ("frames", "road"), ("replay", "road")]
+    assert stats.frames == 120
+    assert stats.max_batch_size <= 3
+    assert stats.batches == batch_counter.model.predict.call_count
+    assert all(stream.stats.processed == 40 for stream in service.streams.values())
+    # The shared counter itself is left untouched.
+    assert batch_counter.cls_counts["car"] == {}
+
+def test_service_is_fair_under_overload(
+    batch_counter: FlowCounter,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that a detector too slow for all streams serves them evenly and drops late frames.
+    """
+    predict = batch_counter.model.predict.side_effect
+    service = None
+
+    def slow_predict(frames, *args, **kwargs):
+        time.sleep(0.01)
+        # Stop while every stream still has frames, so none is favoured by the others ending.
+        if batch_counter.model.predict.call_count == 30:
+            service.stop()
+        return predict(frames)
+
+    batch_counter.model.predict.side_effect = slow_predict
+    streams = {name: (synthetic_frames(1000, fps=200), slanted_lines) for name in range(3)}
+    service = batch_counter.serve(streams, max_batch=1, latency_budget=0.05)
+
+    stats = service.run()
+
+    processed = [stream.stats.processed for stream in service.streams.values()]
+    assert stats.max_batch_size == 1
+    assert stats.frames == 30
+    assert min(processed) >= 7
+    assert sum(stream.stats.dropped for stream in service.streams.values()) > 0
+
+def _relabeled_tracks(spy) -> list[tuple[list, list[int]]]:
+    """
+    Boxes and track IDs counted per frame, with IDs renumbered in order of appearance.
+    """
+    labels: dict[int, int] = {}
+    return [
+        (xyxys.tolist(), [labels.setdefault(i, len(labels) + 1) for i in ids])
+        for xyxys, ids, _, _ in (call.args for call in spy.call_args_list)
+    ]
+
+def test_service_tracks_match_model_track(
+    tiny_model: str,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    scripted_detector,
+    mocker: MockerFixture,
+) -> None:
+    """
+    Test that the per-stream trackers of a batched service give the tracks of `model.track`.
+
+    Before ultralytics 8.4.176 all trackers of a process draw IDs from one counter, so the
+    streams' IDs are compared up to renumbering.
+    """
+    counter = FlowCounter(tiny_model, tracker_file="bytetrack.yaml")
+    spy = mocker.spy(counter, "_count_crossing_objects")
+    counter.object_counts(sample_video, None, slanted_lines)
+    expected = _relabeled_tracks(spy)
+
+    streams = {name: (synthetic_frames(40), slanted_lines) for name in ("a", "b")}
+    service = FlowCounter(tiny_model, tracker_file="bytetrack.yaml").serve(streams, max_batch=2, buffer_size=64)
+    spies = {name: mocker.spy(stream.flow_counter, "_count_crossing_objects") for name, stream in service.streams.items()}
+    service.run()
+
+    assert service.stats.max_batch_size == 2
+    assert {tuple(ids) for _, ids in expected} == {(), (1,), (2,)}
+    for stream_spy in spies.values():
+        assert _relabeled_tracks(stream_spy) == expected
@@ -0,0 +1,84 @@
+import copy
+import subprocess
+import sys
+import textwrap
+
+from flow_counter import FlowCounter
+
+# Makes any import of the given top-level packages fail in the child process.
+BLOCK_IMPORTS = """
+import sys
+
+class Blocker:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in {blocked!r}:
+            raise ImportError(name + " is blocked")
+
+sys.meta_path.insert(0, Blocker())
+"""
+
+def _run_without(blocked: tuple[str, ...], code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", BLOCK_IMPORTS.format(blocked=blocked) + textwrap.dedent(code)],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def test_core_imports_with_numpy_only() -> None:
+    """
+    Test that the package and its counting core import and construct without the heavy dependencies.
+    """
+    _run_without(("cv2", "torch", "ultralytics", "tqdm"), """
+        import flow_counter
+        from flow_counter import FlowCounter
+        from flow_counter.replay import LineMapReplay
+        from flow_counter.track_cache import TrackCache
+        from flow_counter.union_find import DictUnionFind
+        from flow_counter.utils import compute_iou, intersect
+
+        FlowCounter("yolo11n.pt")
+        assert intersect((0, 0), (10, 10), (0, 10), (10, 0))
+    """)
+
+def test_replaying_tracks_does_not_load_the_model(tmp_path) -> None:
+    output = _run_without(("cv2", "torch", "ultralytics"), f"""
+        import os
+
+        import numpy as np
+        from flow_counter import FlowCounter
+        from flow_counter.replay import LineMapReplay
+        from flow_counter.track_cache import TrackCache, TrackCacheWriter
+
+        path = {str(tmp_path / "tracks")!r}
+        writer = TrackCacheWriter(path, {{0: "car"}}, 25.0)
+        for i in range(40):
+            y2 = 10 + 2 * i
+            writer.append(np.array([[40, y2 - 20, 60, y2]], dtype=np.float32), [1], np.array([0.0]))
+        writer.close()
+        line_map = {{"road": (((0, 20), (160, 60)), ((0, 60), (160, 100)))}}
+
+        counter = FlowCounter("yolo11n.pt", counted_cls_names=["car"])
+        print(counter.count_tracks(TrackCache(path), line_map))
+        print(LineMapReplay(counter, [line_map]).run(TrackCache(path)))
+
+        # A headless run on a cached video replays the cache without OpenCV.
+        video = {str(tmp_path / "input.mp4")!r}
+        open(video, "wb").write(b"video")
+        counter.cache_dir = {str(tmp_path / "cache")!r}
+        writer = TrackCacheWriter(os.path.join(counter.cache_dir, counter._video_key(video, line_map)), {{0: "car"}}, 25.0)
+        for xyxys, ids, classes in TrackCache(path):
+            writer.append(xyxys, ids, classes)
+        writer.close()
+        print(counter.object_counts(video, None, line_map))
+    """)
+
+    assert output.split("\n")[:3] == ["{'car': {'road': 1}}", "{0: {'car': {'road': 1}}}", "{'car': {'road': 1}}"]
+
+def test_model_loads_on_first_use(mock_yolo) -> None:
+    counter = FlowCounter("dummy_model.pt")
+    shared = copy.copy(counter)
+
+    mock_yolo.assert_not_called()
+    assert counter.model is shared.model is counter.model
+    mock_yolo.assert_called_once_with("dummy_model.pt")
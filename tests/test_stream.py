@@ -0,0 +1,163 @@
+import asyncio
+from types import SimpleNamespace
+import time
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from flow_counter import FlowCounter
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def synthetic_frames(n: int, fps: float | None = None):
+    """
+    Frames in the format of `sample_video`, optionally paced like a live camera.
+    """
+    for i in range(n):
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        frame[:, :4 * i] = 255
+        if fps is not None:
+            time.sleep(1 / fps)
+        yield frame
+
+def test_stream_delivers_crossing_events(
+    flow_counter: FlowCounter,
+    fake_track,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that a crossing is pushed to the callback with its source frame index.
+    """
+    events = []
+    stream = flow_counter.stream(synthetic_frames(40, fps=500), slanted_lines, buffer_size=64)
+
+    stats = stream.run(events.append)
+
+    assert [(e.frame_index, e.track_id, e.class_name, e.area) for e in events] == [(31, 1, "car", "road")]
+    assert events[0].timestamp > 0
+    assert stats.received == stats.processed == 40
+    assert flow_counter.cls_counts["car"] == {"road": 1}
+    assert flow_counter.event_listeners == []
+
+def test_stream_drops_frames_under_overload(
+    flow_counter: FlowCounter,
+    fake_track,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that a slow counter skips frames instead of falling behind.
+    """
+    track = fake_track.side_effect
+
+    def slow_track(frame, *args, **kwargs):
+        time.sleep(0.01)
+        return track(frame)
+
+    fake_track.side_effect = slow_track
+    stream = flow_counter.stream(synthetic_frames(40, fps=1000), slanted_lines, buffer_size=1)
+
+    stats = stream.run()
+
+    assert stats.received == 40
+    assert stats.dropped > 0
+    assert stats.processed + stats.dropped == 40
+
+def test_stream_drop_count_adds_up_under_both_kinds_of_drops(
+    flow_counter: FlowCounter,
+    fake_track,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that frames dropped by the reader (full buffer) and by the counter (too late)
+    are all counted, as both threads update the same statistics.
+    """
+    track = fake_track.side_effect
+
+    def slow_track(frame, *args, **kwargs):
+        time.sleep(0.002)
+        return track(frame)
+
+    fake_track.side_effect = slow_track
+    stream = flow_counter.stream(synthetic_frames(400, fps=2000), slanted_lines, buffer_size=4, max_latency=0.003)
+
+    stats = stream.run()
+
+    assert stats.received == 400
+    assert stats.processed + stats.dropped == 400
+
+def test_stream_async_events(
+    flow_counter: FlowCounter,
+    fake_track,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    async def collect():
+        stream = flow_counter.stream(synthetic_frames(40), slanted_lines, buffer_size=64)
+        return [event async for event in stream.aevents()]
+
+    events = asyncio.run(collect())
+
+    assert [(e.frame_index, e.area) for e in events] == [(31, "road")]
+
+def test_stream_reports_unavailable_source(
+    flow_counter: FlowCounter,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    with pytest.raises(FileNotFoundError):
+        flow_counter.stream(str(tmp_path / "missing.mp4"), slanted_lines).run()
+
+def test_stream_timestamps_follow_stream_time(
+    flow_counter: FlowCounter,
+    fake_track,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that events are stamped from the frame index and fps, or with the source's own timestamps.
+    """
+    events = []
+    flow_counter.stream(synthetic_frames(40), slanted_lines, buffer_size=64, fps=25).run(events.append)
+    stamped = ((100 + i / 10, frame) for i, frame in enumerate(synthetic_frames(40)))
+    flow_counter.stream(stamped, slanted_lines, buffer_size=64).run(events.append)
+
+    assert [(e.frame_index, e.timestamp) for e in events] == [(31, 31 / 25), (31, 100 + 31 / 10)]
+    assert flow_counter.bucketed_counts.rolling(seconds=60)["car"] == {"road": 1}
+
+def test_stream_timestamps_of_captured_video(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+) -> None:
+    """
+    Test that a captured source uses the frame rate reported by the capture.
+    """
+    events = []
+    flow_counter.stream(sample_video, slanted_lines, buffer_size=64).run(events.append)
+
+    assert [e.timestamp for e in events] == [pytest.approx(31 / 25)]
+
+def test_stream_resets_tracker(
+    flow_counter: FlowCounter,
+    fake_track,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    mocker: MockerFixture,
+) -> None:
+    """
+    Test that a new stream does not continue the tracks of the previous one.
+    """
+    tracker = mocker.Mock()
+    flow_counter.model.predictor = SimpleNamespace(trackers=[tracker])
+    stream = flow_counter.stream(synthetic_frames(40), slanted_lines, buffer_size=64)
+
+    def track(frame, *args, **kwargs):
+        assert tracker.reset.call_count == 1
+        return track_frame(frame)
+
+    track_frame = fake_track.side_effect
+    fake_track.side_effect = track
+    stream.run()
+
+    assert tracker.reset.call_count == 1
+    assert flow_counter.cls_counts["car"] == {"road": 1}
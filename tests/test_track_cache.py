@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from flow_counter import FlowCounter
+from flow_counter.motion import MotionOptions
+from flow_counter.roi import RoiOptions
+from flow_counter.track_cache import TrackCache, TrackCacheWriter, cache_key
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+def test_track_cache_round_trip(tmp_path) -> None:
+    """
+    Test that frames written across several chunks are read back in order.
+    """
+    rng = np.random.default_rng(0)
+    frames = []
+    for n in range(7):
+        xyxys = rng.uniform(0, 100, size=(n % 3, 4)).astype(np.float32)
+        frames.append((xyxys, list(range(n % 3)), np.full(n % 3, 2, dtype=np.float32)))
+
+    writer = TrackCacheWriter(str(tmp_path / "cache"), {0: "person", 2: "car"}, 25.0, chunk_frames=3)
+    assert not TrackCache.exists(str(tmp_path / "cache"))
+    for frame in frames:
+        writer.append(*frame)
+    writer.close()
+
+    cache = TrackCache(str(tmp_path / "cache"))
+    assert len(cache) == 7
+    assert cache.names == {0: "person", 2: "car"}
+    assert cache.fps == 25.0
+    for (xyxys, ids, classes), (c_xyxys, c_ids, c_classes) in zip(frames, cache, strict=True):
+        assert np.array_equal(xyxys, c_xyxys)
+        assert ids == c_ids
+        assert np.array_equal(classes, c_classes)
+
+def test_cache_key_depends_on_inputs(tmp_path) -> None:
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"video")
+
+    assert cache_key(str(video), "yolo11n.pt", None) == cache_key(str(video), "yolo11n.pt", None)
+    assert cache_key(str(video), "yolo11n.pt", None) != cache_key(str(video), "yolo11s.pt", None)
+    assert cache_key(str(video), "yolo11n.pt", None) != cache_key(str(video), "yolo11n.pt", "botsort.yaml")
+
+def test_object_counts_replays_cached_tracks(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that a headless run with a different line map reuses the cache instead of the model.
+    """
+    flow_counter.cache_dir = str(tmp_path / "cache")
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+    assert fake_track.call_count == 40
+
+    first_line_only = {"road": (slanted_lines["road"][0], slanted_lines["road"][0])}
+    cls_counts = flow_counter.object_counts(sample_video, None, first_line_only)
+
+    assert fake_track.call_count == 40
+    assert cls_counts["car"] == {"road": 1}
+    assert flow_counter.frame_index == 40
+
+def test_roi_cache_is_not_replayed_for_other_line_maps(
+    flow_counter: FlowCounter,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that tracks recorded on crops around one line map are not replayed for another.
+    """
+    flow_counter.model.names = {0: "car"}
+    fake_track = flow_counter.model.track
+    fake_track.side_effect = lambda image, *args, **kwargs: [
+        Results(image, path="", names={0: "car"}, boxes=torch.zeros((0, 7))),
+    ]
+    flow_counter.cache_dir = str(tmp_path / "cache")
+    flow_counter.roi_options = RoiOptions(padding=16, headroom=40)
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+    assert fake_track.call_count == 40
+
+    lower_lines = {"road": (((0, 70), (160, 70)), ((0, 100), (160, 100)))}
+    flow_counter.object_counts(sample_video, None, lower_lines)
+    assert fake_track.call_count == 80
+    assert len(os.listdir(flow_counter.cache_dir)) == 2
+
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+    assert fake_track.call_count == 80
+
+def test_video_key_depends_on_line_map_only_with_roi_or_motion(flow_counter: FlowCounter, sample_video: str) -> None:
+    lower_lines = {"road": (((0, 70), (160, 70)), ((0, 100), (160, 100)))}
+    upper_lines = {"road": [[[0, 20], [160, 20]], [[0, 50], [160, 50]]]}
+
+    assert flow_counter._video_key(sample_video, lower_lines) == flow_counter._video_key(sample_video, upper_lines)
+    for options in ({"roi_options": RoiOptions()}, {"motion_options": MotionOptions()}):
+        counter = FlowCounter("dummy_model.pt", **options)
+        assert counter._video_key(sample_video, lower_lines) != counter._video_key(sample_video, upper_lines)
+        assert counter._video_key(sample_video, upper_lines) == counter._video_key(
+            sample_video, {"road": (((0, 20), (160, 20)), ((0, 50), (160, 50)))},
+        )
+        assert counter._video_key(sample_video, upper_lines) != flow_counter._video_key(sample_video, upper_lines)
+
+def test_cache_hit_with_metrics_runs_the_model(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that a cached video still writes metrics when asked to, and that a replay clears
+    the metrics of the previous run.
+    """
+    flow_counter.cache_dir = str(tmp_path / "cache")
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+    metrics_path = str(tmp_path / "flow_counter.prom")
+
+    cls_counts = flow_counter.object_counts(sample_video, None, slanted_lines, metrics_path=metrics_path)
+
+    assert fake_track.call_count == 80
+    assert cls_counts["car"] == {"road": 1}
+    assert flow_counter.run_metrics.frames == 40
+    assert "flow_counter_frames_total" in open(metrics_path).read()
+
+    flow_counter.object_counts(sample_video, None, slanted_lines)
+
+    assert fake_track.call_count == 80
+    assert flow_counter.run_metrics is None
@@ -0,0 +1,48 @@
+from importlib.metadata import version
+import os
+import re
+
+from pytest_mock import MockerFixture
+
+from flow_counter import FlowCounter
+from flow_counter.utils import Point
+
+LINE = tuple[Point, Point]
+
+# Oldest ultralytics release whose `model.track` hides unconfirmed tracks like `Tracker.update`.
+ULTRALYTICS_FLOOR = (8, 4, 174)
+
+def _version_tuple(text: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", text)[:3])
+
+def test_dependency_floor_matches_tracker() -> None:
+    with open(os.path.join(os.path.dirname(__file__), "..", "pyproject.toml")) as f:
+        floor = re.search(r'"ultralytics>=([\d.]+)"', f.read()).group(1)
+
+    assert _version_tuple(floor) == ULTRALYTICS_FLOOR
+    assert _version_tuple(version("ultralytics")) >= ULTRALYTICS_FLOOR
+
+def test_batched_detection_matches_model_track(
+    tiny_model: str,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    scripted_detector,
+    mocker: MockerFixture,
+) -> None:
+    """
+    Test that the standalone tracker gives the tracks of ultralytics' own `model.track`,
+    with the detector's output replaced by scripted detections.
+    """
+    tracks = {}
+    for detect_batch in (1, 8):
+        counter = FlowCounter(tiny_model, tracker_file="bytetrack.yaml")
+        spy = mocker.spy(counter, "_count_crossing_objects")
+        counter.object_counts(sample_video, None, slanted_lines, detect_batch=detect_batch)
+        tracks[detect_batch] = [(xyxys.tolist(), ids, classes.tolist()) for xyxys, ids, classes, _ in (
+            call.args for call in spy.call_args_list
+        )]
+
+    assert len(tracks[1]) == 40
+    assert tracks[8] == tracks[1]
+    assert tracks[1][20] == ([], [], [])
+    assert {tuple(ids) for _, ids, _ in tracks[1]} == {(), (1,), (2,)}
@@ -0,0 +1,83 @@
+import sys
+
+import pytest
+
+from flow_counter.union_find import ArrayUnionFind, DictUnionFind
+
+@pytest.mark.parametrize("uf_cls", [DictUnionFind, ArrayUnionFind])
+def test_unite_and_find(uf_cls) -> None:
+    """
+    Test that united IDs share a root and sizes are accumulated.
+    """
+    uf = uf_cls()
+    assert uf.unite(10, 20) == uf.find(20)
+    uf.unite(30, 40)
+    uf.unite(20, 40)
+
+    assert uf.is_connected(10, 30)
+    assert not uf.is_connected(10, 50)
+    assert uf.get_size(40) == 4
+    assert uf.get_size(50) == 1
+
+@pytest.mark.parametrize("uf_cls", [DictUnionFind, ArrayUnionFind])
+def test_long_chain_does_not_recurse(uf_cls) -> None:
+    """
+    Test that find works on merge chains longer than the recursion limit.
+    """
+    uf = uf_cls()
+    n = sys.getrecursionlimit() * 2
+    # Build the parent chain 0 -> 1 -> ... -> n directly
+    if uf_cls is DictUnionFind:
+        uf.parent = {i: i + 1 for i in range(n)} | {n: n}
+        uf.size = {i: 1 for i in range(n + 1)}
+    else:
+        for i in range(n + 1):
+            uf.find(i)
+        for i in range(n):
+            uf._parent[i] = i + 1
+
+    assert uf.find(0) == n
+
+def test_find_many_matches_find() -> None:
+    """
+    Test that find_many resolves a batch of IDs like repeated find calls.
+    """
+    uf = ArrayUnionFind()
+    uf.unite(1, 2)
+    uf.unite(3, 2)
+
+    assert uf.find_many([1, 2, 3, 4]) == [uf.find(1), uf.find(2), uf.find(3), 4]
+
+def test_find_many_follows_long_chains_at_once() -> None:
+    """
+    Test that find_many resolves deep chains, points the IDs at their roots and lets the arrays grow after.
+    """
+    uf = ArrayUnionFind()
+    n = 1000
+    for i in range(n + 1):
+        uf.find(i)
+    for i in range(n):
+        uf._parent[i] = i + 1
+
+    assert uf.find_many([0, n // 2, n, n + 1, n + 1]) == [n, n, n, n + 1, n + 1]
+    assert uf._parent[0] == uf._parent[n // 2] == n
+    assert uf.find(n + 2) == n + 2
+
+def test_compact_drops_unreferenced_sets() -> None:
+    """
+    Test that compaction keeps referenced sets with their roots and drops the rest.
+    """
+    uf = ArrayUnionFind()
+    uf.unite(1, 2)
+    uf.unite(1, 3)
+    uf.unite(5, 6)
+    uf.find(7)
+    root = uf.find(3)
+
+    dropped = uf.compact([2])
+
+    assert dropped == 3
+    assert len(uf) == 3
+    assert 5 not in uf and 7 not in uf
+    assert uf.find_many([1, 2, 3]) == [root] * 3
+    assert uf.get_size(1) == 3
@@ -0,0 +1,164 @@
+import os
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from conftest import FakeBoxes, FakeResult, moving_car
+from flow_counter import FlowCounter
+from flow_counter.utils import Point
+from flow_counter.track_cache import TrackCache
+from flow_counter.video_io import OpenCVReader, OpenCVWriter, VideoOptions, open_reader, open_writer
+
+LINE = tuple[Point, Point]
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+def test_output_keeps_source_fps(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that the output video has the frame rate of the 25 FPS source, divided by `preview_every`.
+    """
+    for preview_every in (1, 5):
+        output_path = str(tmp_path / f"out_{preview_every}.mp4")
+        flow_counter.object_counts(sample_video, output_path, slanted_lines, preview_every=preview_every)
+        cap = cv2.VideoCapture(output_path)
+        assert cap.get(cv2.CAP_PROP_FPS) == pytest.approx(25.0 / preview_every)
+        cap.release()
+
+def test_downscaled_decoding_counts_in_source_coordinates(
+    mock_yolo,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    tmp_path,
+) -> None:
+    """
+    Test that boxes detected on half-size frames are mapped back to the line map's coordinates.
+    """
+    flow_counter = FlowCounter("dummy_model.pt", video_options=VideoOptions(scale=0.5))
+    flow_counter.model.names = {0: "car"}
+    shapes = []
+
+    def track(frame, *args, **kwargs):
+        shapes.append(frame.shape)
+        # The white band of a half-size frame is 2 pixels wide per frame.
+        xyxys, ids, classes = moving_car(round(int((frame.mean(axis=(0, 2)) > 127).sum()) / 2))
+        return [FakeResult(frame, FakeBoxes(xyxys / 2, ids, classes))]
+
+    flow_counter.model.track.side_effect = track
+    output_path = str(tmp_path / "out.mp4")
+    cls_counts = flow_counter.object_counts(sample_video, output_path, slanted_lines)
+
+    assert cls_counts["car"] == {"road": 1}
+    assert set(shapes) == {(60, 80, 3)}
+    cap = cv2.VideoCapture(output_path)
+    assert (cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (80, 60)
+    cap.release()
+
+def test_opencv_reader_seek(sample_video: str) -> None:
+    reader = OpenCVReader(sample_video)
+    reader.seek(30)
+    assert len(list(reader)) == 10
+    reader.release()
+
+def test_unknown_backend(sample_video: str) -> None:
+    with pytest.raises(ValueError):
+        open_reader(sample_video, VideoOptions(backend="gstreamer"))
+
+@requires_ffmpeg
+def test_ffmpeg_reader_matches_opencv(sample_video: str) -> None:
+    """
+    Test that frames decoded through the ffmpeg pipe match OpenCV's, also after seeking.
+    """
+    reader = open_reader(sample_video, VideoOptions(backend="ffmpeg"), buffers=3)
+    frames = [frame.copy() for frame in reader]
+    expected = list(OpenCVReader(sample_video))
+
+    assert len(frames) == len(expected) == 40
+    assert all(np.abs(a.astype(int) - b).mean() < 2 for a, b in zip(frames, expected))
+    reader.seek(10)
+    assert len(list(reader)) == 30
+
+@requires_ffmpeg
+def test_ffmpeg_writer_round_trip(sample_video: str, tmp_path) -> None:
+    options = VideoOptions(backend="ffmpeg", codec="libx264", crf=23, preset="ultrafast", threads=1)
+    reader = open_reader(sample_video, options)
+    output_path = str(tmp_path / "out.mp4")
+    writer = open_writer(output_path, reader.fps, reader.frame_size, options)
+    for frame in reader:
+        writer.write(frame)
+    writer.release()
+
+    cap = cv2.VideoCapture(output_path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 40
+    assert cap.get(cv2.CAP_PROP_FPS) == pytest.approx(25.0)
+    cap.release()
+
+def _fail_at_frame(fake_track, failing_frame: int) -> None:
+    track = fake_track.side_effect
+
+    def failing_track(frame, *args, **kwargs):
+        if fake_track.call_count > failing_frame:
+            raise RuntimeError("tracker failed")
+        return track(frame)
+
+    fake_track.side_effect = failing_track
+
+def test_failed_run_releases_reader_and_writer(
+    flow_counter: FlowCounter,
+    fake_track,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    mocker: MockerFixture,
+    tmp_path,
+) -> None:
+    """
+    Test that an error while counting releases the reader and writer and leaves no readable cache.
+    """
+    _fail_at_frame(fake_track, 5)
+    release = mocker.spy(OpenCVReader, "release")
+    abort = mocker.spy(OpenCVWriter, "abort")
+    flow_counter.cache_dir = str(tmp_path / "cache")
+
+    with pytest.raises(RuntimeError, match="tracker failed"):
+        flow_counter.object_counts(sample_video, str(tmp_path / "out.mp4"), slanted_lines)
+
+    assert release.call_count == 1
+    assert abort.call_count == 1
+    cache_path = str(tmp_path / "cache" / os.listdir(tmp_path / "cache")[0])
+    assert not TrackCache.exists(cache_path)
+    assert flow_counter._tracker is None
+
+@requires_ffmpeg
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_failed_run_stops_ffmpeg_processes(
+    mock_yolo,
+    sample_video: str,
+    slanted_lines: dict[str, tuple[LINE, LINE]],
+    mocker: MockerFixture,
+    tmp_path,
+    pipelined: bool,
+) -> None:
+    """
+    Test that the ffmpeg decoder and encoder do not outlive a run that failed.
+    """
+    counter = FlowCounter("dummy_model.pt", video_options=VideoOptions(backend="ffmpeg", preset="ultrafast"))
+    counter.model.names = {0: "car"}
+    counter.model.track.side_effect = lambda frame, *args, **kwargs: [FakeResult(frame, FakeBoxes(*moving_car(0)))]
+    _fail_at_frame(counter.model.track, 5)
+    popen = mocker.spy(subprocess, "Popen")
+
+    with pytest.raises(RuntimeError, match="tracker failed"):
+        counter.object_counts(sample_video, str(tmp_path / "out.mp4"), slanted_lines, pipelined=pipelined)
+
+    assert len(popen.spy_return_list) == 2
+    assert all(process.poll() is not None for process in popen.spy_return_list)
+    assert all(process.stdin is None or process.stdin.closed for process in popen.spy_return_list)